@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from core.models import ActivityEvent, Enrollment, QuizAttempt, DiscussionReply, AssignmentSubmission
+from core.services import activity_service
+
+class Command(BaseCommand):
+    help = "Rebuilds the activity feed from existing enrollments, quiz attempts, replies and submissions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help="Rows fetched per database round trip.")
+        parser.add_argument('--clear', action='store_true', help="Delete existing activity events first.")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            ActivityEvent.objects.all().delete()
+
+        sources = (
+            (Enrollment.objects.select_related('user', 'course'), activity_service.enrollment_events),
+            (QuizAttempt.objects.select_related('user', 'quiz__lesson__section__course'), activity_service.quiz_attempt_events),
+            (DiscussionReply.objects.select_related('author', 'discussion__course'), activity_service.reply_events),
+            (AssignmentSubmission.objects.select_related('student', 'assignment__lesson__section__course'), activity_service.submission_events),
+            (AssignmentSubmission.objects.filter(graded_at__isnull=False).select_related('assignment__lesson__section'), activity_service.grade_events),
+        )
+        total = 0
+        for queryset, build in sources:
+            events = []
+            for instance in queryset.order_by('pk').iterator(chunk_size=options['chunk_size']):
+                events.extend(build(instance))
+                if len(events) >= activity_service.BATCH_SIZE:
+                    activity_service.record(events)
+                    total += len(events)
+                    events = []
+            activity_service.record(events)
+            total += len(events)
+        self.stdout.write(self.style.SUCCESS(f"Recorded {total} activity events"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from core.models import Order
+from core.services.earnings_service import record_order_earnings
+
+class Command(BaseCommand):
+    help = "Creates earnings ledger entries for completed orders that do not have one yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help="Orders fetched per database round trip.")
+
+    def handle(self, *args, **options):
+        orders = Order.objects.filter(status='completed', earnings_entry__isnull=True).order_by('id')
+        created = 0
+        for order in orders.iterator(chunk_size=options['chunk_size']):
+            if record_order_earnings(order):
+                created += 1
+        self.stdout.write(self.style.SUCCESS(f"Recorded {created} ledger entries"))
+        if created:
+            self.stdout.write("Run rebuild_daily_stats to refresh net revenue in the daily rollups.")
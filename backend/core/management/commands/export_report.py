@@ -0,0 +1,41 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from core.models import User
+from core.services.export_service import DATASETS, ExportError, export_rows, iter_csv, write_parquet
+
+class Command(BaseCommand):
+    help = "Streams a report (students, progress, quiz_scores, submissions, revenue) to CSV or Parquet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('--output-format', choices=('csv', 'parquet'), default='csv')
+        parser.add_argument('--file', help="Destination path. CSV defaults to stdout; Parquet requires a path.")
+        parser.add_argument('--instructor', type=int, help="Only export rows for this instructor's courses.")
+        parser.add_argument('--course', type=int, help="Only export rows for this course.")
+
+    def handle(self, *args, **options):
+        instructor = None
+        if options['instructor']:
+            try:
+                instructor = User.objects.get(pk=options['instructor'])
+            except User.DoesNotExist:
+                raise CommandError("Instructor not found")
+
+        header, rows = export_rows(options['dataset'], instructor, options['course'])
+
+        if options['output_format'] == 'parquet':
+            if not options['file']:
+                raise CommandError("--file is required for Parquet output")
+            try:
+                write_parquet(header, rows, options['file'])
+            except ExportError as e:
+                raise CommandError(str(e))
+            return
+
+        output = open(options['file'], 'w', newline='') if options['file'] else sys.stdout
+        try:
+            for line in iter_csv(header, rows):
+                output.write(line)
+        finally:
+            if options['file']:
+                output.close()
@@ -0,0 +1,29 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.services.rollup_service import history_start, rebuild_rollups
+
+class Command(BaseCommand):
+    help = "Backfills or rebuilds the CourseDailyStats rollups from raw enrollment, order, progress and quiz tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First day to rebuild (YYYY-MM-DD). Defaults to the start of history.")
+        parser.add_argument('--end', help="Last day to rebuild (YYYY-MM-DD). Defaults to today.")
+        parser.add_argument('--course', type=int, help="Only rebuild rollups for this course id.")
+        parser.add_argument('--chunk-days', type=int, default=31, help="Number of days processed per transaction.")
+
+    def handle(self, *args, **options):
+        try:
+            start = datetime.date.fromisoformat(options['start']) if options['start'] else history_start()
+            end = datetime.date.fromisoformat(options['end']) if options['end'] else timezone.localdate()
+        except ValueError:
+            raise CommandError("Dates must use the YYYY-MM-DD format")
+
+        if start is None:
+            self.stdout.write("No history to rebuild.")
+            return
+        if options['chunk_days'] < 1:
+            raise CommandError("--chunk-days must be at least 1")
+
+        total = rebuild_rollups(start, end, options['course'], options['chunk_days'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} daily rollup rows from {start} to {end}"))
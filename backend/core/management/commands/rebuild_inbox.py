@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Count, Max, OuterRef, Subquery, IntegerField
+from django.utils import timezone
+from core.models import InboxTask, Discussion, AssignmentSubmission, Course, Assignment, Enrollment, Lesson, LessonProgress
+from core.services import inbox_service
+
+class Command(BaseCommand):
+    help = "Recreates every dashboard inbox task from the current state of discussions, submissions, courses and enrollments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help="Rows fetched per database round trip.")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        now = timezone.now()
+        tasks = []
+
+        discussions = Discussion.objects.filter(course__isnull=False, replies__isnull=True).exclude(
+            author=F('course__instructor')
+        ).select_related('course')
+        for discussion in discussions.iterator(chunk_size=chunk_size):
+            tasks.append(inbox_service.discussion_task(discussion))
+
+        submissions = AssignmentSubmission.objects.filter(graded_at__isnull=True).select_related(
+            'student', 'assignment__lesson__section__course'
+        )
+        for submission in submissions.iterator(chunk_size=chunk_size):
+            tasks.append(inbox_service.submission_task(submission))
+
+        for course in Course.objects.filter(sections__isnull=True).iterator(chunk_size=chunk_size):
+            tasks.append(inbox_service.setup_task(course))
+
+        assignments = Assignment.objects.filter(due_date__gt=now).select_related('lesson__section__course')
+        for assignment in assignments.iterator(chunk_size=chunk_size):
+            course = assignment.lesson.section.course
+            students = Enrollment.objects.filter(course=course).exclude(
+                user__assignment_submissions__assignment=assignment
+            ).values_list('user_id', flat=True)
+            tasks.extend(inbox_service.due_task(assignment, course, user_id) for user_id in students)
+
+        # Students with lessons left: remind them a while after their last completion
+        student_progress = LessonProgress.objects.filter(
+            user=OuterRef('user'), lesson__section__course=OuterRef('course'), is_completed=True
+        ).values('user')
+        enrollments = Enrollment.objects.select_related('course').annotate(
+            last_completion=Subquery(student_progress.annotate(last=Max('completed_at')).values('last')[:1]),
+            done=Subquery(student_progress.annotate(total=Count('id')).values('total')[:1], output_field=IntegerField()),
+            lesson_count=Subquery(
+                Lesson.objects.filter(section__course=OuterRef('course')).values('section__course')
+                .annotate(total=Count('id')).values('total')[:1],
+                output_field=IntegerField()
+            )
+        )
+        for enrollment in enrollments.iterator(chunk_size=chunk_size):
+            if not enrollment.lesson_count or (enrollment.done or 0) < enrollment.lesson_count:
+                last_activity = enrollment.last_completion or enrollment.enrolled_at
+                tasks.append(inbox_service.stalled_task(enrollment.course, enrollment.user_id, last_activity))
+
+        tasks = [task for task in tasks if task is not None]
+        with transaction.atomic():
+            InboxTask.objects.all().delete()
+            InboxTask.objects.bulk_create(tasks, batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(tasks)} inbox tasks"))
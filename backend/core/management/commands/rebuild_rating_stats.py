@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.services import rating_service
+
+class Command(BaseCommand):
+    help = "Recomputes the stored review counters and star histograms of every course from the Review table."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rating_service.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating stats for {count} courses"))
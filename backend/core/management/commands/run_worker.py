@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from core.services import worker_service
+# Importing the services registers their drain steps
+from core.services import announcement_service, event_service, notification_service, payment_service  # noqa: F401
+
+class Command(BaseCommand):
+    help = "Runs the background worker that drains queued work such as the notification outbox and payment notifications."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Process one batch per task and exit.")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds to sleep when every queue is empty.")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            processed = worker_service.run_once()
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} items"))
+            return
+        worker_service.run_forever(options['interval'])
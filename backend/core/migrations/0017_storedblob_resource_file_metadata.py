@@ -0,0 +1,61 @@
+# Generated by Django 6.0.2 on 2026-10-19 11:45
+
+import core.storage
+from django.db import migrations, models
+
+
+def fill_resource_metadata(apps, schema_editor):
+    import os
+    Resource = apps.get_model('core', 'Resource')
+    for resource in Resource.objects.all().iterator():
+        if not resource.file:
+            continue
+        try:
+            size = resource.file.size
+        except OSError:
+            size = 0
+        Resource.objects.filter(pk=resource.pk).update(
+            file_size=size,
+            file_type=os.path.splitext(resource.file.name)[1].lstrip('.').lower()
+        )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_conversation_message'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='lesson',
+            name='video_file',
+            field=models.FileField(blank=True, null=True, storage=core.storage.ContentAddressedStorage(), upload_to='videos/'),
+        ),
+        migrations.AlterField(
+            model_name='resource',
+            name='file',
+            field=models.FileField(storage=core.storage.ContentAddressedStorage(), upload_to='resources/'),
+        ),
+        # Old values were free-form strings like "2.4 MB"; recompute from the stored files
+        migrations.RemoveField(
+            model_name='resource',
+            name='file_size',
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='file_size',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_resource_metadata, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.2 on 2026-10-19 11:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_storedblob_resource_file_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('new_enrollments', models.IntegerField(default=0)),
+                ('completed_orders', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('lesson_completions', models.IntegerField(default=0)),
+                ('quiz_attempts', models.IntegerField(default=0)),
+                ('quiz_score_total', models.FloatField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='core.course')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'course'], name='core_course_date_3717e6_idx')],
+                'unique_together': {('course', 'date')},
+            },
+        ),
+    ]
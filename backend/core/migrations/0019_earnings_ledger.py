@@ -0,0 +1,50 @@
+# Generated by Django 6.0.2 on 2026-10-19 11:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_coursedailystats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursedailystats',
+            name='net_revenue',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.CreateModel(
+            name='InstructorBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gross_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('fees_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('net_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('sales_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('instructor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='earnings_balance', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EarningsEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gross_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('platform_fee', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('net_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='earnings_entries', to='core.course')),
+                ('instructor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='earnings_entries', to=settings.AUTH_USER_MODEL)),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='earnings_entry', to='core.order')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['instructor', '-created_at'], name='core_earnin_instruc_d55d0f_idx'), models.Index(fields=['instructor', 'course'], name='core_earnin_instruc_d7684f_idx')],
+            },
+        ),
+    ]
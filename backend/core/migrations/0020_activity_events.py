@@ -0,0 +1,32 @@
+# Generated by Django 6.0.2 on 2026-10-19 11:55
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_earnings_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('assignment', 'Assignment'), ('comment', 'Comment'), ('completion', 'Completion'), ('alert', 'Alert')], max_length=20)),
+                ('title', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('link', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['user', '-created_at', '-id'], name='core_activi_user_id_80cfb2_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-19 11:57
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_activity_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InboxTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(db_index=True, max_length=64)),
+                ('kind', models.CharField(choices=[('unanswered_discussion', 'Unanswered discussion'), ('ungraded_submission', 'Ungraded submission'), ('course_setup', 'Course setup'), ('upcoming_due', 'Upcoming due date'), ('stalled_course', 'Stalled course')], max_length=30)),
+                ('type', models.CharField(choices=[('grading', 'Grading'), ('community', 'Community'), ('setup', 'Setup')], max_length=20)),
+                ('urgency', models.CharField(choices=[('high', 'High'), ('medium', 'Medium'), ('low', 'Low')], default='medium', max_length=10)),
+                ('title', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('link', models.CharField(blank=True, max_length=255)),
+                ('visible_from', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_tasks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-visible_from'],
+                'indexes': [models.Index(fields=['user', 'visible_from'], name='core_inboxt_user_id_d5a817_idx')],
+                'unique_together': {('user', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.2 on 2026-10-19 11:58
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Discussion = apps.get_model('core', 'Discussion')
+    DiscussionReply = apps.get_model('core', 'DiscussionReply')
+
+    def count_of(queryset, field):
+        return Coalesce(Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('pk')).values('total')
+        ), 0)
+
+    Discussion.objects.update(
+        like_count=count_of(Discussion.liked_by.through.objects, 'discussion'),
+        reply_count=count_of(DiscussionReply.objects, 'discussion')
+    )
+    DiscussionReply.objects.update(
+        like_count=count_of(DiscussionReply.liked_by.through.objects, 'discussionreply')
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_inbox_tasks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='discussion',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='discussion',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='discussionreply',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0.2 on 2026-10-19 12:03
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # GIN indexes and tsvector functions only exist on PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS core_discussion_search_idx ON core_discussion USING gin (search_vector)"
+    )
+    schema_editor.execute(
+        """
+        UPDATE core_discussion AS d SET search_vector =
+            setweight(to_tsvector(%(config)s::regconfig, coalesce(d.title, '')), 'A')
+            || setweight(to_tsvector(%(config)s::regconfig, coalesce(left(d.content, 20000), '')), 'B')
+            || setweight(to_tsvector(%(config)s::regconfig, coalesce(
+                (SELECT string_agg(left(r.content, 2000), ' ') FROM (
+                    SELECT content FROM core_discussionreply WHERE discussion_id = d.id ORDER BY id DESC LIMIT 100
+                ) AS r), ''
+            )), 'C')
+        """,
+        {'config': settings.SEARCH_CONFIG}
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS core_discussion_search_idx")
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_notification_grouping'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='discussion',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 6.0.2 on 2026-10-19 12:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_summaries(apps, schema_editor):
+    Conversation = apps.get_model('core', 'Conversation')
+    ConversationParticipant = apps.get_model('core', 'ConversationParticipant')
+    Message = apps.get_model('core', 'Message')
+
+    for conversation in Conversation.objects.all().iterator():
+        last = Message.objects.filter(conversation_id=conversation.id).order_by('-created_at', '-id').first()
+        if last is None:
+            continue
+        Conversation.objects.filter(pk=conversation.id).update(
+            last_message_id=last.id, last_message_preview=last.content[:255], last_message_at=last.created_at
+        )
+        for membership in ConversationParticipant.objects.filter(conversation_id=conversation.id):
+            unread = Message.objects.filter(
+                conversation_id=conversation.id, is_read=False
+            ).exclude(sender_id=membership.user_id).aggregate(n=Count('id'))['n']
+            ConversationParticipant.objects.filter(pk=membership.pk).update(
+                unread_count=unread, last_read_message_id=None if unread else last.id
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_stream_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_preview',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        # The existing participants table becomes the explicit membership model;
+        # its auto-created id is a 32-bit integer, widened below for real
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ConversationParticipant',
+                    fields=[
+                        ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='core.conversation')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversation_memberships', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'core_conversation_participants',
+                        'unique_together': {('conversation', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='conversation',
+                    name='participants',
+                    field=models.ManyToManyField(related_name='conversations', through='core.ConversationParticipant', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='conversationparticipant',
+            name='id',
+            field=models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID'),
+        ),
+        migrations.AddField(
+            model_name='conversationparticipant',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversationparticipant',
+            name='last_read_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.message'),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
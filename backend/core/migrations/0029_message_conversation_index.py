@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-19 12:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_conversation_summaries'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'id'], name='core_messag_convers_5c17c7_idx'),
+        ),
+    ]
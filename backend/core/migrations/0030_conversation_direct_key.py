@@ -0,0 +1,40 @@
+# Generated by Django 6.0.2 on 2026-10-19 12:18
+
+from collections import defaultdict
+from django.db import migrations, models
+
+
+def backfill_direct_keys(apps, schema_editor):
+    Conversation = apps.get_model('core', 'Conversation')
+    ConversationParticipant = apps.get_model('core', 'ConversationParticipant')
+
+    members = defaultdict(list)
+    for conversation_id, user_id in ConversationParticipant.objects.values_list('conversation_id', 'user_id'):
+        members[conversation_id].append(user_id)
+
+    # Earlier duplicates of a pair keep working but only the most recent one is canonical
+    claimed = set()
+    for conversation_id in Conversation.objects.order_by('-updated_at', '-id').values_list('id', flat=True):
+        users = sorted(members.get(conversation_id, ()))
+        if len(users) != 2:
+            continue
+        key = f"{users[0]}:{users[1]}"
+        if key not in claimed:
+            claimed.add(key)
+            Conversation.objects.filter(pk=conversation_id).update(direct_key=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_message_conversation_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='direct_key',
+            field=models.CharField(blank=True, max_length=50, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_direct_keys, migrations.RunPython.noop),
+    ]
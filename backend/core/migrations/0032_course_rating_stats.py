@@ -0,0 +1,40 @@
+# Generated by Django 6.0.2 on 2026-10-19 12:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_rating_stats(apps, schema_editor):
+    Review = apps.get_model('core', 'Review')
+    CourseRatingStats = apps.get_model('core', 'CourseRatingStats')
+    rows = Review.objects.values('course_id').annotate(
+        review_count=Count('id'),
+        rating_total=Sum('rating'),
+        **{f"stars_{star}": Count('id', filter=Q(rating=star)) for star in range(1, 6)}
+    ).order_by()
+    CourseRatingStats.objects.bulk_create([CourseRatingStats(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_announcements'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseRatingStats',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_stats', serialize=False, to='core.course')),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('rating_total', models.PositiveIntegerField(default=0)),
+                ('stars_1', models.PositiveIntegerField(default=0)),
+                ('stars_2', models.PositiveIntegerField(default=0)),
+                ('stars_3', models.PositiveIntegerField(default=0)),
+                ('stars_4', models.PositiveIntegerField(default=0)),
+                ('stars_5', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_rating_stats, migrations.RunPython.noop),
+    ]
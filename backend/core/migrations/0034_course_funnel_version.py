@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-19 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0033_payment_webhook'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='funnel_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-19 13:10
+
+from django.conf import settings
+from django.db import migrations
+
+
+def index_author_usernames(apps, schema_editor):
+    # Rebuilds the stored vectors so they include the author's username
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        """
+        UPDATE core_discussion AS d SET search_vector =
+            setweight(to_tsvector(%(config)s::regconfig, coalesce(d.title, '')), 'A')
+            || setweight(to_tsvector(%(config)s::regconfig, coalesce(
+                (SELECT u.username FROM core_user AS u WHERE u.id = d.author_id), ''
+            )), 'A')
+            || setweight(to_tsvector(%(config)s::regconfig, coalesce(left(d.content, 20000), '')), 'B')
+            || setweight(to_tsvector(%(config)s::regconfig, coalesce(
+                (SELECT string_agg(left(r.content, 2000), ' ') FROM (
+                    SELECT content FROM core_discussionreply WHERE discussion_id = d.id ORDER BY id DESC LIMIT 100
+                ) AS r), ''
+            )), 'C')
+        """,
+        {'config': settings.SEARCH_CONFIG}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0034_course_funnel_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_author_usernames, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.2 on 2026-10-19 13:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0036_notification_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FunnelVersion',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='funnel_version', serialize=False, to='core.course')),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RemoveField(
+            model_name='course',
+            name='funnel_version',
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 6.0.2 on 2026-10-19 13:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def close_duplicate_groups(apps, schema_editor):
+    # Earlier races could open several unread groups for one target; keep the newest open
+    Notification = apps.get_model('core', 'Notification')
+    groups = (
+        Notification.objects.filter(is_read=False, group_key__isnull=False)
+        .values('user_id', 'group_key').annotate(newest=Max('id')).order_by()
+    )
+    for group in groups:
+        Notification.objects.filter(
+            user_id=group['user_id'], group_key=group['group_key'], is_read=False, id__lt=group['newest']
+        ).update(group_key=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_funnel_version_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationActor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+        ),
+        migrations.RunPython(close_duplicate_groups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('group_key__isnull', False), ('is_read', False)), fields=('user', 'group_key'), name='unique_unread_notification_group'),
+        ),
+        migrations.AddField(
+            model_name='notificationactor',
+            name='notification',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='actors', to='core.notification'),
+        ),
+        migrations.AddField(
+            model_name='notificationactor',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='notificationactor',
+            unique_together={('notification', 'user')},
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-19 13:18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_notification_actors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='announcement',
+            name='fanout_attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='announcement',
+            name='fanout_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='announcement',
+            name='fanout_next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['fanout_pending', 'fanout_next_attempt_at'], name='core_announ_fanout__0274de_idx'),
+        ),
+    ]
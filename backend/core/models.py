@@ -1,7 +1,11 @@
+import os
 from django.db import models
+from django.utils import timezone
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import AbstractUser
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from .storage import content_storage
 
 class User(AbstractUser):
     ROLE_CHOICES = (
@@ -110,7 +114,7 @@ class Lesson(models.Model):
     title = models.CharField(max_length=255)
     lesson_type = models.CharField(max_length=10, choices=TYPE_CHOICES, default='video')
     video_url = models.URLField(max_length=500, blank=True)
-    video_file = models.FileField(upload_to='videos/', null=True, blank=True)
+    video_file = models.FileField(upload_to='videos/', storage=content_storage, null=True, blank=True)
     content = models.TextField(blank=True) # For articles or extra info
     summary = models.TextField(blank=True) # Short summary for the player
     order = models.PositiveIntegerField(default=0)
@@ -126,14 +130,30 @@ class Lesson(models.Model):
 class Resource(models.Model):
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='resources')
     title = models.CharField(max_length=255)
-    file = models.FileField(upload_to='resources/')
+    file = models.FileField(upload_to='resources/', storage=content_storage)
     file_type = models.CharField(max_length=50, blank=True) # e.g. "pdf", "zip"
-    file_size = models.CharField(max_length=20, blank=True) # e.g. "2.4 MB"
+    file_size = models.PositiveBigIntegerField(default=0) # In bytes
     created_at = models.DateTimeField(auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        if self.file and (not self.file._committed or not self.file_size):
+            self.file_type = os.path.splitext(self.file.name)[1].lstrip('.').lower()
+            self.file_size = self.file.size
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.title} ({self.lesson.title})"
 
+class StoredBlob(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    content_hash = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
 class Quiz(models.Model):
     lesson = models.OneToOneField(Lesson, on_delete=models.CASCADE, related_name='quiz')
     title = models.CharField(max_length=255)
@@ -188,6 +208,9 @@ class Discussion(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     liked_by = models.ManyToManyField(User, related_name='liked_discussions', blank=True)
     is_resolved = models.BooleanField(default=False)
+    like_count = models.PositiveIntegerField(default=0) # Maintained by signals
+    reply_count = models.PositiveIntegerField(default=0) # Maintained by signals
+    search_vector = SearchVectorField(null=True, editable=False) # Title, content and replies; PostgreSQL only
 
     class Meta:
         ordering = ['-created_at']
@@ -197,7 +220,7 @@ class Discussion(models.Model):
 
     @property
     def likes_count(self):
-        return self.liked_by.count()
+        return self.like_count
 
 class DiscussionReply(models.Model):
     discussion = models.ForeignKey(Discussion, on_delete=models.CASCADE, related_name='replies')
@@ -205,6 +228,7 @@ class DiscussionReply(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     liked_by = models.ManyToManyField(User, related_name='liked_replies', blank=True)
+    like_count = models.PositiveIntegerField(default=0) # Maintained by signals
 
     class Meta:
         ordering = ['created_at']
@@ -214,7 +238,7 @@ class DiscussionReply(models.Model):
 
     @property
     def likes_count(self):
-        return self.liked_by.count()
+        return self.like_count
 
 class Notification(models.Model):
     NOTIFICATION_TYPES = (
@@ -231,9 +255,108 @@ class Notification(models.Model):
     link = models.CharField(max_length=255, null=True, blank=True)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    group_key = models.CharField(max_length=100, null=True, blank=True) # Coalesces repeated events, e.g. likes on one post
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+') # Latest actor in the group
+    actor_count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'group_key']),
+            models.Index(fields=['user', 'is_read', 'created_at']),
+        ]
+        constraints = [
+            # One open group per target; concurrent first events race on this
+            models.UniqueConstraint(
+                fields=['user', 'group_key'], condition=models.Q(is_read=False, group_key__isnull=False),
+                name='unique_unread_notification_group'
+            ),
+        ]
+
+class NotificationActor(models.Model):
+    """
+    Distinct users counted in a grouped notification, so repeated events
+    by the same user (like, unlike, like) are counted once.
+    """
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='actors')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        unique_together = ('notification', 'user')
+
+class NotificationOutbox(models.Model):
+    """
+    Notification intent written in the same transaction as the event that
+    caused it, and turned into Notification rows by the background worker.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES)
+    title = models.CharField(max_length=255)
+    description = models.TextField()
+    link = models.CharField(max_length=255, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+class NotificationCounter(models.Model):
+    """
+    Unread notification count of a user, moved with F() updates by
+    notification_service so web processes and the worker share one value.
+    A user without a row has no unread notifications.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread = models.PositiveIntegerField(default=0)
+
+class FunnelVersion(models.Model):
+    """
+    Cache version of a course's funnel, bumped with F() updates by
+    funnel_service on every enrollment and completion. Kept off the course
+    row so progress writes do not contend with course reads and saves.
+    A course without a row is at version 0.
+    """
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='funnel_version')
+    version = models.PositiveIntegerField(default=0)
+
+class Announcement(models.Model):
+    """
+    Course-wide broadcast stored once and read through enrollments. When
+    notify is set, the worker materializes notifications in chunks,
+    resuming after fanout_cursor (the last enrollment id handled). A failing
+    chunk is retried with backoff until fanout_next_attempt_at, then given up.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='announcements')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='announcements')
+    title = models.CharField(max_length=255)
+    body = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    fanout_pending = models.BooleanField(default=False)
+    fanout_cursor = models.PositiveBigIntegerField(default=0)
+    fanout_attempts = models.PositiveIntegerField(default=0)
+    fanout_next_attempt_at = models.DateTimeField(default=timezone.now)
+    fanout_error = models.TextField(blank=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['course', '-created_at', '-id']),
+            models.Index(fields=['fanout_pending', 'fanout_next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.course.title}: {self.title}"
+
+class StreamEvent(models.Model):
+    """
+    Short-lived log of pushed events for the database event-stream backend.
+    The id doubles as the SSE event id, so clients resume with Last-Event-ID.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    kind = models.CharField(max_length=30)
+    data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id']),
+        ]
 
 class Certificate(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='certificates')
@@ -298,6 +421,20 @@ class Review(models.Model):
     def __str__(self):
         return f"{self.user.username}'s review on {self.course.title}"
 
+class CourseRatingStats(models.Model):
+    """
+    Review counters per course, adjusted by signals as reviews are written,
+    edited or deleted; rebuilt from Review with the rebuild_rating_stats command.
+    """
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='rating_stats')
+    review_count = models.PositiveIntegerField(default=0)
+    rating_total = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+
 class Assignment(models.Model):
     lesson = models.OneToOneField(Lesson, on_delete=models.CASCADE, related_name='assignment')
     title = models.CharField(max_length=255)
@@ -341,9 +478,37 @@ class Order(models.Model):
     def __str__(self):
         return f"Order {self.id} - {self.user.username} - {self.status}"
 
+class PaymentWebhook(models.Model):
+    """
+    Payment notification token queued by the IPN endpoint and verified with
+    the provider by the background worker, retrying with backoff until
+    next_attempt_at. A token is stored once however often it is delivered.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+    )
+    token = models.CharField(max_length=255, unique=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='webhooks')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
 class Conversation(models.Model):
-    participants = models.ManyToManyField(User, related_name='conversations')
+    participants = models.ManyToManyField(User, related_name='conversations', through='ConversationParticipant')
     updated_at = models.DateTimeField(auto_now=True)
+    # Inbox summary, kept current by messaging_service when a message is sent
+    last_message = models.ForeignKey('Message', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_preview = models.CharField(max_length=255, blank=True)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    direct_key = models.CharField(max_length=50, unique=True, null=True, blank=True) # "<lower id>:<higher id>" for 1:1 conversations
     
     class Meta:
         ordering = ['-updated_at']
@@ -351,6 +516,20 @@ class Conversation(models.Model):
     def __str__(self):
         return f"Conversation {self.id}"
 
+class ConversationParticipant(models.Model):
+    """
+    Membership row with the participant's read state. Reuses the table of the
+    former auto-created participants relation.
+    """
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='memberships')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversation_memberships')
+    unread_count = models.PositiveIntegerField(default=0)
+    last_read_message = models.ForeignKey('Message', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        db_table = 'core_conversation_participants'
+        unique_together = ('conversation', 'user')
+
 class Message(models.Model):
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages')
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
@@ -360,6 +539,139 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['conversation', 'id']),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender.username} at {self.created_at}"
+
+class CourseDailyStats(models.Model):
+    """
+    Per-course, per-day rollup maintained incrementally by signals and
+    rebuilt from raw tables with the rebuild_daily_stats command.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    new_enrollments = models.IntegerField(default=0)
+    completed_orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0) # Gross order amounts
+    net_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0) # Instructor share from the ledger
+    lesson_completions = models.IntegerField(default=0)
+    quiz_attempts = models.IntegerField(default=0)
+    quiz_score_total = models.FloatField(default=0) # Sum of attempt percentages
+
+    class Meta:
+        unique_together = ('course', 'date')
+        indexes = [
+            models.Index(fields=['date', 'course']),
+        ]
+
+    @property
+    def average_quiz_score(self):
+        return self.quiz_score_total / self.quiz_attempts if self.quiz_attempts else 0
+
+    def __str__(self):
+        return f"{self.course.title} - {self.date}"
+
+class InstructorBalance(models.Model):
+    instructor = models.OneToOneField(User, on_delete=models.CASCADE, related_name='earnings_balance')
+    gross_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    fees_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    net_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    sales_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.instructor.username} - {self.net_total}"
+
+class EarningsEntry(models.Model):
+    instructor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='earnings_entries')
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name='earnings_entry')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='earnings_entries')
+    gross_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    platform_fee = models.DecimalField(max_digits=10, decimal_places=2)
+    net_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    balance_after = models.DecimalField(max_digits=12, decimal_places=2) # Running net balance
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['instructor', '-created_at']),
+            models.Index(fields=['instructor', 'course']),
+        ]
+
+    def __str__(self):
+        return f"{self.instructor.username} +{self.net_amount} (Order {self.order_id})"
+
+class ActivityEvent(models.Model):
+    """
+    Append-only activity feed entry, written once per audience member when a
+    domain event happens and read back with a single indexed range scan.
+    """
+    TYPE_CHOICES = (
+        ('assignment', 'Assignment'),
+        ('comment', 'Comment'),
+        ('completion', 'Completion'),
+        ('alert', 'Alert'),
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activity_events') # Audience
+    type = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    title = models.CharField(max_length=255)
+    description = models.TextField()
+    link = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.title}"
+
+class InboxTask(models.Model):
+    """
+    Open to-do item on a user's dashboard, created and resolved by signals as
+    the underlying state changes. Rows are deleted once resolved.
+    """
+    KIND_CHOICES = (
+        ('unanswered_discussion', 'Unanswered discussion'),
+        ('ungraded_submission', 'Ungraded submission'),
+        ('course_setup', 'Course setup'),
+        ('upcoming_due', 'Upcoming due date'),
+        ('stalled_course', 'Stalled course'),
+    )
+    TYPE_CHOICES = (
+        ('grading', 'Grading'),
+        ('community', 'Community'),
+        ('setup', 'Setup'),
+    )
+    URGENCY_CHOICES = (
+        ('high', 'High'),
+        ('medium', 'Medium'),
+        ('low', 'Low'),
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='inbox_tasks')
+    key = models.CharField(max_length=64, db_index=True) # e.g. "community-12", unique per user
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    type = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    urgency = models.CharField(max_length=10, choices=URGENCY_CHOICES, default='medium')
+    title = models.CharField(max_length=255)
+    description = models.TextField()
+    link = models.CharField(max_length=255, blank=True)
+    visible_from = models.DateTimeField(default=timezone.now) # Hidden until then
+    expires_at = models.DateTimeField(null=True, blank=True) # Hidden after, e.g. a due date
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-visible_from']
+        unique_together = ('user', 'key')
+        indexes = [
+            models.Index(fields=['user', 'visible_from']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.title}"
@@ -0,0 +1,83 @@
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+
+class ActivityCursorPagination(CursorPagination):
+    page_size = 10
+    max_page_size = 50
+    page_size_query_param = 'page_size'
+    ordering = ('-created_at', '-id')
+
+class AnnouncementCursorPagination(CursorPagination):
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    ordering = ('-created_at', '-id')
+
+class ReviewCursorPagination(CursorPagination):
+    page_size = 10
+    max_page_size = 50
+    page_size_query_param = 'page_size'
+    ordering = ('-created_at', '-id')
+
+class ReplyCursorPagination(CursorPagination):
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    ordering = ('created_at', 'id')
+
+class NotificationCursorPagination(CursorPagination):
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    ordering = ('-created_at', '-id')
+
+class MessageCursorPagination(BasePagination):
+    """
+    Id cursors over one conversation. Without parameters it returns the newest
+    page, newest first; `before` pages back through history and `after` returns
+    only messages newer than a known id, oldest first, for incremental sync.
+    """
+    page_size = 30
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def _cursor(self, request, name):
+        value = request.query_params.get(name)
+        if value is None:
+            return None
+        if not value.isdigit():
+            raise NotFound(self.invalid_cursor_message)
+        return int(value)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        self.after = self._cursor(request, 'after')
+        before = self._cursor(request, 'before')
+        if self.after is not None:
+            queryset = queryset.filter(id__gt=self.after).order_by('id')
+        else:
+            queryset = queryset.order_by('-id')
+            if before is not None:
+                queryset = queryset.filter(id__lt=before)
+        rows = list(queryset[:page_size + 1])
+        self.has_more = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        ids = [message.id for message in self.page]
+        return Response({
+            'results': data,
+            'has_more': self.has_more,
+            'before': min(ids) if ids else None,
+            'after': max(ids) if ids else self.after,
+        })
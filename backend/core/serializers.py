@@ -1,6 +1,18 @@
 from rest_framework import serializers
 from django.db.models import Avg, Count
-from .models import User, Course, Section, Lesson, Quiz, Question, Choice, Enrollment, Discussion, DiscussionReply, Notification, Resource, QuizAttempt, Membership, Certificate, LiveSession, Review, Assignment, AssignmentSubmission, Order, Conversation, Message
+from .services import author_card_service
+from .services.image_variants import variant_url, variant_urls
+from .services.media_delivery import lesson_stream_url, resource_download_url
+from .models import User, Course, Section, Lesson, Quiz, Question, Choice, Enrollment, Discussion, DiscussionReply, Notification, Resource, QuizAttempt, Membership, Certificate, LiveSession, Review, Assignment, AssignmentSubmission, Order, Conversation, Message, EarningsEntry, ActivityEvent, InboxTask, Announcement
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    Exposes resized variant URLs for an ImageField, e.g. {64: {"webp": ..., "jpeg": ...}}.
+    """
+    def to_representation(self, value):
+        if not value:
+            return None
+        return variant_urls(value.name, self.context.get('request'))
 
 class LiveSessionSerializer(serializers.ModelSerializer):
     instructor_name = serializers.ReadOnlyField(source='instructor.username')
@@ -20,7 +32,8 @@ class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = ('id', 'course', 'user', 'user_name', 'rating', 'comment', 'created_at')
-        read_only_fields = ('user', 'created_at')
+        read_only_fields = ('course', 'user', 'created_at')
+        extra_kwargs = {'rating': {'min_value': 1, 'max_value': 5}}
 
 class MembershipSerializer(serializers.ModelSerializer):
     class Meta:
@@ -42,22 +55,17 @@ class EnrollmentSerializer(serializers.ModelSerializer):
         fields = ('id', 'user', 'course', 'course_title', 'enrolled_at', 'progress')
 
 class NotificationSerializer(serializers.ModelSerializer):
-    timestamp = serializers.SerializerMethodField()
-
     class Meta:
         model = Notification
-        fields = ('id', 'type', 'title', 'description', 'link', 'is_read', 'timestamp')
-
-    def get_timestamp(self, obj):
-        from django.utils.timesince import timesince
-        return timesince(obj.created_at).split(',')[0] + " ago"
+        fields = ('id', 'type', 'title', 'description', 'link', 'is_read', 'actor_count', 'created_at')
 
 class UserSerializer(serializers.ModelSerializer):
     membership = MembershipSerializer(read_only=True)
+    avatar_variants = ImageVariantsField(source='avatar')
 
     class Meta:
         model = User
-        fields = ('id', 'username', 'email', 'role', 'xp_points', 'avatar', 'bio', 'location', 'timezone', 'date_joined', 'is_pro', 'membership')
+        fields = ('id', 'username', 'email', 'role', 'xp_points', 'avatar', 'avatar_variants', 'bio', 'location', 'timezone', 'date_joined', 'is_pro', 'membership')
         read_only_fields = ('xp_points', 'date_joined')
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -96,9 +104,18 @@ class QuizSerializer(serializers.ModelSerializer):
         fields = ('id', 'title', 'xp_reward', 'questions')
 
 class ResourceSerializer(serializers.ModelSerializer):
+    # The stored file is upload-only; readers get a signed download URL
+    download_url = serializers.SerializerMethodField()
+
     class Meta:
         model = Resource
-        fields = ('id', 'title', 'file', 'file_type', 'file_size', 'created_at')
+        fields = ('id', 'title', 'file', 'download_url', 'file_type', 'file_size', 'created_at')
+        read_only_fields = ('file_type', 'file_size', 'created_at')
+        extra_kwargs = {'file': {'write_only': True}}
+
+    def get_download_url(self, obj):
+        request = self.context.get('request')
+        return resource_download_url(request, obj) if request else None
 
 class QuizAttemptSerializer(serializers.ModelSerializer):
     class Meta:
@@ -113,11 +130,11 @@ class LessonSerializer(serializers.ModelSerializer):
     quiz = QuizSerializer(required=False, allow_null=True)
     assignment = serializers.SerializerMethodField()
     submission = serializers.SerializerMethodField()
+    video_stream_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Lesson
-        fields = ('id', 'title', 'lesson_type', 'video_url', 'video_file', 'content', 'summary', 'order', 'duration', 'is_completed', 'is_preview', 'resources', 'quiz', 'assignment', 'submission')
-        read_only_fields = ('video_file',)
+        fields = ('id', 'title', 'lesson_type', 'video_url', 'video_stream_url', 'content', 'summary', 'order', 'duration', 'is_completed', 'is_preview', 'resources', 'quiz', 'assignment', 'submission')
 
     def to_representation(self, instance):
         try:
@@ -136,7 +153,7 @@ class LessonSerializer(serializers.ModelSerializer):
             if not (is_enrolled or is_instructor):
                 # Hide sensitive fields for non-enrolled students
                 repr['video_url'] = None
-                repr['video_file'] = None
+                repr['video_stream_url'] = None
                 repr['content'] = ""
                 repr['resources'] = []
                 repr['quiz'] = None
@@ -149,6 +166,10 @@ class LessonSerializer(serializers.ModelSerializer):
             traceback.print_exc()
             return super().to_representation(instance)
 
+    def get_video_stream_url(self, obj):
+        request = self.context.get('request')
+        return lesson_stream_url(request, obj) if request else None
+
     def get_assignment(self, obj):
         if hasattr(obj, 'assignment'):
             return AssignmentSerializer(obj.assignment).data
@@ -190,10 +211,11 @@ class CourseSerializer(serializers.ModelSerializer):
     average_rating = serializers.FloatField(read_only=True)
     enrollment_count = serializers.IntegerField(read_only=True)
     progress_percentage = serializers.SerializerMethodField()
+    thumbnail_variants = ImageVariantsField(source='thumbnail')
 
     class Meta:
         model = Course
-        fields = ('id', 'title', 'slug', 'description', 'short_description', 'category', 'level', 'language', 'thumbnail', 
+        fields = ('id', 'title', 'slug', 'description', 'short_description', 'category', 'level', 'language', 'thumbnail', 'thumbnail_variants',
                   'video_preview_url', 'instructor', 'instructor_name', 'price', 'discount_price', 'duration_hours', 
                   'requirements', 'outcomes', 'is_published', 'is_featured', 'sections', 'is_enrolled', 'progress_percentage', 
                   'enrollment_count', 'average_rating')
@@ -319,28 +341,102 @@ class CourseSerializer(serializers.ModelSerializer):
         return instance
 
 
+class AuthorCardSerializer(serializers.Serializer):
+    """
+    Compact public identity shown next to community content, rendered from
+    the card dicts of author_card_service.
+    """
+    AVATAR_SIZE = 64
+
+    id = serializers.IntegerField()
+    username = serializers.CharField()
+    avatar = serializers.SerializerMethodField()
+    role = serializers.CharField()
+    is_pro = serializers.BooleanField()
+
+    def get_avatar(self, card):
+        if not card['avatar']:
+            return None
+        return variant_url(card['avatar'], self.AVATAR_SIZE, 'webp', self.context.get('request'))
+
+def author_cards(user_ids, context=None):
+    """
+    Loads compact author cards for a set of user ids, keyed by id.
+    """
+    cards = author_card_service.load(user_ids)
+    return {user_id: AuthorCardSerializer(card, context=context).data for user_id, card in cards.items()}
+
+class AuthorCardField(serializers.Field):
+    """
+    Renders a user id as an author card, read from the `authors` map that
+    AuthorCardListSerializer fills for a whole list. A lone object loads its own.
+    """
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, user_id):
+        authors = self.context.get('authors')
+        if authors is None or user_id not in authors:
+            return author_cards([user_id], self.context).get(user_id)
+        return authors[user_id]
+
+class AuthorCardListSerializer(serializers.ListSerializer):
+    """
+    Resolves the cards of every AuthorCardField in the list in one batch
+    before the items are rendered.
+    """
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, 'all') else data)
+        fields = [field for field in self.child.fields.values() if isinstance(field, AuthorCardField)]
+        user_ids = {field.get_attribute(item) for field in fields for item in items}
+        authors = self.context.setdefault('authors', {})
+        authors.update(author_cards(user_ids - authors.keys(), self.context))
+        return super().to_representation(items)
+
 class DiscussionReplySerializer(serializers.ModelSerializer):
-    author = UserSerializer(read_only=True)
-    likes_count = serializers.IntegerField(source='liked_by.count', read_only=True)
+    author = AuthorCardField(source='author_id')
+    likes_count = serializers.IntegerField(source='like_count', read_only=True)
     is_liked = serializers.BooleanField(source='annotated_is_liked', read_only=True, default=False)
 
     class Meta:
         model = DiscussionReply
         fields = ('id', 'discussion', 'author', 'content', 'created_at', 'likes_count', 'is_liked')
         read_only_fields = ('discussion', 'author', 'created_at')
+        list_serializer_class = AuthorCardListSerializer
 
 class DiscussionSerializer(serializers.ModelSerializer):
-    author = UserSerializer(read_only=True)
-    replies = DiscussionReplySerializer(many=True, read_only=True)
-    replies_count = serializers.IntegerField(source='annotated_replies_count', read_only=True, default=0)
+    author = AuthorCardField(source='author_id')
+    likes_count = serializers.IntegerField(source='like_count', read_only=True)
+    replies_count = serializers.IntegerField(source='reply_count', read_only=True)
     is_liked = serializers.BooleanField(source='annotated_is_liked', read_only=True, default=False)
     course_name = serializers.CharField(source='course.title', read_only=True, allow_null=True)
 
     class Meta:
         model = Discussion
-        fields = ('id', 'title', 'content', 'author', 'course', 'course_name', 'created_at', 'likes_count', 'is_liked', 'replies', 'replies_count', 'is_resolved')
-        read_only_fields = ('author', 'created_at', 'replies')
+        fields = ('id', 'title', 'content', 'author', 'course', 'course_name', 'created_at', 'likes_count', 'is_liked', 'replies_count', 'is_resolved')
+        read_only_fields = ('author', 'created_at')
+        list_serializer_class = AuthorCardListSerializer
+
+
+class DiscussionSummarySerializer(serializers.ModelSerializer):
+    """
+    Forum index representation: no replies, an excerpt instead of the full content.
+    Expects annotated excerpt/last_reply_* values.
+    """
+    author = AuthorCardField(source='author_id')
+    excerpt = serializers.ReadOnlyField()
+    likes_count = serializers.IntegerField(source='like_count', read_only=True)
+    replies_count = serializers.IntegerField(source='reply_count', read_only=True)
+    is_liked = serializers.BooleanField(source='annotated_is_liked', read_only=True, default=False)
+    course_name = serializers.CharField(source='course.title', read_only=True, allow_null=True)
+    last_reply_at = serializers.DateTimeField(read_only=True)
+    last_reply_author = AuthorCardField(source='last_reply_author_id')
 
+    class Meta:
+        model = Discussion
+        fields = ('id', 'title', 'excerpt', 'author', 'course', 'course_name', 'created_at', 'likes_count', 'is_liked', 'replies_count', 'last_reply_at', 'last_reply_author', 'is_resolved')
+        list_serializer_class = AuthorCardListSerializer
 
 class AssignmentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -369,6 +465,46 @@ class OrderSerializer(serializers.ModelSerializer):
     def __str__(self):
         return f"Order {self.id} - {self.user.username} - {self.status}"
 
+class EarningsEntrySerializer(serializers.ModelSerializer):
+    course_title = serializers.ReadOnlyField(source='course.title')
+
+    class Meta:
+        model = EarningsEntry
+        fields = ('id', 'order', 'course', 'course_title', 'gross_amount', 'platform_fee', 'net_amount', 'balance_after', 'created_at')
+
+class ActivityEventSerializer(serializers.ModelSerializer):
+    time = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ActivityEvent
+        fields = ('id', 'type', 'title', 'description', 'link', 'time', 'created_at')
+
+    def get_time(self, obj):
+        from django.utils import timezone
+        from django.utils.timesince import timesince
+        return timesince(obj.created_at, timezone.now()) + " ago"
+
+class InboxTaskSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source='key')
+    time = serializers.SerializerMethodField()
+
+    class Meta:
+        model = InboxTask
+        fields = ('id', 'kind', 'type', 'urgency', 'title', 'description', 'link', 'time')
+
+    def get_time(self, obj):
+        return (obj.expires_at or obj.visible_from).strftime("%b %d")
+
+class AnnouncementSerializer(serializers.ModelSerializer):
+    course_title = serializers.ReadOnlyField(source='course.title')
+    author_name = serializers.ReadOnlyField(source='author.username')
+    notify = serializers.BooleanField(write_only=True, default=True)
+
+    class Meta:
+        model = Announcement
+        fields = ('id', 'course', 'course_title', 'author', 'author_name', 'title', 'body', 'created_at', 'notify')
+        read_only_fields = ('course', 'author', 'created_at')
+
 class MessageSerializer(serializers.ModelSerializer):
     sender_name = serializers.ReadOnlyField(source='sender.username')
     sender_avatar = serializers.SerializerMethodField()
@@ -391,48 +527,47 @@ class MessageSerializer(serializers.ModelSerializer):
         return False
 
 class ConversationSerializer(serializers.ModelSerializer):
+    """
+    Inbox row built from the stored summary. List views annotate `unread`
+    and prefetch participants so rows cost no extra queries.
+    """
     participant_name = serializers.SerializerMethodField()
     participant_avatar = serializers.SerializerMethodField()
-    last_message = serializers.SerializerMethodField()
+    last_message = serializers.CharField(source='last_message_preview', read_only=True)
     last_message_time = serializers.SerializerMethodField()
     unread_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Conversation
-        fields = ('id', 'participants', 'participant_name', 'participant_avatar', 'last_message', 'last_message_time', 'unread_count', 'updated_at')
-        read_only_fields = ('participants', 'updated_at')
+        fields = ('id', 'participants', 'participant_name', 'participant_avatar', 'last_message', 'last_message_id', 'last_message_at', 'last_message_time', 'unread_count', 'updated_at')
+        read_only_fields = ('participants', 'updated_at', 'last_message_at')
 
-    def get_participant_name(self, obj):
+    def _other_participant(self, obj):
         request = self.context.get('request')
         if request and request.user:
-            other_user = obj.participants.exclude(id=request.user.id).first()
-            if other_user:
-                return other_user.username
-        return "Unknown"
+            return next((user for user in obj.participants.all() if user.id != request.user.id), None)
+        return None
+
+    def get_participant_name(self, obj):
+        other_user = self._other_participant(obj)
+        return other_user.username if other_user else "Unknown"
 
     def get_participant_avatar(self, obj):
-        request = self.context.get('request')
-        if request and request.user:
-            other_user = obj.participants.exclude(id=request.user.id).first()
-            if other_user and other_user.avatar:
-                return other_user.avatar.url
+        other_user = self._other_participant(obj)
+        if other_user and other_user.avatar:
+            return other_user.avatar.url
         return None
 
-    def get_last_message(self, obj):
-        last_msg = obj.messages.first() # Ordered by -created_at in model? No, model is created_at asc.
-        # Wait, Message model ordering is ['created_at'], so .last() or .order_by('-created_at').first()
-        last_msg = obj.messages.order_by('-created_at').first()
-        return last_msg.content if last_msg else ""
-
     def get_last_message_time(self, obj):
-        last_msg = obj.messages.order_by('-created_at').first()
-        if last_msg:
+        if obj.last_message_at:
             from django.utils.timesince import timesince
-            return timesince(last_msg.created_at).split(',')[0] + " ago"
+            return timesince(obj.last_message_at).split(',')[0] + " ago"
         return ""
 
     def get_unread_count(self, obj):
+        if hasattr(obj, 'unread'):
+            return obj.unread
         request = self.context.get('request')
         if request and request.user:
-            return obj.messages.filter(is_read=False).exclude(sender=request.user).count()
+            return obj.memberships.filter(user=request.user).values_list('unread_count', flat=True).first() or 0
         return 0
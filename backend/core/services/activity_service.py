@@ -0,0 +1,106 @@
+from ..models import ActivityEvent
+
+BATCH_SIZE = 1000
+
+
+def record(events):
+    """
+    Appends activity events in a single bulk insert.
+    """
+    if events:
+        ActivityEvent.objects.bulk_create(events, batch_size=BATCH_SIZE)
+
+
+def enrollment_events(enrollment):
+    course = enrollment.course
+    return [
+        ActivityEvent(
+            user_id=course.instructor_id,
+            type='alert',
+            title='New Student Enrolled',
+            description=f"{enrollment.user.username} joined {course.title}",
+            link=f"/courses/{course.id}",
+            created_at=enrollment.enrolled_at
+        ),
+        ActivityEvent(
+            user_id=enrollment.user_id,
+            type='alert',
+            title='Course Started',
+            description=f"You enrolled in {course.title}",
+            link=f"/learn/{course.id}",
+            created_at=enrollment.enrolled_at
+        ),
+    ]
+
+
+def quiz_attempt_events(attempt):
+    quiz = attempt.quiz
+    course = quiz.lesson.section.course
+    events = [
+        ActivityEvent(
+            user_id=attempt.user_id,
+            type='completion',
+            title='Quiz Completed',
+            description=f"You scored {attempt.score}/{attempt.total_questions} on {quiz.title}",
+            link=f"/learn/{course.id}",
+            created_at=attempt.completed_at
+        ),
+    ]
+    if course.instructor_id != attempt.user_id:
+        events.append(ActivityEvent(
+            user_id=course.instructor_id,
+            type='completion',
+            title='Quiz Completed',
+            description=f"{attempt.user.username} scored {attempt.score}/{attempt.total_questions} on {quiz.title}",
+            link=f"/courses/{course.id}",
+            created_at=attempt.completed_at
+        ))
+    return events
+
+
+def reply_events(reply):
+    discussion = reply.discussion
+    audience = {discussion.author_id}
+    if discussion.course_id:
+        audience.add(discussion.course.instructor_id)
+    audience.discard(reply.author_id)
+    return [
+        ActivityEvent(
+            user_id=user_id,
+            type='comment',
+            title='New Reply',
+            description=f'{reply.author.username} replied to "{discussion.title}"',
+            link=f"/discussions/{discussion.id}",
+            created_at=reply.created_at
+        )
+        for user_id in sorted(audience)
+    ]
+
+
+def submission_events(submission):
+    assignment = submission.assignment
+    course = assignment.lesson.section.course
+    return [
+        ActivityEvent(
+            user_id=course.instructor_id,
+            type='assignment',
+            title='Assignment Submitted',
+            description=f"{submission.student.username} submitted {assignment.title}",
+            link=f"/courses/{course.id}",
+            created_at=submission.submitted_at
+        ),
+    ]
+
+
+def grade_events(submission):
+    assignment = submission.assignment
+    return [
+        ActivityEvent(
+            user_id=submission.student_id,
+            type='assignment',
+            title='Assignment Graded',
+            description=f"You received {submission.grade}/{assignment.total_points} on {assignment.title}",
+            link=f"/learn/{assignment.lesson.section.course_id}",
+            created_at=submission.graded_at
+        ),
+    ]
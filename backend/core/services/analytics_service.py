@@ -0,0 +1,177 @@
+import datetime
+from django.db.models import Sum, Avg, Count
+from django.db.models.functions import TruncDay, TruncWeek, TruncMonth
+from django.utils import timezone
+from ..models import Enrollment, Assignment, CourseDailyStats, EarningsEntry, InstructorBalance
+
+GRANULARITIES = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+DEFAULT_WINDOW_DAYS = 7
+MAX_BUCKETS = 370
+
+
+class AnalyticsQueryError(ValueError):
+    pass
+
+
+def parse_window(params):
+    """
+    Reads start/end (YYYY-MM-DD), granularity and course from query params.
+    Defaults to the last 7 days, bucketed by day.
+    """
+    granularity = params.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        raise AnalyticsQueryError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+
+    try:
+        today = timezone.localdate()
+        end = datetime.date.fromisoformat(params['end']) if params.get('end') else today
+        start = datetime.date.fromisoformat(params['start']) if params.get('start') else end - datetime.timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+    except ValueError:
+        raise AnalyticsQueryError("start and end must be dates in YYYY-MM-DD format")
+    if start > end:
+        raise AnalyticsQueryError("start must be before end")
+
+    course_id = params.get('course')
+    if course_id is not None and not str(course_id).isdigit():
+        raise AnalyticsQueryError("course must be a course id")
+
+    buckets = bucket_starts(start, end, granularity)
+    if len(buckets) > MAX_BUCKETS:
+        raise AnalyticsQueryError(f"Window too large: at most {MAX_BUCKETS} {granularity} buckets")
+    return start, end, granularity, int(course_id) if course_id else None
+
+
+def _truncate(date, granularity):
+    if granularity == 'week':
+        return date - datetime.timedelta(days=date.weekday())
+    if granularity == 'month':
+        return date.replace(day=1)
+    return date
+
+
+def bucket_starts(start, end, granularity):
+    buckets = []
+    current = _truncate(start, granularity)
+    while current <= end:
+        buckets.append(current)
+        if granularity == 'day':
+            current += datetime.timedelta(days=1)
+        elif granularity == 'week':
+            current += datetime.timedelta(days=7)
+        else:
+            current = (current.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return buckets
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime.datetime) else value
+
+
+def _bucket_label(bucket, granularity, bucket_count):
+    if granularity == 'month':
+        return bucket.strftime('%b %Y')
+    if granularity == 'day' and bucket_count <= 7:
+        return bucket.strftime('%a')
+    return bucket.strftime('%b %d')
+
+
+def instructor_analytics(instructor, start, end, granularity='day', course_id=None):
+    """
+    Builds the analytics dashboard from CourseDailyStats rollups in a constant
+    number of grouped queries. Pass instructor=None for platform-wide figures.
+    """
+    trunc = GRANULARITIES[granularity]
+
+    enrollments = Enrollment.objects.all()
+    assignments = Assignment.objects.all()
+    rollups = CourseDailyStats.objects.all()
+    if instructor is not None:
+        enrollments = enrollments.filter(course__instructor=instructor)
+        assignments = assignments.filter(lesson__section__course__instructor=instructor)
+        rollups = rollups.filter(course__instructor=instructor)
+    if course_id:
+        enrollments = enrollments.filter(course_id=course_id)
+        assignments = assignments.filter(lesson__section__course_id=course_id)
+        rollups = rollups.filter(course_id=course_id)
+
+    # Current-state figures that cannot be rolled up by day
+    totals = enrollments.aggregate(
+        total_students=Count('user', distinct=True),
+        avg_progress=Avg('progress')
+    )
+    total_assignments = assignments.count()
+
+    # Earnings come from the ledger: a balance lookup, or an indexed sum per course
+    if course_id:
+        entries = EarningsEntry.objects.filter(course_id=course_id)
+        if instructor is not None:
+            entries = entries.filter(instructor=instructor)
+        total_revenue = entries.aggregate(total=Sum('net_amount'))['total'] or 0
+    elif instructor is not None:
+        total_revenue = InstructorBalance.objects.filter(instructor=instructor).values_list('net_total', flat=True).first() or 0
+    else:
+        total_revenue = InstructorBalance.objects.aggregate(total=Sum('net_total'))['total'] or 0
+
+    bucket_rows = rollups.filter(date__gte=start, date__lte=end).annotate(
+        bucket=trunc('date')
+    ).values('bucket').annotate(
+        enrollments=Sum('new_enrollments'),
+        revenue=Sum('net_revenue'),
+        completions=Sum('lesson_completions'),
+        quiz_attempts=Sum('quiz_attempts'),
+        quiz_score_total=Sum('quiz_score_total')
+    ).order_by()
+
+    buckets = bucket_starts(start, end, granularity)
+    series = {
+        bucket: {"enrollments": 0, "revenue": 0.0, "completions": 0, "quiz_attempts": 0, "avg_quiz_score": 0}
+        for bucket in buckets
+    }
+    for row in bucket_rows:
+        point = series.get(_as_date(row['bucket']))
+        if point is not None:
+            point['enrollments'] = row['enrollments'] or 0
+            point['revenue'] = float(row['revenue'] or 0)
+            point['completions'] = row['completions'] or 0
+            point['quiz_attempts'] = row['quiz_attempts'] or 0
+            if row['quiz_attempts']:
+                point['avg_quiz_score'] = round(row['quiz_score_total'] / row['quiz_attempts'], 1)
+
+    top_courses = rollups.values('course_id', 'course__title').annotate(
+        sales=Sum('completed_orders'),
+        revenue=Sum('net_revenue')
+    ).order_by('-revenue')[:3]
+
+    return {
+        "total_revenue": float(total_revenue),
+        "total_students": totals['total_students'],
+        "total_assignments": total_assignments,
+        "avg_completion_rate": round(float(totals['avg_progress'] or 0), 1),
+        "granularity": granularity,
+        "start": start,
+        "end": end,
+        "series": [
+            {"date": bucket, **point} for bucket, point in series.items()
+        ],
+        "revenue_data": [
+            {
+                "name": _bucket_label(bucket, granularity, len(buckets)),
+                "revenue": point['revenue'],
+                "users": point['enrollments']
+            }
+            for bucket, point in series.items()
+        ],
+        "top_courses": [
+            {
+                "title": row['course__title'],
+                "sales": row['sales'] or 0,
+                "revenue": float(row['revenue'] or 0),
+                "growth": "+5%"
+            }
+            for row in top_courses
+        ]
+    }
@@ -0,0 +1,91 @@
+import datetime
+import logging
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from ..models import Announcement, Course, Enrollment, Notification
+from . import notification_service, worker_service
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+MAX_ATTEMPTS = 8
+RETRY_BASE = datetime.timedelta(seconds=30)
+RETRY_MAX = datetime.timedelta(hours=1)
+
+
+def visible_to(user):
+    """
+    Fan-out on read: announcements of every course the user is enrolled in or teaches.
+    """
+    return Announcement.objects.filter(
+        Q(course__in=Enrollment.objects.filter(user=user).values('course_id')) | Q(course__instructor=user)
+    )
+
+
+def can_read(course, user):
+    return course.instructor_id == user.id or Enrollment.objects.filter(course=course, user=user).exists()
+
+
+def retry_delay(attempts):
+    return min(RETRY_BASE * 2 ** max(attempts - 1, 0), RETRY_MAX)
+
+
+@worker_service.task
+def fan_out(chunk_size=CHUNK_SIZE):
+    """
+    Materializes notifications for the next chunk of enrollments of the
+    pending announcement that is due first. Students who enroll later still
+    see it on read. A failing chunk moves the announcement back by its
+    backoff, so it never holds up the others, and is given up after
+    MAX_ATTEMPTS.
+    """
+    with transaction.atomic():
+        announcement = Announcement.objects.select_for_update(skip_locked=True).filter(
+            fanout_pending=True, fanout_next_attempt_at__lte=timezone.now()
+        ).order_by('fanout_next_attempt_at', 'id').first()
+        if announcement is None:
+            return 0
+        try:
+            with transaction.atomic():
+                recipients = _deliver_chunk(announcement, chunk_size)
+        except Exception as e:
+            logger.exception(f"Announcement {announcement.id} fan-out failed")
+            announcement.fanout_attempts += 1
+            announcement.fanout_error = str(e)
+            announcement.fanout_next_attempt_at = timezone.now() + retry_delay(announcement.fanout_attempts)
+            if announcement.fanout_attempts >= MAX_ATTEMPTS:
+                announcement.fanout_pending = False
+                logger.warning(f"Announcement {announcement.id} fan-out gave up after {announcement.fanout_attempts} attempts: {e}")
+            announcement.save(update_fields=['fanout_pending', 'fanout_attempts', 'fanout_error', 'fanout_next_attempt_at'])
+            return 0
+        if recipients:
+            announcement.fanout_cursor = recipients[-1][0]
+        announcement.fanout_pending = len(recipients) == chunk_size
+        announcement.fanout_attempts = 0
+        announcement.fanout_error = ''
+        announcement.save(update_fields=['fanout_cursor', 'fanout_pending', 'fanout_attempts', 'fanout_error'])
+    return len(recipients)
+
+
+def _deliver_chunk(announcement, chunk_size):
+    recipients = list(
+        Enrollment.objects.filter(
+            course_id=announcement.course_id,
+            id__gt=announcement.fanout_cursor,
+            enrolled_at__lte=announcement.created_at
+        ).order_by('id').values_list('id', 'user_id')[:chunk_size]
+    )
+    if recipients:
+        course_title = Course.objects.filter(pk=announcement.course_id).values_list('title', flat=True).first()
+        notification_service.deliver([
+            Notification(
+                user_id=user_id,
+                type='course',
+                title=f"Announcement in {course_title}",
+                description=announcement.title,
+                link=f"/learn/{announcement.course_id}"
+            )
+            for _, user_id in recipients
+        ])
+    return recipients
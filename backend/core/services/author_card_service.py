@@ -0,0 +1,31 @@
+from django.core.cache import cache
+from ..models import User
+
+CARD_FIELDS = ('id', 'username', 'avatar', 'role', 'is_pro')
+CARD_TIMEOUT = 5 * 60
+
+
+def _card_key(user_id):
+    return f"author-card:{user_id}"
+
+
+def load(user_ids):
+    """
+    Returns {user_id: card} for the given ids. Cards come from the cache,
+    and all misses are read together in one query and cached again.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id}
+    if not user_ids:
+        return {}
+    cached = cache.get_many([_card_key(user_id) for user_id in user_ids])
+    cards = {card['id']: card for card in cached.values()}
+    missing = user_ids - cards.keys()
+    if missing:
+        loaded = {row['id']: row for row in User.objects.filter(pk__in=missing).values(*CARD_FIELDS)}
+        cache.set_many({_card_key(user_id): card for user_id, card in loaded.items()}, CARD_TIMEOUT)
+        cards.update(loaded)
+    return cards
+
+
+def invalidate(user_id):
+    cache.delete(_card_key(user_id))
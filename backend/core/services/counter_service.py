@@ -0,0 +1,55 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from ..models import Discussion, DiscussionReply
+
+LIKE_FIELDS = {
+    Discussion: 'discussion',
+    DiscussionReply: 'discussionreply',
+}
+
+
+def refresh_like_counts(model, pks=None):
+    """
+    Recomputes like_count for the given rows (all rows when pks is None)
+    in a single UPDATE ... SET like_count = (SELECT COUNT(*) ...).
+    """
+    rows = model.objects.all()
+    if pks is not None:
+        if not pks:
+            return
+        rows = rows.filter(pk__in=pks)
+    field = LIKE_FIELDS[model]
+    likes = model.liked_by.through.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(
+        total=Count('pk')
+    ).values('total')
+    rows.update(like_count=Coalesce(Subquery(likes), 0))
+
+
+def add_replies(discussion_id, delta):
+    Discussion.objects.filter(pk=discussion_id).update(reply_count=F('reply_count') + delta)
+
+
+
+def toggle_like(model, pk, user):
+    """
+    Likes or unlikes a discussion/reply for a user: one through-row insert or
+    delete plus an F() counter update, in a single transaction.
+    Returns (like_count, is_liked). Raises model.DoesNotExist for unknown rows.
+    """
+    field = LIKE_FIELDS[model]
+    through = model.liked_by.through
+    with transaction.atomic():
+        # Locks the target row; concurrent toggles on it queue here
+        if not model.objects.filter(pk=pk).select_for_update().exists():
+            raise model.DoesNotExist
+        deleted, _ = through.objects.filter(**{f'{field}_id': pk, 'user_id': user.id}).delete()
+        if deleted:
+            is_liked = False
+            model.objects.filter(pk=pk).update(like_count=F('like_count') - 1)
+        else:
+            through.objects.create(**{f'{field}_id': pk, 'user_id': user.id})
+            is_liked = True
+            model.objects.filter(pk=pk).update(like_count=F('like_count') + 1)
+        like_count = model.objects.filter(pk=pk).values_list('like_count', flat=True).get()
+    return like_count, is_liked
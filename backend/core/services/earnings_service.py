@@ -0,0 +1,60 @@
+import logging
+from decimal import Decimal, ROUND_HALF_UP
+from django.conf import settings
+from django.db import transaction
+from ..models import Order, EarningsEntry, InstructorBalance
+from . import rollup_service
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal('0.01')
+
+
+def split_amount(gross_amount):
+    """
+    Splits a gross order amount into (platform_fee, net_amount).
+    """
+    gross_amount = Decimal(gross_amount)
+    fee = (gross_amount * settings.PLATFORM_FEE_RATE).quantize(CENT, rounding=ROUND_HALF_UP)
+    return fee, gross_amount - fee
+
+
+def record_order_earnings(order):
+    """
+    Writes the ledger entry for a completed order and updates the instructor's
+    running balance. Idempotent: calling it twice for the same order is a no-op.
+    """
+    with transaction.atomic():
+        # Lock the order so concurrent confirmations (IPN + return URL) serialize here
+        order = Order.objects.select_for_update().select_related('course').get(pk=order.pk)
+        if order.status != 'completed':
+            return None
+
+        existing = EarningsEntry.objects.filter(order=order).first()
+        if existing:
+            return existing
+
+        instructor_id = order.course.instructor_id
+        balance, _ = InstructorBalance.objects.get_or_create(instructor_id=instructor_id)
+        balance = InstructorBalance.objects.select_for_update().get(pk=balance.pk)
+
+        fee, net = split_amount(order.amount)
+        balance.gross_total += order.amount
+        balance.fees_total += fee
+        balance.net_total += net
+        balance.sales_count += 1
+        balance.save()
+
+        entry = EarningsEntry.objects.create(
+            instructor_id=instructor_id,
+            order=order,
+            course_id=order.course_id,
+            gross_amount=order.amount,
+            platform_fee=fee,
+            net_amount=net,
+            balance_after=balance.net_total
+        )
+        rollup_service.bump(order.course_id, order.created_at, net_revenue=net)
+
+    logger.info(f"Recorded earnings for Order {order.id}: net {net} to instructor {instructor_id}")
+    return entry
@@ -0,0 +1,357 @@
+import asyncio
+import datetime
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.db import connection, transaction
+from django.utils import timezone
+from ..models import StreamEvent
+from . import worker_service
+
+BUFFER_SIZE = 200
+BATCH_SIZE = 500
+POLL_INTERVAL = 1.0
+KEEPALIVE_INTERVAL = 15.0
+STREAM_LIFETIME = 5 * 60
+RETRY_MS = 3000
+RETENTION = datetime.timedelta(hours=1)
+# How long an id skipped by the poller is re-checked, in case its row commits late
+GAP_WINDOW = 10.0
+MAX_GAPS = 1000
+TICKET_SALT = 'event-stream'
+TICKET_MAX_AGE = 60
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    One open stream: its user, its position in the hub's delivery order and
+    the flag the hub sets, from any thread, to wake it on the event loop.
+    """
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.seq = 0
+        self._loop = asyncio.get_running_loop()
+        self._flag = asyncio.Event()
+
+    def wake(self):
+        try:
+            self._loop.call_soon_threadsafe(self._flag.set)
+        except RuntimeError:
+            # The stream's loop is gone
+            pass
+
+    async def wait(self, backend, timeout):
+        events = backend.take(self)
+        if not events:
+            self._flag.clear()
+            try:
+                await asyncio.wait_for(self._flag.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            events = backend.take(self)
+        return events
+
+
+class MemoryBackend:
+    """
+    In-process hub: a bounded buffer per user, read by subscriptions in
+    delivery order. Only reaches subscribers in the same process.
+    """
+    buffer_all_users = True
+
+    def __init__(self, buffer_size=BUFFER_SIZE):
+        self._lock = threading.Lock()
+        self._events = defaultdict(lambda: deque(maxlen=buffer_size))
+        self._subscriptions = defaultdict(set)
+        self._seq = 0
+        self._last_id = 0
+
+    def publish(self, events):
+        def deliver():
+            with self._lock:
+                rows = []
+                for user_id, kind, data in events:
+                    self._last_id += 1
+                    rows.append((self._last_id, user_id, kind, data))
+            self._deliver(rows)
+        transaction.on_commit(deliver)
+
+    def _deliver(self, rows):
+        woken = set()
+        with self._lock:
+            for event_id, user_id, kind, data in rows:
+                if self.buffer_all_users or user_id in self._subscriptions:
+                    self._seq += 1
+                    self._events[user_id].append((self._seq, event_id, kind, data))
+                    woken.update(self._subscriptions.get(user_id, ()))
+        for subscription in woken:
+            subscription.wake()
+
+    def latest_id(self, user_id):
+        return self._last_id
+
+    def subscribe(self, subscription, after_id):
+        """
+        Registers a stream and returns the events it missed after after_id.
+        """
+        with self._lock:
+            self._subscriptions[subscription.user_id].add(subscription)
+            subscription.seq = self._seq
+            if after_id > self._last_id:
+                # Id from before a restart: replay what is still buffered
+                after_id = 0
+            return [
+                (event_id, kind, data) for _, event_id, kind, data in self._events.get(subscription.user_id, ())
+                if event_id > after_id
+            ]
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_id]
+                if not self.buffer_all_users:
+                    self._events.pop(subscription.user_id, None)
+
+    def take(self, subscription):
+        """
+        Returns the events delivered to the subscription's user since it last looked.
+        """
+        with self._lock:
+            events = [event for event in self._events.get(subscription.user_id, ()) if event[0] > subscription.seq]
+            if events:
+                subscription.seq = events[-1][0]
+        return [(event_id, kind, data) for _, event_id, kind, data in events]
+
+    def watch(self):
+        """
+        Makes sure new events reach this process's subscriptions.
+        """
+
+
+class DatabaseBackend(MemoryBackend):
+    """
+    Shared hub for several web processes and the worker: events are rows in
+    StreamEvent, inserted once the publisher commits. A single poller thread
+    per process reads new rows for every user and wakes the subscribed
+    streams, so the query rate does not grow with the number of streams.
+    Ids the poller skipped are re-checked for GAP_WINDOW seconds, so a row
+    that commits after a higher id is still delivered.
+    """
+    buffer_all_users = False
+
+    def __init__(self, buffer_size=BUFFER_SIZE):
+        super().__init__(buffer_size)
+        self._last_id = None
+        self._gaps = {}
+        self._poller = None
+
+    def publish(self, events):
+        rows = [StreamEvent(user_id=user_id, kind=kind, data=data) for user_id, kind, data in events]
+        # Written after the publisher's commit, in a short transaction of its own,
+        # so ids become visible nearly in order
+        transaction.on_commit(lambda: StreamEvent.objects.bulk_create(rows, batch_size=BATCH_SIZE))
+
+    def latest_id(self, user_id):
+        return StreamEvent.objects.filter(user_id=user_id).order_by('-id').values_list('id', flat=True).first() or 0
+
+    def subscribe(self, subscription, after_id):
+        latest = StreamEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        with self._lock:
+            if self._last_id is None:
+                self._last_id = latest
+        super().subscribe(subscription, 0)
+        # Rows older than the poller's cursor are replayed from the table
+        return list(
+            StreamEvent.objects.filter(user_id=subscription.user_id, id__gt=after_id)
+            .order_by('id').values_list('id', 'kind', 'data')[:BATCH_SIZE]
+        )
+
+    def watch(self):
+        with self._lock:
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, name='event-stream-poller', daemon=True)
+                self._poller.start()
+
+    def _scan(self, cursor, gaps):
+        columns = ('id', 'user_id', 'kind', 'data')
+        rows = list(StreamEvent.objects.filter(id__gt=cursor).order_by('id').values_list(*columns)[:BATCH_SIZE])
+        if gaps:
+            rows += StreamEvent.objects.filter(id__in=list(gaps)).values_list(*columns)
+        return rows
+
+    def _poll(self):
+        try:
+            while True:
+                with self._lock:
+                    if not self._subscriptions:
+                        self._poller = None
+                        self._last_id = None
+                        self._gaps = {}
+                        return
+                if self._poll_once() < BATCH_SIZE:
+                    time.sleep(POLL_INTERVAL)
+        finally:
+            connection.close()
+
+    def _poll_once(self):
+        with self._lock:
+            cursor, gaps = self._last_id, dict(self._gaps)
+        try:
+            rows = self._scan(cursor, gaps)
+        except Exception:
+            logger.exception("Event stream poll failed")
+            connection.close()
+            return 0
+        now = time.monotonic()
+        gaps = {event_id: expiry for event_id, expiry in gaps.items() if expiry > now}
+        expected = cursor + 1
+        for row in rows:
+            event_id = row[0]
+            if event_id > cursor:
+                for missing in range(expected, min(event_id, expected + MAX_GAPS)):
+                    gaps[missing] = now + GAP_WINDOW
+                expected = event_id + 1
+            gaps.pop(event_id, None)
+        with self._lock:
+            self._last_id = max(cursor, expected - 1)
+            self._gaps = dict(list(gaps.items())[-MAX_GAPS:])
+        self._deliver(rows)
+        return len(rows)
+
+
+BACKENDS = {
+    'memory': MemoryBackend,
+    'database': DatabaseBackend,
+}
+_backends = {}
+_lock = threading.Lock()
+
+
+def get_backend():
+    name = settings.EVENT_STREAM_BACKEND
+    with _lock:
+        if name not in _backends:
+            _backends[name] = BACKENDS[name]()
+        return _backends[name]
+
+
+def publish(events):
+    """
+    Pushes (user_id, kind, data) events to the users' open streams.
+    """
+    if events:
+        get_backend().publish(events)
+
+
+def format_event(event_id, kind, data):
+    return f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def parse_event_id(value):
+    return int(value) if value and value.isdigit() else None
+
+
+class StreamsExhausted(Exception):
+    pass
+
+
+_open_streams = 0
+
+
+class Stream:
+    """
+    Server-Sent Events for a user as an async iterator, resuming after
+    last_event_id when given. Waiting costs no thread, so an ASGI process
+    holds up to EVENT_STREAM_MAX_CONNECTIONS streams; the slot and the
+    subscription are released when the response is closed. Streams end
+    after `lifetime` seconds so the client reconnects with a fresh ticket.
+    """
+    def __init__(self, user_id, last_event_id=None, lifetime=STREAM_LIFETIME):
+        global _open_streams
+        with _lock:
+            if _open_streams >= settings.EVENT_STREAM_MAX_CONNECTIONS:
+                raise StreamsExhausted()
+            _open_streams += 1
+        self._backend = get_backend()
+        self._subscription = Subscription(user_id)
+        self._events = self._generate(last_event_id, lifetime)
+        self._closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._events.__anext__()
+
+    async def _generate(self, last_event_id, lifetime):
+        backend, subscription = self._backend, self._subscription
+        if last_event_id is None:
+            last_event_id = await sync_to_async(backend.latest_id)(subscription.user_id)
+        events = await sync_to_async(backend.subscribe)(subscription, last_event_id)
+        deadline = time.monotonic() + lifetime
+        # Replayed rows may also reach the buffer; send each id once
+        sent = deque(maxlen=BUFFER_SIZE)
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            for event_id, kind, data in events:
+                if event_id not in sent:
+                    sent.append(event_id)
+                    yield format_event(event_id, kind, data)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            backend.watch()
+            events = await subscription.wait(backend, min(KEEPALIVE_INTERVAL, remaining))
+            if not events:
+                yield ": keepalive\n\n"
+
+    def close(self):
+        global _open_streams
+        if self._closed:
+            return
+        self._closed = True
+        self._backend.unsubscribe(self._subscription)
+        with _lock:
+            _open_streams -= 1
+
+
+def issue_ticket(user_id):
+    """
+    Short-lived, signed credential for opening an event stream; EventSource
+    cannot send headers, and the access token must stay out of URLs and logs.
+    """
+    return signing.dumps({'user': user_id}, salt=TICKET_SALT)
+
+
+def read_ticket(ticket):
+    try:
+        return signing.loads(ticket, salt=TICKET_SALT, max_age=TICKET_MAX_AGE)['user']
+    except (signing.BadSignature, KeyError, TypeError):
+        return None
+
+
+@worker_service.task
+def prune_events(batch_size=BATCH_SIZE):
+    """
+    Drops database events older than the resume window.
+    """
+    if settings.EVENT_STREAM_BACKEND != 'database':
+        return 0
+    ids = list(
+        StreamEvent.objects.filter(created_at__lt=timezone.now() - RETENTION)
+        .values_list('id', flat=True)[:batch_size]
+    )
+    if ids:
+        StreamEvent.objects.filter(id__in=ids).delete()
+    return len(ids)
@@ -0,0 +1,173 @@
+import csv
+from ..models import Enrollment, LessonProgress, QuizAttempt, AssignmentSubmission, Order
+
+CHUNK_SIZE = 2000
+PARQUET_BATCH_SIZE = 10000
+
+
+class ExportError(ValueError):
+    pass
+
+
+# Each dataset: (queryset factory, path to the course for scoping, [(column, lookup), ...])
+DATASETS = {
+    'students': (
+        lambda: Enrollment.objects.all(),
+        'course',
+        [
+            ('enrollment_id', 'id'),
+            ('student_id', 'user_id'),
+            ('username', 'user__username'),
+            ('email', 'user__email'),
+            ('course_id', 'course_id'),
+            ('course_title', 'course__title'),
+            ('enrolled_at', 'enrolled_at'),
+            ('progress', 'progress'),
+        ],
+    ),
+    'progress': (
+        lambda: LessonProgress.objects.all(),
+        'lesson__section__course',
+        [
+            ('student_id', 'user_id'),
+            ('username', 'user__username'),
+            ('course_id', 'lesson__section__course_id'),
+            ('lesson_id', 'lesson_id'),
+            ('lesson_title', 'lesson__title'),
+            ('is_completed', 'is_completed'),
+            ('completed_at', 'completed_at'),
+        ],
+    ),
+    'quiz_scores': (
+        lambda: QuizAttempt.objects.all(),
+        'quiz__lesson__section__course',
+        [
+            ('attempt_id', 'id'),
+            ('student_id', 'user_id'),
+            ('username', 'user__username'),
+            ('course_id', 'quiz__lesson__section__course_id'),
+            ('quiz_id', 'quiz_id'),
+            ('quiz_title', 'quiz__title'),
+            ('score', 'score'),
+            ('total_questions', 'total_questions'),
+            ('completed_at', 'completed_at'),
+        ],
+    ),
+    'submissions': (
+        lambda: AssignmentSubmission.objects.all(),
+        'assignment__lesson__section__course',
+        [
+            ('submission_id', 'id'),
+            ('student_id', 'student_id'),
+            ('username', 'student__username'),
+            ('course_id', 'assignment__lesson__section__course_id'),
+            ('assignment_id', 'assignment_id'),
+            ('assignment_title', 'assignment__title'),
+            ('grade', 'grade'),
+            ('total_points', 'assignment__total_points'),
+            ('submitted_at', 'submitted_at'),
+            ('graded_at', 'graded_at'),
+        ],
+    ),
+    'revenue': (
+        lambda: Order.objects.all(),
+        'course',
+        [
+            ('order_id', 'id'),
+            ('student_id', 'user_id'),
+            ('course_id', 'course_id'),
+            ('course_title', 'course__title'),
+            ('status', 'status'),
+            ('amount', 'amount'),
+            ('platform_fee', 'earnings_entry__platform_fee'),
+            ('net_amount', 'earnings_entry__net_amount'),
+            ('created_at', 'created_at'),
+        ],
+    ),
+}
+
+
+def export_rows(dataset, instructor=None, course_id=None):
+    """
+    Returns (header, row iterator) for a dataset. Rows are tuples streamed from
+    a server-side cursor, so memory stays flat whatever the table size.
+    Pass instructor=None for a platform-wide export.
+    """
+    if dataset not in DATASETS:
+        raise ExportError(f"Unknown dataset. Choose one of: {', '.join(DATASETS)}")
+
+    factory, course_path, columns = DATASETS[dataset]
+    queryset = factory()
+    if instructor is not None:
+        queryset = queryset.filter(**{f'{course_path}__instructor': instructor})
+    if course_id:
+        queryset = queryset.filter(**{f'{course_path}_id': course_id})
+
+    header = [name for name, _ in columns]
+    rows = queryset.order_by('pk').values_list(*[lookup for _, lookup in columns]).iterator(chunk_size=CHUNK_SIZE)
+    return header, rows
+
+
+class Echo:
+    """
+    File-like object whose write() returns the value, so csv.writer output can be yielded.
+    """
+    def write(self, value):
+        return value
+
+
+def iter_csv(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _stable_schema(pa, schema):
+    """
+    Widens types inferred from the first batch so later batches still fit:
+    decimals get full precision and all-null columns become strings.
+    """
+    fields = []
+    for field in schema:
+        if pa.types.is_decimal(field.type):
+            field = field.with_type(pa.decimal128(38, field.type.scale))
+        elif pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        fields.append(field)
+    return pa.schema(fields)
+
+
+def write_parquet(header, rows, output, batch_size=PARQUET_BATCH_SIZE):
+    """
+    Writes rows to a Parquet file in record batches. Requires the optional pyarrow package.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Parquet export requires the 'pyarrow' package")
+
+    writer = None
+    batch = []
+
+    def flush():
+        nonlocal writer
+        columns = list(zip(*batch))
+        table = pa.table({name: pa.array(list(values)) for name, values in zip(header, columns)})
+        if writer is None:
+            writer = pq.ParquetWriter(output, _stable_schema(pa, table.schema))
+        writer.write_table(table.cast(writer.schema))
+        batch.clear()
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    if writer is None:
+        pq.write_table(pa.table({name: pa.array([], type=pa.null()) for name in header}), output)
+    else:
+        writer.close()
@@ -0,0 +1,147 @@
+import datetime
+import numpy as np
+from django.core.cache import cache
+from django.db.models import F
+from ..models import FunnelVersion, Lesson, Enrollment, LessonProgress
+
+CACHE_TIMEOUT = 60 * 60 * 24
+WEEK_SECONDS = 7 * 24 * 60 * 60
+
+
+def invalidate(course_id):
+    """
+    Marks cached funnel results of a course as stale; called when progress arrives.
+    The version lives in the database so every process sees the bump.
+    """
+    if course_id and not FunnelVersion.objects.filter(course_id=course_id).update(version=F('version') + 1):
+        # Concurrent first bumps may collapse into one; any change invalidates
+        FunnelVersion.objects.bulk_create([FunnelVersion(course_id=course_id, version=1)], ignore_conflicts=True)
+
+
+def course_funnel(course_id):
+    """
+    Returns cohort retention and lesson drop-off for a course, cached until
+    the next enrollment or lesson completion in that course.
+    """
+    version = FunnelVersion.objects.filter(course_id=course_id).values_list('version', flat=True).first() or 0
+    key = f"funnel:{course_id}:{version}"
+    result = cache.get(key)
+    if result is None:
+        result = compute_funnel(course_id)
+        cache.set(key, result, CACHE_TIMEOUT)
+    return result
+
+
+def _timestamps(values):
+    return np.fromiter((value.timestamp() for value in values), dtype=np.float64, count=len(values))
+
+
+def compute_funnel(course_id):
+    lessons = list(
+        Lesson.objects.filter(section__course_id=course_id)
+        .order_by('section__order', 'order', 'id')
+        .values_list('id', 'title')
+    )
+    n_lessons = len(lessons)
+
+    enrollment_rows = list(Enrollment.objects.filter(course_id=course_id).values_list('user_id', 'enrolled_at'))
+    n_users = len(enrollment_rows)
+    if n_users == 0:
+        return {
+            "course_id": course_id,
+            "enrollments": 0,
+            "completed": 0,
+            "median_days_to_complete": None,
+            "lessons": [{"id": lesson_id, "title": title, "position": i, "completions": 0, "reached": 0, "drop_off": 0}
+                        for i, (lesson_id, title) in enumerate(lessons)],
+            "cohorts": [],
+        }
+
+    user_ids, enrolled_at = zip(*enrollment_rows)
+    user_ids = np.fromiter(user_ids, dtype=np.int64, count=n_users)
+    enrolled_ts = _timestamps(enrolled_at)
+
+    # Dense row index per enrolled user
+    user_order = np.argsort(user_ids)
+    sorted_users = user_ids[user_order]
+
+    progress_rows = list(
+        LessonProgress.objects.filter(lesson__section__course_id=course_id, is_completed=True)
+        .values_list('user_id', 'lesson_id', 'completed_at')
+    )
+    completed = np.zeros((n_users, max(n_lessons, 1)), dtype=bool)
+    last_completion = np.full(n_users, -np.inf)
+
+    if progress_rows and n_lessons:
+        p_users, p_lessons, p_times = zip(*progress_rows)
+        p_users = np.fromiter(p_users, dtype=np.int64, count=len(p_users))
+        p_lessons = np.fromiter(p_lessons, dtype=np.int64, count=len(p_lessons))
+        p_ts = _timestamps(p_times)
+
+        # Map user ids to rows and lesson ids to positions, dropping unenrolled users
+        pos = np.searchsorted(sorted_users, p_users).clip(0, n_users - 1)
+        known = sorted_users[pos] == p_users
+        rows = user_order[pos[known]]
+
+        lesson_ids = np.fromiter((lesson_id for lesson_id, _ in lessons), dtype=np.int64, count=n_lessons)
+        lesson_order = np.argsort(lesson_ids)
+        lpos = np.searchsorted(lesson_ids[lesson_order], p_lessons[known]).clip(0, n_lessons - 1)
+        columns = lesson_order[lpos]
+
+        completed[rows, columns] = True
+        np.maximum.at(last_completion, rows, p_ts[known])
+
+    completed = completed[:, :n_lessons]
+    completions = completed.sum(axis=0)
+
+    # Furthest lesson reached: 0 = none completed, k = completed lesson k-1 (or later)
+    if n_lessons:
+        furthest = np.where(completed.any(axis=1), n_lessons - np.argmax(completed[:, ::-1], axis=1), 0)
+    else:
+        furthest = np.zeros(n_users, dtype=np.int64)
+
+    # Cohorts by enrollment week, aligned on Mondays
+    first = datetime.datetime.fromtimestamp(enrolled_ts.min(), tz=datetime.timezone.utc)
+    origin = (first - datetime.timedelta(days=first.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    cohort = ((enrolled_ts - origin.timestamp()) // WEEK_SECONDS).astype(np.int64)
+    n_cohorts = int(cohort.max()) + 1
+
+    # histogram[c, f] = students of cohort c whose furthest lesson is f
+    histogram = np.bincount(cohort * (n_lessons + 1) + furthest, minlength=n_cohorts * (n_lessons + 1))
+    histogram = histogram.reshape(n_cohorts, n_lessons + 1)
+    cohort_sizes = histogram.sum(axis=1)
+    # reached[c, k] = students of cohort c who got at least to lesson k
+    reached = np.cumsum(histogram[:, ::-1], axis=1)[:, ::-1][:, 1:]
+    overall_reached = reached.sum(axis=0)
+
+    finished = completed.all(axis=1) if n_lessons else np.zeros(n_users, dtype=bool)
+    durations = (last_completion[finished] - enrolled_ts[finished]) / 86400
+    median_days = round(float(np.median(durations)), 1) if durations.size else None
+
+    drop_off = overall_reached - np.append(overall_reached[1:], 0) if n_lessons else []
+
+    return {
+        "course_id": course_id,
+        "enrollments": n_users,
+        "completed": int(finished.sum()),
+        "median_days_to_complete": median_days,
+        "lessons": [
+            {
+                "id": lesson_id,
+                "title": title,
+                "position": i,
+                "completions": int(completions[i]),
+                "reached": int(overall_reached[i]),
+                "drop_off": int(drop_off[i]),
+            }
+            for i, (lesson_id, title) in enumerate(lessons)
+        ],
+        "cohorts": [
+            {
+                "week_start": (origin + datetime.timedelta(weeks=c)).date(),
+                "size": int(cohort_sizes[c]),
+                "retention": [round(float(value), 4) for value in reached[c] / cohort_sizes[c]],
+            }
+            for c in range(n_cohorts) if cohort_sizes[c]
+        ],
+    }
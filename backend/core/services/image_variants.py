@@ -0,0 +1,84 @@
+import io
+import os
+import logging
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+VARIANT_SIZES = (64, 256, 1024)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+# Only image fields are allowed to be resized through the public endpoint
+SOURCE_PREFIXES = ('avatars/', 'courses/')
+VARIANT_PREFIX = 'variants'
+
+
+def is_valid_source(name):
+    return bool(name) and name.startswith(SOURCE_PREFIXES) and '..' not in name.split('/')
+
+
+def variant_name(name, size, fmt):
+    stem = os.path.splitext(name)[0]
+    return f"{VARIANT_PREFIX}/{stem}/{size}.{fmt}"
+
+
+def delete_variants(name, storage=default_storage):
+    """
+    Removes every generated variant of an image, e.g. when it is replaced.
+    """
+    for size in VARIANT_SIZES:
+        for fmt in VARIANT_FORMATS:
+            target = variant_name(name, size, fmt)
+            if storage.exists(target):
+                storage.delete(target)
+
+
+def get_or_create_variant(name, size, fmt, storage=default_storage):
+    """
+    Returns the storage name of a resized variant, generating it on first use.
+    Variants are cached on disk next to each other under variants/<original>/.
+    """
+    target = variant_name(name, size, fmt)
+    if storage.exists(target):
+        return target
+
+    from PIL import Image, ImageOps
+
+    pil_format, options = VARIANT_FORMATS[fmt]
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        if pil_format == 'JPEG' and image.mode != 'RGB':
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+
+        buffer = io.BytesIO()
+        image.save(buffer, pil_format, **options)
+
+    saved = storage.save(target, ContentFile(buffer.getvalue()))
+    if saved != target:
+        # Another request generated the same variant concurrently
+        storage.delete(saved)
+    logger.info(f"Generated image variant {target}")
+    return target
+
+
+def variant_url(name, size, fmt, request=None):
+    path = reverse('image-variant', kwargs={'size': size, 'fmt': fmt, 'name': name})
+    return request.build_absolute_uri(path) if request else path
+
+
+def variant_urls(name, request=None):
+    """
+    Returns {size: {format: url}} for an image; URLs point at the lazy variant endpoint.
+    """
+    return {
+        size: {fmt: variant_url(name, size, fmt, request) for fmt in VARIANT_FORMATS}
+        for size in VARIANT_SIZES
+    }
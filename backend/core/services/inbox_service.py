@@ -0,0 +1,184 @@
+import datetime
+from django.db.models import Q, Count
+from django.utils import timezone
+from ..models import InboxTask, Enrollment, Lesson, Assignment
+from .rollup_service import course_id_for_lesson
+
+DUE_SOON = datetime.timedelta(days=3)
+STALL_AFTER = datetime.timedelta(days=7)
+UPSERT_FIELDS = ['kind', 'type', 'urgency', 'title', 'description', 'link', 'visible_from', 'expires_at']
+
+
+def open_tasks(tasks):
+    """
+    Creates tasks or refreshes the existing (user, key) rows, in one query.
+    """
+    if tasks:
+        InboxTask.objects.bulk_create(
+            tasks, update_conflicts=True, unique_fields=['user', 'key'], update_fields=UPSERT_FIELDS
+        )
+
+
+def resolve(key, user_id=None):
+    tasks = InboxTask.objects.filter(key=key)
+    if user_id is not None:
+        tasks = tasks.filter(user_id=user_id)
+    tasks.delete()
+
+
+def visible_tasks(user, limit=20):
+    now = timezone.now()
+    return InboxTask.objects.filter(user=user, visible_from__lte=now).filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gt=now)
+    )[:limit]
+
+
+# Task builders, shared by the signals and the rebuild_inbox command
+
+def discussion_task(discussion):
+    course = discussion.course
+    if course is None or discussion.author_id == course.instructor_id:
+        return None
+    return InboxTask(
+        user_id=course.instructor_id,
+        key=f"community-{discussion.id}",
+        kind='unanswered_discussion',
+        type='community',
+        urgency='high',
+        title="Unanswered Question",
+        description=f"New question in {course.title}",
+        link=f"/discussions/{discussion.id}",
+        visible_from=discussion.created_at
+    )
+
+
+def submission_task(submission):
+    assignment = submission.assignment
+    course = assignment.lesson.section.course
+    return InboxTask(
+        user_id=course.instructor_id,
+        key=f"grading-{submission.id}",
+        kind='ungraded_submission',
+        type='grading',
+        urgency='medium',
+        title="Grade Submission",
+        description=f"{submission.student.username} submitted {assignment.title}",
+        link=f"/courses/{course.id}",
+        visible_from=submission.submitted_at
+    )
+
+
+def setup_task(course):
+    return InboxTask(
+        user_id=course.instructor_id,
+        key=f"setup-{course.id}",
+        kind='course_setup',
+        type='setup',
+        urgency='low',
+        title="Complete Course Setup",
+        description=f"Add sections to '{course.title}'",
+        link=f"/courses/{course.id}",
+        visible_from=course.created_at
+    )
+
+
+def due_task(assignment, course, user_id):
+    return InboxTask(
+        user_id=user_id,
+        key=f"assignment-{assignment.id}",
+        kind='upcoming_due',
+        type='grading',
+        urgency='high',
+        title="Upcoming Deadline",
+        description=f"{assignment.title} is due soon in {course.title}",
+        link=f"/learn/{course.id}",
+        visible_from=assignment.due_date - DUE_SOON,
+        expires_at=assignment.due_date
+    )
+
+
+def stalled_task(course, user_id, last_activity):
+    return InboxTask(
+        user_id=user_id,
+        key=f"continue-{course.id}",
+        kind='stalled_course',
+        type='setup',
+        urgency='medium',
+        title="Continue Learning",
+        description=f"You were last studying {course.title}.",
+        link=f"/learn/{course.id}",
+        visible_from=last_activity + STALL_AFTER
+    )
+
+
+# Event handlers
+
+def discussion_opened(discussion):
+    task = discussion_task(discussion)
+    if task:
+        open_tasks([task])
+
+
+def submission_received(submission):
+    open_tasks([submission_task(submission)])
+    resolve(f"assignment-{submission.assignment_id}", submission.student_id)
+
+
+def course_sections_changed(course):
+    if course.sections.exists():
+        resolve(f"setup-{course.id}", course.instructor_id)
+    else:
+        open_tasks([setup_task(course)])
+
+
+def assignment_scheduled(assignment):
+    """
+    Fans a due-date reminder out to every enrolled student who has not submitted.
+    """
+    if not assignment.due_date:
+        resolve(f"assignment-{assignment.id}")
+        return
+    course = assignment.lesson.section.course
+    students = Enrollment.objects.filter(course=course).exclude(
+        user__assignment_submissions__assignment=assignment
+    ).values_list('user_id', flat=True)
+    open_tasks([due_task(assignment, course, user_id) for user_id in students])
+
+
+def enrollment_started(enrollment):
+    course = enrollment.course
+    assignments = Assignment.objects.filter(
+        lesson__section__course=course, due_date__gt=timezone.now()
+    ).exclude(submissions__student_id=enrollment.user_id)
+    tasks = [due_task(assignment, course, enrollment.user_id) for assignment in assignments]
+    tasks.append(stalled_task(course, enrollment.user_id, enrollment.enrolled_at))
+    open_tasks(tasks)
+
+
+def enrollment_ended(enrollment):
+    assignment_keys = [
+        f"assignment-{pk}" for pk in
+        Assignment.objects.filter(lesson__section__course_id=enrollment.course_id).values_list('id', flat=True)
+    ]
+    InboxTask.objects.filter(
+        user_id=enrollment.user_id, key__in=assignment_keys + [f"continue-{enrollment.course_id}"]
+    ).delete()
+
+
+def lesson_completed(user_id, lesson_id, when):
+    """
+    Pushes the student's stalled-course reminder back, or resolves it once
+    every lesson of the course is complete.
+    """
+    course_id = course_id_for_lesson(lesson_id)
+    enrollment = Enrollment.objects.filter(user_id=user_id, course_id=course_id).select_related('course').first()
+    if enrollment is None:
+        return
+    counts = Lesson.objects.filter(section__course_id=course_id).aggregate(
+        total=Count('id', distinct=True),
+        done=Count('progress', filter=Q(progress__user_id=user_id, progress__is_completed=True), distinct=True)
+    )
+    if counts['done'] >= counts['total']:
+        resolve(f"continue-{course_id}", user_id)
+    else:
+        open_tasks([stalled_task(enrollment.course, user_id, when)])
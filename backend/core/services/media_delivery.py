@@ -0,0 +1,148 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+
+SIGNING_SALT = 'core.media-delivery'
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def build_stream_url(request, name, filename=None, as_attachment=False):
+    """
+    Returns a short-lived signed URL for a stored file.
+    Access is checked once when the URL is issued; the stream endpoint only
+    verifies the signature, so video seeking does not hit the database.
+    """
+    token = signing.dumps(
+        {'n': name, 'f': filename or os.path.basename(name), 'a': as_attachment},
+        salt=SIGNING_SALT,
+        compress=True
+    )
+    return request.build_absolute_uri(reverse('media-stream', kwargs={'token': token}))
+
+
+def lesson_stream_url(request, lesson):
+    """
+    Signed URL for a lesson's uploaded video; callers check access first.
+    """
+    return build_stream_url(request, lesson.video_file.name) if lesson.video_file else None
+
+
+def resource_download_url(request, resource):
+    """
+    Signed download URL for a resource, named after its title.
+    """
+    if not resource.file:
+        return None
+    extension = os.path.splitext(resource.file.name)[1]
+    return build_stream_url(request, resource.file.name, filename=f"{resource.title}{extension}", as_attachment=True)
+
+
+def load_stream_token(token):
+    """
+    Returns the payload of a signed stream token, or None if it is invalid or expired.
+    """
+    try:
+        return signing.loads(token, salt=SIGNING_SALT, max_age=settings.MEDIA_STREAM_URL_MAX_AGE)
+    except signing.BadSignature:
+        return None
+
+
+def parse_range_header(header, size):
+    """
+    Parses a single byte range. Returns (start, end) inclusive, None when the
+    header should be ignored, or False when the range is not satisfiable.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        # Multiple ranges or unknown units: serve the whole file instead
+        return None
+
+    first, last = match.groups()
+    if first == '' and last == '':
+        return None
+    if first == '':
+        suffix = int(last)
+        if suffix == 0:
+            return False
+        return max(size - suffix, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def _iter_range(file_obj, start, length):
+    try:
+        file_obj.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = file_obj.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        file_obj.close()
+
+
+def _content_disposition(filename, as_attachment):
+    disposition = 'attachment' if as_attachment else 'inline'
+    return f"{disposition}; filename*=UTF-8''{quote(filename)}"
+
+
+def serve_file(request, name, filename=None, as_attachment=False, storage=default_storage):
+    """
+    Serves a stored file either by handing it off to the front web server
+    (X-Accel-Redirect / X-Sendfile) or with a range-aware streaming response.
+    """
+    filename = filename or os.path.basename(name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    backend = settings.MEDIA_DELIVERY_BACKEND
+
+    if backend in ('nginx', 'sendfile'):
+        response = HttpResponse(content_type=content_type)
+        if backend == 'nginx':
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(name)
+        else:
+            response['X-Sendfile'] = storage.path(name)
+        response['Content-Disposition'] = _content_disposition(filename, as_attachment)
+        return response
+
+    if not storage.exists(name):
+        return HttpResponse(status=404)
+
+    size = storage.size(name)
+    byte_range = parse_range_header(request.META.get('HTTP_RANGE'), size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    file_obj = storage.open(name, 'rb')
+    if byte_range is None:
+        # FileResponse lets the WSGI server use its file wrapper (sendfile)
+        response = FileResponse(file_obj, content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(_iter_range(file_obj, start, length), status=206, content_type=content_type)
+        response['Content-Length'] = length
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = _content_disposition(filename, as_attachment)
+    return response
@@ -0,0 +1,72 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Subquery
+from django.utils import timezone
+from ..models import Conversation, ConversationParticipant, Message
+
+PREVIEW_LENGTH = 255
+
+
+def direct_key(user_id, other_id):
+    low, high = sorted((user_id, other_id))
+    return f"{low}:{high}"
+
+
+def direct_conversation(user, other):
+    """
+    Returns (conversation, created) for the 1:1 conversation between two users.
+    The unique direct_key makes concurrent first messages converge on one row.
+    """
+    key = direct_key(user.id, other.id)
+    conversation = Conversation.objects.filter(direct_key=key).first()
+    if conversation:
+        return conversation, False
+    try:
+        with transaction.atomic():
+            conversation = Conversation.objects.create(direct_key=key)
+            conversation.participants.add(user, other)
+        return conversation, True
+    except IntegrityError:
+        return Conversation.objects.get(direct_key=key), False
+
+
+def is_participant(conversation_id, user):
+    """
+    Membership check answered from the (conversation, user) unique index.
+    """
+    return ConversationParticipant.objects.filter(conversation_id=conversation_id, user=user).exists()
+
+
+def participant_ids(conversation_id):
+    return list(ConversationParticipant.objects.filter(conversation_id=conversation_id).values_list('user_id', flat=True))
+
+
+def send_message(conversation_id, sender, content):
+    """
+    Stores a message and, in the same transaction, refreshes the conversation
+    summary and the participants' unread counters.
+    """
+    with transaction.atomic():
+        message = Message.objects.create(conversation_id=conversation_id, sender=sender, content=content)
+        Conversation.objects.filter(pk=conversation_id).update(
+            last_message=message,
+            last_message_preview=content[:PREVIEW_LENGTH],
+            last_message_at=message.created_at,
+            updated_at=timezone.now()
+        )
+        memberships = ConversationParticipant.objects.filter(conversation_id=conversation_id)
+        memberships.exclude(user=sender).update(unread_count=F('unread_count') + 1)
+        memberships.filter(user=sender).update(last_read_message=message)
+    return message
+
+
+def mark_read(conversation_id, user):
+    """
+    Marks everything the other participants sent as read and moves the
+    user's read pointer to the latest message.
+    """
+    with transaction.atomic():
+        Message.objects.filter(conversation_id=conversation_id, is_read=False).exclude(sender=user).update(is_read=True)
+        ConversationParticipant.objects.filter(conversation_id=conversation_id, user=user).update(
+            unread_count=0,
+            last_read_message_id=Subquery(Conversation.objects.filter(pk=conversation_id).values('last_message_id'))
+        )
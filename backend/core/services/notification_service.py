@@ -0,0 +1,201 @@
+import datetime
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from ..models import Notification, NotificationActor, NotificationCounter, NotificationOutbox
+from ..serializers import NotificationSerializer
+from . import event_service, worker_service
+
+COALESCE_WINDOW = datetime.timedelta(hours=6)
+BATCH_SIZE = 500
+
+
+def unread_count(user_id):
+    """
+    Returns the user's unread notification count from the stored counter.
+    """
+    return NotificationCounter.objects.filter(user_id=user_id).values_list('unread', flat=True).first() or 0
+
+
+def _add_unread(deltas):
+    """
+    Applies {user_id: delta} to the unread counters and returns their new values.
+    """
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return {}
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id) for user_id, delta in deltas.items() if delta > 0],
+        ignore_conflicts=True
+    )
+    users_by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        users_by_delta[delta].append(user_id)
+    for delta, user_ids in users_by_delta.items():
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(unread=Greatest(F('unread') + delta, 0))
+    return dict(NotificationCounter.objects.filter(user_id__in=deltas).values_list('user_id', 'unread'))
+
+
+def _unread_events(counts):
+    return [(user_id, 'unread', {'unread': count}) for user_id, count in counts.items()]
+
+
+def adjust_unread(user_id, delta):
+    event_service.publish(_unread_events(_add_unread({user_id: delta})))
+
+
+def reset_unread(user_id):
+    NotificationCounter.objects.filter(user_id=user_id).update(unread=0)
+    event_service.publish(_unread_events({user_id: 0}))
+
+
+def _announce(notifications):
+    """
+    Bumps the recipients' unread counters and pushes the new rows to their streams.
+    """
+    counts = _add_unread(Counter(notification.user_id for notification in notifications))
+    event_service.publish(
+        [(notification.user_id, 'notification', NotificationSerializer(notification).data) for notification in notifications]
+        + _unread_events(counts)
+    )
+
+
+def notify(user, type, title, description, link=None):
+    dispatch([Notification(user=user, type=type, title=title, description=description, link=link)])
+
+
+def dispatch(notifications):
+    """
+    Delivers unsaved Notification instances with one bulk insert. In outbox mode
+    they are queued in the current transaction and written later by the worker.
+    """
+    if not notifications:
+        return
+    if settings.NOTIFICATION_DELIVERY == 'outbox':
+        NotificationOutbox.objects.bulk_create([
+            NotificationOutbox(
+                user_id=notification.user_id,
+                type=notification.type,
+                title=notification.title,
+                description=notification.description,
+                link=notification.link
+            )
+            for notification in notifications
+        ], batch_size=BATCH_SIZE)
+    else:
+        deliver(notifications)
+
+
+def deliver(notifications):
+    """
+    Writes notifications immediately, whatever the delivery mode. Used by
+    the worker's own fan-out steps.
+    """
+    Notification.objects.bulk_create(notifications, batch_size=BATCH_SIZE)
+    _announce(notifications)
+
+
+@worker_service.task
+def drain_outbox(batch_size=BATCH_SIZE):
+    """
+    Moves one batch of queued intents into Notification rows. Intents are
+    deleted in the same transaction, so a crash never loses or duplicates one.
+    """
+    with transaction.atomic():
+        batch = list(NotificationOutbox.objects.select_for_update(skip_locked=True).order_by('id')[:batch_size])
+        if not batch:
+            return 0
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                user_id=intent.user_id,
+                type=intent.type,
+                title=intent.title,
+                description=intent.description,
+                link=intent.link
+            )
+            for intent in batch
+        ])
+        NotificationOutbox.objects.filter(pk__in=[intent.pk for intent in batch]).delete()
+    _announce(notifications)
+    return len(batch)
+
+
+def _actors_label(actor, count):
+    if count <= 1:
+        return actor.username
+    others = count - 1
+    return f"{actor.username} and {others} other{'s' if others > 1 else ''}"
+
+
+def _open_group(user_id, group_key, type, title, link):
+    """
+    Returns (notification, created) for the user's unread group, locked. An
+    unread group older than the window is closed and a new one started.
+    """
+    Notification.objects.filter(
+        user_id=user_id, group_key=group_key, is_read=False, created_at__lt=timezone.now() - COALESCE_WINDOW
+    ).update(group_key=None)
+    group = Notification.objects.select_for_update().filter(user_id=user_id, group_key=group_key, is_read=False)
+    notification = group.first()
+    if notification:
+        return notification, False
+    try:
+        with transaction.atomic():
+            return Notification.objects.create(
+                user_id=user_id, group_key=group_key, type=type, title=title, link=link, actor_count=0
+            ), True
+    except IntegrityError:
+        # Another request opened the group first
+        return group.get(), False
+
+
+def notify_grouped(user_id, group_key, actors, type, title, action, link):
+    """
+    Folds repeated events on the same target into one unread notification per
+    window: "Aminata and 24 others liked your discussion". `action` is the text
+    after the actor names; actors already counted in the group are skipped.
+    Returns the notification id.
+    """
+    with transaction.atomic():
+        notification, created = _open_group(user_id, group_key, type, title, link)
+        counted = notification.actors.count()
+        NotificationActor.objects.bulk_create(
+            [NotificationActor(notification=notification, user=actor) for actor in actors], ignore_conflicts=True
+        )
+        added = notification.actors.count() - counted
+        if not added:
+            return notification.id
+        notification.actor = actors[-1]
+        notification.actor_count += added
+        notification.description = f"{_actors_label(actors[-1], notification.actor_count)} {action}"
+        notification.created_at = timezone.now()
+        notification.save(update_fields=['actor', 'actor_count', 'description', 'created_at'])
+    if created:
+        _announce([notification])
+    else:
+        event_service.publish([(user_id, 'notification', NotificationSerializer(notification).data)])
+    return notification.id
+
+
+def notify_likes(target, likers):
+    """
+    Notifies the author of a discussion or reply about new likes, coalesced per target.
+    """
+    likers = [liker for liker in likers if liker.id != target.author_id]
+    if not likers:
+        return
+    if hasattr(target, 'discussion_id'):
+        discussion = target.discussion
+        title, action = 'Reply Liked', f'liked your reply in: "{discussion.title}"'
+        group_key = f"like:reply:{target.id}"
+    else:
+        discussion = target
+        title, action = 'Discussion Liked', f'liked your discussion: "{discussion.title}"'
+        group_key = f"like:discussion:{target.id}"
+    notify_grouped(
+        target.author_id, group_key, likers,
+        type='achievement', title=title, action=action, link=f'/discussions/{discussion.id}'
+    )
@@ -0,0 +1,152 @@
+import datetime
+import logging
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from ..models import Enrollment, Order, PaymentWebhook
+from . import notification_service, worker_service
+from .earnings_service import record_order_earnings
+from .paydunya_service import PayDunyaService
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 20
+MAX_ATTEMPTS = 8
+RETRY_BASE = datetime.timedelta(seconds=30)
+RETRY_MAX = datetime.timedelta(hours=1)
+AMOUNT_TOLERANCE = Decimal('0.01')
+
+
+class PaymentError(Exception):
+    """
+    A notification that can never succeed (unknown order, amount mismatch,
+    cancelled invoice); it is not retried.
+    """
+
+
+def retry_delay(attempts):
+    return min(RETRY_BASE * 2 ** max(attempts - 1, 0), RETRY_MAX)
+
+
+def enqueue(token):
+    """
+    Stores an IPN token for the worker. Repeated deliveries of a pending or
+    processed token are no-ops; a failed one is given a fresh set of attempts.
+    With the opt-in PAYMENT_PROCESSING='inline' the token is also verified
+    once the request commits, and each redelivery retries it.
+    """
+    PaymentWebhook.objects.bulk_create([PaymentWebhook(token=token)], ignore_conflicts=True)
+    PaymentWebhook.objects.filter(token=token, status='failed').update(
+        status='pending', attempts=0, next_attempt_at=timezone.now()
+    )
+    if settings.PAYMENT_PROCESSING == 'inline':
+        transaction.on_commit(lambda: process_webhook(token))
+
+
+def complete_order(order_id, transaction_id, amount):
+    """
+    Moves a pending order to completed and enrolls the student. The order row
+    is locked, so concurrent or repeated confirmations apply it exactly once.
+    Returns (order, changed).
+    """
+    with transaction.atomic():
+        order = Order.objects.select_for_update().filter(pk=order_id).first()
+        if order is None:
+            raise PaymentError(f"Order {order_id} not found")
+        if abs(order.amount - Decimal(str(amount))) > AMOUNT_TOLERANCE:
+            raise PaymentError(f"Amount mismatch for Order {order.id}")
+        if order.status == 'completed':
+            return order, False
+
+        order.status = 'completed'
+        order.provider_transaction_id = transaction_id
+        order.save()
+        record_order_earnings(order)
+        Enrollment.objects.get_or_create(user_id=order.user_id, course_id=order.course_id)
+        notification_service.notify(
+            user=order.user,
+            type='course',
+            title="Inscription réussie",
+            description=f"Bienvenue dans le cours {order.course.title}!",
+            link=f"/learn/{order.course_id}"
+        )
+    logger.info(f"Order {order.id} completed by payment notification")
+    return order, True
+
+
+def _verify(webhook):
+    """
+    Confirms the token with PayDunya and applies the result. Raises
+    PaymentError for final failures and returns False when it should be retried.
+    """
+    data = PayDunyaService().verify_ipn(webhook.token)
+    if data is None or data['status'] == 'pending':
+        return False
+    if data['status'] != 'completed':
+        raise PaymentError(f"Invoice {data['status']}")
+    order, _ = complete_order(data['order_id'], data['transaction_id'], data['total_amount'])
+    webhook.order = order
+    return True
+
+
+def _claim(webhooks, batch_size):
+    """
+    Locks pending tokens and schedules their next attempt in one step, so
+    the provider call runs outside any lock and a crashed process's tokens
+    come back after the backoff.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            webhooks.select_for_update(skip_locked=True)
+            .filter(status='pending').order_by('next_attempt_at')[:batch_size]
+        )
+        for webhook in batch:
+            webhook.attempts += 1
+            webhook.next_attempt_at = now + retry_delay(webhook.attempts)
+        PaymentWebhook.objects.bulk_update(batch, ['attempts', 'next_attempt_at'])
+    return batch
+
+
+def _process(webhook):
+    try:
+        if _verify(webhook):
+            webhook.status = 'processed'
+            webhook.processed_at = timezone.now()
+            webhook.last_error = ''
+        else:
+            webhook.last_error = "Verification pending"
+            if webhook.attempts >= MAX_ATTEMPTS:
+                webhook.status = 'failed'
+    except PaymentError as e:
+        webhook.status = 'failed'
+        webhook.last_error = str(e)
+    except Exception as e:
+        logger.exception(f"PayDunya notification {webhook.id} failed")
+        webhook.last_error = str(e)
+        if webhook.attempts >= MAX_ATTEMPTS:
+            webhook.status = 'failed'
+    if webhook.status == 'failed':
+        logger.warning(f"PayDunya notification {webhook.id} failed after {webhook.attempts} attempts: {webhook.last_error}")
+    webhook.save(update_fields=['status', 'order', 'last_error', 'processed_at'])
+
+
+def process_webhook(token):
+    """
+    Verifies one token right away, whatever its backoff; used by the inline
+    fallback when no worker runs.
+    """
+    for webhook in _claim(PaymentWebhook.objects.filter(token=token), 1):
+        _process(webhook)
+
+
+@worker_service.task
+def process_webhooks(batch_size=BATCH_SIZE):
+    """
+    Verifies one batch of due IPN tokens.
+    """
+    batch = _claim(PaymentWebhook.objects.filter(next_attempt_at__lte=timezone.now()), batch_size)
+    for webhook in batch:
+        _process(webhook)
+    return len(batch)
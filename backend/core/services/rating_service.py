@@ -0,0 +1,75 @@
+from collections import defaultdict
+from django.db.models import Case, Count, F, FloatField, Q, Sum, When
+from django.db.models.functions import Cast
+from ..models import CourseRatingStats, Review
+
+STARS = range(1, 6)
+
+
+def _star_field(rating):
+    return f"stars_{rating}" if rating in STARS else None
+
+
+def record(course_id, old_rating=None, new_rating=None):
+    """
+    Applies one review change to the course counters: a new review
+    (new_rating only), an edited rating (both) or a deletion (old_rating only).
+    """
+    deltas = defaultdict(int)
+    for rating, sign in ((old_rating, -1), (new_rating, 1)):
+        if rating is None:
+            continue
+        deltas['review_count'] += sign
+        deltas['rating_total'] += sign * rating
+        if _star_field(rating):
+            deltas[_star_field(rating)] += sign
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not course_id or not deltas:
+        return
+    if any(value > 0 for value in deltas.values()):
+        CourseRatingStats.objects.bulk_create([CourseRatingStats(course_id=course_id)], ignore_conflicts=True)
+    CourseRatingStats.objects.filter(course_id=course_id).update(
+        **{field: F(field) + value for field, value in deltas.items()}
+    )
+
+
+def summary(course_id):
+    stats = CourseRatingStats.objects.filter(course_id=course_id).first() or CourseRatingStats(course_id=course_id)
+    return {
+        "course_id": course_id,
+        "average": round(stats.rating_total / stats.review_count, 2) if stats.review_count else None,
+        "count": stats.review_count,
+        "histogram": {str(star): getattr(stats, f"stars_{star}") for star in STARS},
+    }
+
+
+def average_rating():
+    """
+    Annotation reading a course's average rating from its stored counters.
+    """
+    return Case(
+        When(
+            rating_stats__review_count__gt=0,
+            then=Cast('rating_stats__rating_total', FloatField()) / F('rating_stats__review_count')
+        ),
+        output_field=FloatField()
+    )
+
+
+def rebuild(course_ids=None):
+    """
+    Recomputes the counters from the Review table in one grouped query.
+    """
+    reviews = Review.objects.all()
+    stats = CourseRatingStats.objects.all()
+    if course_ids is not None:
+        reviews = reviews.filter(course_id__in=course_ids)
+        stats = stats.filter(course_id__in=course_ids)
+    rows = reviews.values('course_id').annotate(
+        review_count=Count('id'),
+        rating_total=Sum('rating'),
+        **{f"stars_{star}": Count('id', filter=Q(rating=star)) for star in STARS}
+    ).order_by()
+    stats.delete()
+    CourseRatingStats.objects.bulk_create([CourseRatingStats(**row) for row in rows])
+    return len(rows)
@@ -0,0 +1,119 @@
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, Sum, F, Min, FloatField, ExpressionWrapper
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from ..models import CourseDailyStats, Enrollment, Order, EarningsEntry, LessonProgress, QuizAttempt, Section
+
+ROLLUP_FIELDS = ('new_enrollments', 'completed_orders', 'revenue', 'net_revenue', 'lesson_completions', 'quiz_attempts', 'quiz_score_total')
+
+
+def course_id_for_lesson(lesson_id):
+    return Section.objects.filter(lessons__id=lesson_id).values_list('course_id', flat=True).first()
+
+
+def course_id_for_quiz(quiz_id):
+    return Section.objects.filter(lessons__quiz__id=quiz_id).values_list('course_id', flat=True).first()
+
+
+def bump(course_id, when, **deltas):
+    """
+    Atomically adds deltas to the rollup row of a course for the day of `when`.
+    """
+    if not course_id or not deltas:
+        return
+    day = timezone.localdate(when) if isinstance(when, datetime.datetime) else when
+    if any(value > 0 for value in deltas.values()):
+        # Decrements never create rows, so cascading course deletes stay consistent
+        CourseDailyStats.objects.bulk_create(
+            [CourseDailyStats(course_id=course_id, date=day)],
+            ignore_conflicts=True
+        )
+    CourseDailyStats.objects.filter(course_id=course_id, date=day).update(
+        **{field: F(field) + value for field, value in deltas.items()}
+    )
+
+
+def quiz_percentage(score, total_questions):
+    return (score / total_questions * 100) if total_questions else 0
+
+
+def history_start():
+    """
+    Returns the earliest date found in any raw table feeding the rollups.
+    """
+    candidates = [
+        Enrollment.objects.aggregate(first=Min('enrolled_at'))['first'],
+        Order.objects.aggregate(first=Min('created_at'))['first'],
+        LessonProgress.objects.aggregate(first=Min('completed_at'))['first'],
+        QuizAttempt.objects.aggregate(first=Min('completed_at'))['first'],
+    ]
+    candidates = [timezone.localdate(value) for value in candidates if value]
+    return min(candidates) if candidates else None
+
+
+def compute_rollups(start, end, course_id=None):
+    """
+    Aggregates raw events between start and end (inclusive) into rollup rows.
+    Runs five grouped queries regardless of the number of days.
+    """
+    rows = defaultdict(lambda: {field: 0 for field in ROLLUP_FIELDS})
+
+    def scoped(queryset, date_field, course_path):
+        queryset = queryset.filter(**{f'{date_field}__date__gte': start, f'{date_field}__date__lte': end})
+        if course_id:
+            queryset = queryset.filter(**{course_path: course_id})
+        return queryset.annotate(day=TruncDate(date_field)).values(course_path, 'day').order_by()
+
+    for row in scoped(Enrollment.objects.all(), 'enrolled_at', 'course_id').annotate(total=Count('id')):
+        rows[(row['course_id'], row['day'])]['new_enrollments'] = row['total']
+
+    orders = scoped(Order.objects.filter(status='completed'), 'created_at', 'course_id')
+    for row in orders.annotate(total=Count('id'), amount=Sum('amount')):
+        key = (row['course_id'], row['day'])
+        rows[key]['completed_orders'] = row['total']
+        rows[key]['revenue'] = row['amount'] or Decimal('0')
+
+    # Ledger entries are bucketed by order date, like the order revenue above
+    for row in scoped(EarningsEntry.objects.all(), 'order__created_at', 'course_id').annotate(net=Sum('net_amount')):
+        rows[(row['course_id'], row['day'])]['net_revenue'] = row['net'] or Decimal('0')
+
+    progress = scoped(LessonProgress.objects.filter(is_completed=True), 'completed_at', 'lesson__section__course_id')
+    for row in progress.annotate(total=Count('id')):
+        rows[(row['lesson__section__course_id'], row['day'])]['lesson_completions'] = row['total']
+
+    percentage = ExpressionWrapper(F('score') * 100.0 / F('total_questions'), output_field=FloatField())
+    attempts = scoped(QuizAttempt.objects.filter(total_questions__gt=0), 'completed_at', 'quiz__lesson__section__course_id')
+    for row in attempts.annotate(total=Count('id'), score_total=Sum(percentage)):
+        key = (row['quiz__lesson__section__course_id'], row['day'])
+        rows[key]['quiz_attempts'] = row['total']
+        rows[key]['quiz_score_total'] = row['score_total'] or 0
+
+    return [
+        CourseDailyStats(course_id=course, date=day, **values)
+        for (course, day), values in rows.items()
+    ]
+
+
+def rebuild_rollups(start, end, course_id=None, chunk_days=31, batch_size=1000, stdout=None):
+    """
+    Recomputes rollups from raw tables, one chunk of days per transaction.
+    """
+    chunk_start = start
+    total = 0
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + datetime.timedelta(days=chunk_days - 1), end)
+        rollups = compute_rollups(chunk_start, chunk_end, course_id)
+        with transaction.atomic():
+            existing = CourseDailyStats.objects.filter(date__gte=chunk_start, date__lte=chunk_end)
+            if course_id:
+                existing = existing.filter(course_id=course_id)
+            existing.delete()
+            CourseDailyStats.objects.bulk_create(rollups, batch_size=batch_size)
+        total += len(rollups)
+        if stdout:
+            stdout.write(f"{chunk_start} -> {chunk_end}: {len(rollups)} rows")
+        chunk_start = chunk_end + datetime.timedelta(days=1)
+    return total
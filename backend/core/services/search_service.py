@@ -0,0 +1,76 @@
+import logging
+from django.conf import settings
+from django.db import connection, DatabaseError, transaction
+from django.db.models import F, Q, Exists, OuterRef, Subquery, Value, TextField
+from django.db.models.functions import Coalesce, Left
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from ..models import Discussion, DiscussionReply, User
+
+logger = logging.getLogger(__name__)
+
+# Bounds on the indexed text, so refreshing a vector costs the same on any
+# thread and stays far below PostgreSQL's 1MB tsvector limit
+MAX_CONTENT_CHARS = 20000
+MAX_INDEXED_REPLIES = 100
+MAX_REPLY_CHARS = 2000
+
+
+def is_supported():
+    """
+    Full-text search needs PostgreSQL; other databases fall back to substring matching.
+    """
+    return connection.vendor == 'postgresql'
+
+
+def search_document():
+    """
+    Weighted tsvector of a discussion: title and author username (A), content (B)
+    and the text of its latest replies (C), each truncated.
+    """
+    from django.db.models import StringAgg
+    config = settings.SEARCH_CONFIG
+    latest = DiscussionReply.objects.filter(discussion=OuterRef(OuterRef('pk'))).order_by('-id').values('pk')[:MAX_INDEXED_REPLIES]
+    replies = DiscussionReply.objects.filter(pk__in=Subquery(latest)).order_by().values('discussion').annotate(
+        text=StringAgg(Left('content', MAX_REPLY_CHARS), delimiter=Value(' '))
+    ).values('text')
+    author = User.objects.filter(pk=OuterRef('author_id')).values('username')
+    return (
+        SearchVector('title', weight='A', config=config)
+        + SearchVector(Coalesce(Subquery(author), Value(''), output_field=TextField()), weight='A', config=config)
+        + SearchVector(Left('content', MAX_CONTENT_CHARS), weight='B', config=config)
+        + SearchVector(Coalesce(Subquery(replies), Value(''), output_field=TextField()), weight='C', config=config)
+    )
+
+
+def refresh(discussion_ids=None):
+    """
+    Recomputes the stored search vector of the given discussions (all when None).
+    Failures are logged and leave the old vector, so the write that triggered
+    the refresh still goes through.
+    """
+    if not is_supported():
+        return
+    discussions = Discussion.objects.all()
+    if discussion_ids is not None:
+        discussions = discussions.filter(pk__in=discussion_ids)
+    try:
+        with transaction.atomic():
+            discussions.update(search_vector=search_document())
+    except DatabaseError:
+        logger.exception("Search index refresh failed")
+
+
+def search(queryset, text):
+    """
+    Filters discussions matching `text`, best matches first.
+    """
+    if is_supported():
+        query = SearchQuery(text, search_type='websearch', config=settings.SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', '-created_at')
+
+    reply_matches = DiscussionReply.objects.filter(discussion=OuterRef('pk'), content__icontains=text)
+    return queryset.annotate(reply_match=Exists(reply_matches)).filter(
+        Q(title__icontains=text) | Q(content__icontains=text) | Q(author__username__icontains=text) | Q(reply_match=True)
+    )
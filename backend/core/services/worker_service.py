@@ -0,0 +1,37 @@
+import logging
+import time
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_tasks = []
+
+
+def task(func):
+    """
+    Registers a drain step run by the background worker. The step processes
+    one batch of pending work and returns how many items it handled.
+    """
+    _tasks.append(func)
+    return func
+
+
+def run_once():
+    processed = 0
+    for func in _tasks:
+        try:
+            processed += func() or 0
+        except Exception:
+            logger.exception(f"Worker task {func.__name__} failed")
+    return processed
+
+
+def run_forever(interval=1.0):
+    """
+    Runs every registered step in a loop, sleeping only when all queues are empty.
+    """
+    logger.info(f"Worker started with tasks: {', '.join(func.__name__ for func in _tasks)}")
+    while True:
+        close_old_connections()
+        if not run_once():
+            time.sleep(interval)
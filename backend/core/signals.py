@@ -1,13 +1,20 @@
-from django.db.models.signals import post_save, m2m_changed
+from django.db.models.signals import post_init, post_save, post_delete, m2m_changed
+from django.core.files.storage import default_storage
 from django.dispatch import receiver
-from .models import Discussion, DiscussionReply, Notification, User
+from django.utils import timezone
+from .models import (
+    Discussion, DiscussionReply, User, Lesson, Resource,
+    Enrollment, Order, LessonProgress, QuizAttempt, AssignmentSubmission,
+    Course, Section, Assignment, Review
+)
+from .services import image_variants, author_card_service, rollup_service, funnel_service, activity_service, inbox_service, counter_service, notification_service, search_service, rating_service
 
 @receiver(post_save, sender=DiscussionReply)
 def create_reply_notification(sender, instance, created, **kwargs):
     if created:
         # Don't notify if user replies to their own discussion
-        if instance.discussion.author != instance.author:
-            Notification.objects.create(
+        if instance.discussion.author_id != instance.author_id:
+            notification_service.notify(
                 user=instance.discussion.author,
                 type='message',
                 title='New Reply',
@@ -15,41 +22,329 @@ def create_reply_notification(sender, instance, created, **kwargs):
                 link=f'/discussions/{instance.discussion.id}'
             )
 
+def _notify_likes(model, instance, action, reverse, pk_set):
+    if action != "post_add" or not pk_set:
+        return
+    if reverse:
+        # user.liked_discussions.add(...): one liker, possibly several targets
+        for target in model.objects.filter(pk__in=pk_set).select_related('author'):
+            notification_service.notify_likes(target, [instance])
+    else:
+        notification_service.notify_likes(instance, list(User.objects.filter(pk__in=pk_set).order_by('id')))
+
 @receiver(m2m_changed, sender=Discussion.liked_by.through)
-def create_discussion_like_notification(sender, instance, action, pk_set, **kwargs):
-    if action == "post_add":
-        for user_id in pk_set:
-            liker = User.objects.get(pk=user_id)
-            if liker != instance.author:
-                Notification.objects.create(
-                    user=instance.author,
-                    type='achievement',
-                    title='Discussion Liked',
-                    description=f'{liker.username} liked your discussion: "{instance.title}"',
-                    link=f'/discussions/{instance.id}'
-                )
+def create_discussion_like_notification(sender, instance, action, reverse, pk_set, **kwargs):
+    _notify_likes(Discussion, instance, action, reverse, pk_set)
 
 @receiver(m2m_changed, sender=DiscussionReply.liked_by.through)
-def create_reply_like_notification(sender, instance, action, pk_set, **kwargs):
-    if action == "post_add":
-        for user_id in pk_set:
-            liker = User.objects.get(pk=user_id)
-            if liker != instance.author:
-                Notification.objects.create(
-                    user=instance.author,
-                    type='achievement',
-                    title='Reply Liked',
-                    description=f'{liker.username} liked your reply in: "{instance.discussion.title}"',
-                    link=f'/discussions/{instance.discussion.id}'
-                )
+def create_reply_like_notification(sender, instance, action, reverse, pk_set, **kwargs):
+    _notify_likes(DiscussionReply, instance, action, reverse, pk_set)
 
 @receiver(post_save, sender=User)
 def create_welcome_notification(sender, instance, created, **kwargs):
     if created:
-        Notification.objects.create(
+        notification_service.notify(
             user=instance,
             type='system',
             title='Welcome to e-MRA!',
             description='We are glad to have you here. Start your learning journey today!',
             link='/courses'
         )
+
+@receiver(post_save, sender=User)
+def invalidate_author_card(sender, instance, created, **kwargs):
+    if not created:
+        author_card_service.invalidate(instance.id)
+
+@receiver(post_delete, sender=Resource)
+def release_resource_file(sender, instance, **kwargs):
+    if instance.file:
+        instance.file.delete(save=False)
+
+@receiver(post_delete, sender=Lesson)
+def release_lesson_video(sender, instance, **kwargs):
+    if instance.video_file:
+        instance.video_file.delete(save=False)
+
+# Avatars and thumbnails: drop replaced images and their resized variants
+
+def _image_name(instance, field):
+    # Deferred fields are left alone so .only() loads stay single-query
+    return getattr(instance, field).name if field in instance.__dict__ else None
+
+def _release_image(model, field, name):
+    if name and not model.objects.filter(**{field: name}).exists():
+        image_variants.delete_variants(name)
+        default_storage.delete(name)
+
+def _release_replaced_image(instance, field):
+    current = _image_name(instance, field)
+    if current != instance._stored_image:
+        _release_image(type(instance), field, instance._stored_image)
+        instance._stored_image = current
+
+@receiver(post_init, sender=User)
+def remember_avatar(sender, instance, **kwargs):
+    instance._stored_image = _image_name(instance, 'avatar')
+
+@receiver(post_init, sender=Course)
+def remember_thumbnail(sender, instance, **kwargs):
+    instance._stored_image = _image_name(instance, 'thumbnail')
+
+@receiver(post_save, sender=User)
+def release_replaced_avatar(sender, instance, **kwargs):
+    _release_replaced_image(instance, 'avatar')
+
+@receiver(post_save, sender=Course)
+def release_replaced_thumbnail(sender, instance, **kwargs):
+    _release_replaced_image(instance, 'thumbnail')
+
+@receiver(post_delete, sender=User)
+def release_avatar(sender, instance, **kwargs):
+    _release_image(User, 'avatar', _image_name(instance, 'avatar'))
+
+@receiver(post_delete, sender=Course)
+def release_thumbnail(sender, instance, **kwargs):
+    _release_image(Course, 'thumbnail', _image_name(instance, 'thumbnail'))
+
+# Daily rollups: keep CourseDailyStats in step with raw events
+
+@receiver(post_init, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    instance._rollup_status = instance.status
+
+@receiver(post_init, sender=LessonProgress)
+def remember_progress_state(sender, instance, **kwargs):
+    instance._rollup_completed = instance.is_completed
+
+@receiver(post_save, sender=Enrollment)
+def rollup_enrollment(sender, instance, created, **kwargs):
+    if created:
+        rollup_service.bump(instance.course_id, instance.enrolled_at, new_enrollments=1)
+        funnel_service.invalidate(instance.course_id)
+
+@receiver(post_delete, sender=Enrollment)
+def rollup_enrollment_removed(sender, instance, **kwargs):
+    rollup_service.bump(instance.course_id, instance.enrolled_at, new_enrollments=-1)
+    funnel_service.invalidate(instance.course_id)
+
+@receiver(post_save, sender=Order)
+def rollup_order(sender, instance, created, **kwargs):
+    was_completed = not created and instance._rollup_status == 'completed'
+    is_completed = instance.status == 'completed'
+    if was_completed != is_completed:
+        sign = 1 if is_completed else -1
+        rollup_service.bump(instance.course_id, instance.created_at, completed_orders=sign, revenue=sign * instance.amount)
+    instance._rollup_status = instance.status
+
+@receiver(post_save, sender=LessonProgress)
+def rollup_lesson_progress(sender, instance, created, **kwargs):
+    was_completed = not created and instance._rollup_completed
+    if was_completed != instance.is_completed:
+        course_id = rollup_service.course_id_for_lesson(instance.lesson_id)
+        rollup_service.bump(course_id, instance.completed_at, lesson_completions=1 if instance.is_completed else -1)
+        funnel_service.invalidate(course_id)
+    instance._rollup_completed = instance.is_completed
+
+@receiver(post_delete, sender=LessonProgress)
+def rollup_lesson_progress_removed(sender, instance, **kwargs):
+    if instance.is_completed:
+        course_id = rollup_service.course_id_for_lesson(instance.lesson_id)
+        rollup_service.bump(course_id, instance.completed_at, lesson_completions=-1)
+        funnel_service.invalidate(course_id)
+
+@receiver(post_save, sender=QuizAttempt)
+def rollup_quiz_attempt(sender, instance, created, **kwargs):
+    if created and instance.total_questions:
+        course_id = rollup_service.course_id_for_quiz(instance.quiz_id)
+        rollup_service.bump(
+            course_id, instance.completed_at,
+            quiz_attempts=1,
+            quiz_score_total=rollup_service.quiz_percentage(instance.score, instance.total_questions)
+        )
+
+@receiver(post_delete, sender=QuizAttempt)
+def rollup_quiz_attempt_removed(sender, instance, **kwargs):
+    if instance.total_questions:
+        course_id = rollup_service.course_id_for_quiz(instance.quiz_id)
+        rollup_service.bump(
+            course_id, instance.completed_at,
+            quiz_attempts=-1,
+            quiz_score_total=-rollup_service.quiz_percentage(instance.score, instance.total_questions)
+        )
+
+# Activity feed: append events for everyone who should see them
+
+@receiver(post_save, sender=Enrollment)
+def record_enrollment_activity(sender, instance, created, **kwargs):
+    if created:
+        activity_service.record(activity_service.enrollment_events(instance))
+
+@receiver(post_save, sender=QuizAttempt)
+def record_quiz_attempt_activity(sender, instance, created, **kwargs):
+    if created:
+        activity_service.record(activity_service.quiz_attempt_events(instance))
+
+@receiver(post_save, sender=DiscussionReply)
+def record_reply_activity(sender, instance, created, **kwargs):
+    if created:
+        activity_service.record(activity_service.reply_events(instance))
+
+@receiver(post_init, sender=AssignmentSubmission)
+def remember_graded_at(sender, instance, **kwargs):
+    instance._activity_graded_at = instance.graded_at
+
+@receiver(post_save, sender=AssignmentSubmission)
+def record_submission_activity(sender, instance, created, **kwargs):
+    if created:
+        activity_service.record(activity_service.submission_events(instance))
+    elif instance.graded_at and instance.graded_at != instance._activity_graded_at:
+        activity_service.record(activity_service.grade_events(instance))
+    instance._activity_graded_at = instance.graded_at
+
+# Task inbox: open and resolve dashboard tasks as state changes
+
+@receiver(post_save, sender=Discussion)
+def open_discussion_task(sender, instance, created, **kwargs):
+    if created:
+        inbox_service.discussion_opened(instance)
+
+@receiver(post_delete, sender=Discussion)
+def resolve_deleted_discussion_task(sender, instance, **kwargs):
+    inbox_service.resolve(f"community-{instance.id}")
+
+@receiver(post_save, sender=DiscussionReply)
+def resolve_discussion_task(sender, instance, created, **kwargs):
+    if created:
+        inbox_service.resolve(f"community-{instance.discussion_id}")
+
+@receiver(post_save, sender=AssignmentSubmission)
+def update_submission_task(sender, instance, created, **kwargs):
+    if created:
+        inbox_service.submission_received(instance)
+    elif instance.graded_at:
+        inbox_service.resolve(f"grading-{instance.id}")
+
+@receiver(post_delete, sender=AssignmentSubmission)
+def resolve_deleted_submission_task(sender, instance, **kwargs):
+    inbox_service.resolve(f"grading-{instance.id}")
+
+@receiver(post_save, sender=Course)
+def open_setup_task(sender, instance, created, **kwargs):
+    if created:
+        inbox_service.open_tasks([inbox_service.setup_task(instance)])
+
+@receiver(post_delete, sender=Course)
+def resolve_deleted_course_tasks(sender, instance, **kwargs):
+    inbox_service.resolve(f"setup-{instance.id}")
+    inbox_service.resolve(f"continue-{instance.id}")
+
+@receiver(post_save, sender=Section)
+def resolve_setup_task(sender, instance, created, **kwargs):
+    if created:
+        inbox_service.resolve(f"setup-{instance.course_id}")
+
+@receiver(post_delete, sender=Section)
+def reopen_setup_task(sender, instance, **kwargs):
+    course = Course.objects.filter(pk=instance.course_id).first()
+    if course:
+        inbox_service.course_sections_changed(course)
+
+@receiver(post_init, sender=Assignment)
+def remember_due_date(sender, instance, **kwargs):
+    instance._inbox_due_date = instance.due_date
+
+@receiver(post_save, sender=Assignment)
+def schedule_due_tasks(sender, instance, created, **kwargs):
+    if instance.due_date != instance._inbox_due_date or (created and instance.due_date):
+        inbox_service.assignment_scheduled(instance)
+    instance._inbox_due_date = instance.due_date
+
+@receiver(post_delete, sender=Assignment)
+def resolve_deleted_assignment_tasks(sender, instance, **kwargs):
+    inbox_service.resolve(f"assignment-{instance.id}")
+
+@receiver(post_save, sender=Enrollment)
+def open_enrollment_tasks(sender, instance, created, **kwargs):
+    if created:
+        inbox_service.enrollment_started(instance)
+
+@receiver(post_delete, sender=Enrollment)
+def resolve_enrollment_tasks(sender, instance, **kwargs):
+    inbox_service.enrollment_ended(instance)
+
+@receiver(post_save, sender=LessonProgress)
+def update_stalled_course_task(sender, instance, **kwargs):
+    if instance.is_completed:
+        inbox_service.lesson_completed(instance.user_id, instance.lesson_id, timezone.now())
+
+# Stored like and reply counters
+
+def _count_likes(model, instance, action, reverse, pk_set):
+    if reverse and action == 'pre_clear':
+        # user.liked_discussions.clear(): remember which rows lose a like
+        instance._cleared_like_pks = list(model.objects.filter(liked_by=instance).values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        counter_service.refresh_like_counts(model, pk_set if reverse else [instance.pk])
+    elif action == 'post_clear':
+        counter_service.refresh_like_counts(model, instance.__dict__.pop('_cleared_like_pks', []) if reverse else [instance.pk])
+
+@receiver(m2m_changed, sender=Discussion.liked_by.through)
+def count_discussion_likes(sender, instance, action, reverse, pk_set, **kwargs):
+    _count_likes(Discussion, instance, action, reverse, pk_set)
+
+@receiver(m2m_changed, sender=DiscussionReply.liked_by.through)
+def count_reply_likes(sender, instance, action, reverse, pk_set, **kwargs):
+    _count_likes(DiscussionReply, instance, action, reverse, pk_set)
+
+@receiver(post_save, sender=DiscussionReply)
+def count_new_reply(sender, instance, created, **kwargs):
+    if created:
+        counter_service.add_replies(instance.discussion_id, 1)
+
+@receiver(post_delete, sender=DiscussionReply)
+def count_removed_reply(sender, instance, **kwargs):
+    counter_service.add_replies(instance.discussion_id, -1)
+
+# Forum search index (PostgreSQL only)
+
+@receiver(post_save, sender=Discussion)
+def index_discussion(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'title', 'content'} & set(update_fields):
+        search_service.refresh([instance.id])
+
+@receiver(post_save, sender=DiscussionReply)
+def index_reply(sender, instance, **kwargs):
+    search_service.refresh([instance.discussion_id])
+
+@receiver(post_delete, sender=DiscussionReply)
+def unindex_reply(sender, instance, **kwargs):
+    search_service.refresh([instance.discussion_id])
+
+@receiver(post_init, sender=User)
+def remember_username(sender, instance, **kwargs):
+    instance._indexed_username = instance.__dict__.get('username')
+
+@receiver(post_save, sender=User)
+def reindex_author(sender, instance, created, **kwargs):
+    if not created and instance._indexed_username not in (None, instance.username):
+        search_service.refresh(Discussion.objects.filter(author=instance).values_list('id', flat=True))
+    instance._indexed_username = instance.username
+
+# Course rating counters
+
+@receiver(post_init, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    instance._stats_rating = instance.rating
+
+@receiver(post_save, sender=Review)
+def count_review(sender, instance, created, **kwargs):
+    if created:
+        rating_service.record(instance.course_id, new_rating=instance.rating)
+    elif instance.rating != instance._stats_rating:
+        rating_service.record(instance.course_id, old_rating=instance._stats_rating, new_rating=instance.rating)
+    instance._stats_rating = instance.rating
+
+@receiver(post_delete, sender=Review)
+def uncount_review(sender, instance, **kwargs):
+    rating_service.record(instance.course_id, old_rating=instance._stats_rating)
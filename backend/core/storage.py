@@ -0,0 +1,89 @@
+import hashlib
+import os
+import tempfile
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+@deconstructible(path='core.storage.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores each uploaded blob once under its SHA-256 digest.
+    Uploads are hashed while being streamed to a temporary file, and
+    StoredBlob reference counts decide when a blob can really be deleted.
+    """
+    blob_prefix = 'blobs'
+
+    def get_available_name(self, name, max_length=None):
+        # Blob names are derived from content, so identical names are expected
+        return name
+
+    def _save(self, name, content):
+        from .models import StoredBlob
+
+        tmp_dir = os.path.join(self.location, 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        digest = hashlib.sha256()
+        size = 0
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        with tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as tmp:
+            for chunk in content.chunks():
+                digest.update(chunk)
+                size += len(chunk)
+                tmp.write(chunk)
+
+        content_hash = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        blob_name = f"{self.blob_prefix}/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}{extension}"
+        blob_path = self.path(blob_name)
+
+        with transaction.atomic():
+            blob, created = StoredBlob.objects.select_for_update().get_or_create(
+                name=blob_name,
+                defaults={'content_hash': content_hash, 'size': size, 'ref_count': 0}
+            )
+            if os.path.exists(blob_path):
+                os.remove(tmp.name)
+            else:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                os.replace(tmp.name, blob_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(blob_path, self.file_permissions_mode)
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+
+        return blob_name
+
+    def delete(self, name):
+        from .models import StoredBlob
+
+        if not name:
+            raise ValueError("The name must be given to delete().")
+
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                # Files uploaded before deduplication are owned by a single row
+                return super().delete(name)
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+            if blob.ref_count <= 1:
+                transaction.on_commit(lambda: self._release(name))
+
+    def _release(self, name):
+        """
+        Removes an unreferenced blob. The row lock makes this wait for, or
+        exclude, a concurrent identical upload, and the count is re-checked
+        in case that upload took a new reference in between.
+        """
+        from .models import StoredBlob
+
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None or blob.ref_count > 0:
+                return
+            FileSystemStorage.delete(self, name)
+            blob.delete()
+
+content_storage = ContentAddressedStorage()
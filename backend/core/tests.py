@@ -1,8 +1,11 @@
+from unittest import skipUnless
+from django.db import connection
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
-from core.models import Course, Section, Lesson, Quiz, Question, Choice, Enrollment, Assignment, AssignmentSubmission, Order
+from decimal import Decimal
+from core.models import Course, Section, Lesson, Quiz, Question, Choice, Enrollment, Assignment, AssignmentSubmission, Order, EarningsEntry, InstructorBalance
 
 User = get_user_model()
 
@@ -164,3 +167,1136 @@ class LMSFullSuiteTest(TestCase):
         
         # Verify Enrollment
         self.assertTrue(Enrollment.objects.filter(user=self.student, course=course).exists())
+
+class EarningsLedgerTest(TestCase):
+    def test_confirmation_records_one_ledger_entry(self):
+        teacher = User.objects.create_user(username="ledger_teacher", password="password123", role="teacher")
+        student = User.objects.create_user(username="ledger_student", password="password123")
+        course = Course.objects.create(title="Ledger Course", instructor=teacher, price=50.00, is_published=True)
+        order = Order.objects.create(user=student, course=course, amount=course.price, status='pending')
+        client = APIClient()
+        client.force_authenticate(user=student)
+
+        # Repeated confirmations of the same order are recorded once
+        for _ in range(2):
+            res = client.post('/api/payments/confirm/', {"order_id": order.id, "transaction_id": "tx_ledger"}, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        entry = EarningsEntry.objects.get(order=order)
+        self.assertEqual(entry.platform_fee, Decimal('5.00'))
+        self.assertEqual(entry.net_amount, Decimal('45.00'))
+        balance = InstructorBalance.objects.get(instructor=teacher)
+        self.assertEqual((balance.net_total, balance.sales_count), (Decimal('45.00'), 1))
+
+class MediaDeliveryTest(TestCase):
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        self.media_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_dir.name, MEDIA_DELIVERY_BACKEND='django')
+        self.settings_override.enable()
+
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        self.client = APIClient()
+        self.teacher = User.objects.create_user(username="media_teacher", password="password123", role="teacher")
+        self.student = User.objects.create_user(username="media_student", password="password123", role="student")
+        course = Course.objects.create(title="Media Course", instructor=self.teacher, price=0, is_published=True)
+        section = Section.objects.create(course=course, title="S1")
+        self.lesson = Lesson.objects.create(section=section, title="L1", lesson_type="video")
+        self.lesson.video_file = SimpleUploadedFile("clip.mp4", b"0123456789" * 10, content_type="video/mp4")
+        self.lesson.save()
+        self.course = course
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_dir.cleanup()
+
+    def test_requires_enrollment(self):
+        self.client.force_authenticate(user=self.student)
+        res = self.client.get(f'/api/lessons/{self.lesson.id}/media/')
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_range_request(self):
+        Enrollment.objects.create(user=self.student, course=self.course)
+        self.client.force_authenticate(user=self.student)
+        res = self.client.get(f'/api/lessons/{self.lesson.id}/media/')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=None)
+        res = self.client.get(res.data['url'], HTTP_RANGE='bytes=10-19')
+        self.assertEqual(res.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(res['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(res.streaming_content), b"0123456789")
+
+    def test_course_payload_only_exposes_signed_urls(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from core.models import Resource
+        Resource.objects.create(
+            lesson=self.lesson, title="Notes",
+            file=SimpleUploadedFile("notes.pdf", b"%PDF notes", content_type="application/pdf")
+        )
+
+        def lesson_payload():
+            res = self.client.get(f'/api/courses/{self.course.id}/')
+            # Neither the stored name nor the public file URL leaks into the payload
+            self.assertNotIn(self.lesson.video_file.name, res.content.decode())
+            self.assertNotIn(self.lesson.video_file.url, res.content.decode())
+            return res.data['sections'][0]['lessons'][0]
+
+        self.client.force_authenticate(user=self.student)
+        lesson = lesson_payload()
+        self.assertIsNone(lesson['video_stream_url'])
+        self.assertEqual(lesson['resources'], [])
+
+        Enrollment.objects.create(user=self.student, course=self.course)
+        lesson = lesson_payload()
+        self.client.force_authenticate(user=None)
+        res = self.client.get(lesson['video_stream_url'])
+        self.assertEqual(b''.join(res.streaming_content), b"0123456789" * 10)
+        res = self.client.get(lesson['resources'][0]['download_url'])
+        self.assertEqual(b''.join(res.streaming_content), b"%PDF notes")
+        self.assertIn('attachment', res['Content-Disposition'])
+
+class ContentAddressedStorageTest(TestCase):
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        self.media_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_dir.name)
+        self.settings_override.enable()
+
+        self.client = APIClient()
+        self.teacher = User.objects.create_user(username="blob_teacher", password="password123", role="teacher")
+        course = Course.objects.create(title="Blob Course", instructor=self.teacher, price=0)
+        section = Section.objects.create(course=course, title="S1")
+        self.lessons = [Lesson.objects.create(section=section, title=f"L{i}") for i in range(2)]
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_dir.cleanup()
+
+    def test_identical_uploads_share_one_blob(self):
+        import os
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from core.models import Resource, StoredBlob
+        self.client.force_authenticate(user=self.teacher)
+
+        ids = []
+        for lesson in self.lessons:
+            upload = SimpleUploadedFile("notes.pdf", b"%PDF same bytes", content_type="application/pdf")
+            res = self.client.post(f'/api/lessons/{lesson.id}/resources/', {"title": "Notes", "file": upload}, format='multipart')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(res.data['file_size'], 15)
+            self.assertEqual(res.data['file_type'], 'pdf')
+            ids.append(res.data['id'])
+
+        blob = StoredBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(Resource.objects.filter(file=blob.name).count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/resources/{ids[0]}/')
+        self.assertTrue(os.path.exists(os.path.join(self.media_dir.name, blob.name)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/resources/{ids[1]}/')
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertFalse(os.path.exists(os.path.join(self.media_dir.name, blob.name)))
+
+    def test_upload_during_pending_release_keeps_the_blob(self):
+        import os
+        from django.core.files.base import ContentFile
+        from core.models import StoredBlob
+        from core.storage import content_storage
+
+        name = content_storage.save("video.mp4", ContentFile(b"same video"))
+        with self.captureOnCommitCallbacks() as callbacks:
+            content_storage.delete(name)
+        # An identical upload lands before the deferred release runs
+        self.assertEqual(content_storage.save("again.mp4", ContentFile(b"same video")), name)
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(StoredBlob.objects.get(name=name).ref_count, 1)
+        self.assertTrue(os.path.exists(os.path.join(self.media_dir.name, name)))
+
+class ImageVariantTest(TestCase):
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        self.media_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_dir.name, MEDIA_DELIVERY_BACKEND='django')
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_dir.cleanup()
+
+    def test_variant_generated_on_first_request(self):
+        import io
+        from PIL import Image
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 400), 'red').save(buffer, 'PNG')
+        teacher = User.objects.create_user(username="image_teacher", password="password123", role="teacher")
+        course = Course.objects.create(
+            title="Image Course", instructor=teacher, price=0, is_published=True,
+            thumbnail=SimpleUploadedFile("cover.png", buffer.getvalue(), content_type="image/png")
+        )
+
+        client = APIClient()
+        res = client.get(f'/api/courses/{course.id}/')
+        url = res.data['thumbnail_variants'][256]['webp']
+
+        res = client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        image = Image.open(io.BytesIO(b''.join(res.streaming_content)))
+        self.assertEqual(image.format, 'WEBP')
+        self.assertEqual(image.size, (256, 128))
+
+    def test_replacing_an_image_removes_its_variants(self):
+        import io
+        from PIL import Image
+        from django.core.files.storage import default_storage
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from core.services import image_variants
+
+        def png():
+            buffer = io.BytesIO()
+            Image.new('RGB', (300, 300), 'blue').save(buffer, 'PNG')
+            return SimpleUploadedFile("me.png", buffer.getvalue(), content_type="image/png")
+
+        user = User.objects.create_user(username="image_student", password="password123", avatar=png())
+        old = user.avatar.name
+        variant = image_variants.get_or_create_variant(old, 64, 'webp')
+
+        user = User.objects.get(pk=user.pk)
+        user.avatar = png()
+        user.save()
+        self.assertFalse(default_storage.exists(variant))
+        self.assertFalse(default_storage.exists(old))
+        self.assertTrue(default_storage.exists(user.avatar.name))
+
+        current = image_variants.get_or_create_variant(user.avatar.name, 64, 'jpeg')
+        user.delete()
+        self.assertFalse(default_storage.exists(current))
+
+class RollupSignalTest(TestCase):
+    def test_rows_created_completed_and_deletions_are_counted(self):
+        import io
+        from django.core.management import call_command
+        from core.models import CourseDailyStats, LessonProgress, QuizAttempt
+        teacher = User.objects.create_user(username="rollup_teacher", password="password123", role="teacher")
+        student = User.objects.create_user(username="rollup_student", password="password123")
+        course = Course.objects.create(title="Rollup Course", instructor=teacher, price=100)
+        section = Section.objects.create(course=course, title="Intro")
+        lesson = Lesson.objects.create(section=section, title="Quiz lesson", lesson_type='quiz')
+        quiz = Quiz.objects.create(lesson=lesson, title="Check")
+
+        Order.objects.create(user=student, course=course, amount=100, status='completed')
+        LessonProgress.objects.create(user=student, lesson=lesson, is_completed=True)
+        QuizAttempt.objects.create(user=student, quiz=quiz, score=1, total_questions=2)
+        QuizAttempt.objects.create(user=student, quiz=quiz, score=2, total_questions=2).delete()
+
+        fields = ('course_id', 'date', 'completed_orders', 'revenue', 'lesson_completions', 'quiz_attempts', 'quiz_score_total')
+        incremental = list(CourseDailyStats.objects.values(*fields))
+        self.assertEqual(
+            [(row['completed_orders'], row['revenue'], row['lesson_completions'], row['quiz_attempts'], row['quiz_score_total']) for row in incremental],
+            [(1, 100, 1, 1, 50.0)]
+        )
+        call_command('rebuild_daily_stats', stdout=io.StringIO())
+        self.assertEqual(list(CourseDailyStats.objects.values(*fields)), incremental)
+
+class InstructorAnalyticsTest(TestCase):
+    def setUp(self):
+        from core.services.earnings_service import record_order_earnings
+        self.client = APIClient()
+        self.teacher = User.objects.create_user(username="stats_teacher", password="password123", role="teacher")
+        self.course = Course.objects.create(title="Stats Course", instructor=self.teacher, price=100, is_published=True)
+        for i in range(3):
+            student = User.objects.create_user(username=f"stats_student_{i}", password="password123")
+            Enrollment.objects.create(user=student, course=self.course)
+            order = Order.objects.create(user=student, course=self.course, amount=100, status='pending')
+            order.status = 'completed'
+            order.save()
+            record_order_earnings(order)
+
+    def test_constant_queries_for_any_window(self):
+        import datetime
+        from django.utils import timezone
+        today = timezone.localdate()
+        window = {'granularity': 'week', 'start': (today - datetime.timedelta(days=365)).isoformat(), 'end': today.isoformat()}
+        self.client.force_authenticate(user=self.teacher)
+        with self.assertNumQueries(5):
+            res = self.client.get('/api/analytics/', window)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sum(point['enrollments'] for point in res.data['series']), 3)
+        self.assertEqual(res.data['total_students'], 3)
+        self.assertEqual(res.data['total_revenue'], 270.0)
+
+        res = self.client.get('/api/analytics/', {'granularity': 'hour'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_matches_incremental_rollups(self):
+        import io
+        from django.core.management import call_command
+        from core.models import CourseDailyStats
+        incremental = list(CourseDailyStats.objects.values('course_id', 'date', 'new_enrollments', 'completed_orders', 'revenue', 'net_revenue'))
+        call_command('rebuild_daily_stats', chunk_days=1, stdout=io.StringIO())
+        rebuilt = list(CourseDailyStats.objects.values('course_id', 'date', 'new_enrollments', 'completed_orders', 'revenue', 'net_revenue'))
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual(rebuilt[0]['new_enrollments'], 3)
+
+class ExportTest(TestCase):
+    def test_streams_instructor_rows_only(self):
+        teacher = User.objects.create_user(username="export_teacher", password="password123", role="teacher")
+        other = User.objects.create_user(username="export_other", password="password123", role="teacher")
+        student = User.objects.create_user(username="export_student", password="password123")
+        mine = Course.objects.create(title="Mine", instructor=teacher, price=0)
+        theirs = Course.objects.create(title="Theirs", instructor=other, price=0)
+        Enrollment.objects.create(user=student, course=mine)
+        Enrollment.objects.create(user=student, course=theirs)
+
+        client = APIClient()
+        client.force_authenticate(user=teacher)
+        res = client.get('/api/exports/students/', {'output': 'csv'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        lines = b''.join(res.streaming_content).decode().strip().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['enrollment_id', 'student_id', 'username'])
+        self.assertEqual(len(lines), 2)
+        self.assertIn('Mine', lines[1])
+
+        res = client.get('/api/exports/unknown/')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+class CourseFunnelTest(TestCase):
+    def test_drop_off_and_cohort_retention(self):
+        from core.models import LessonProgress
+        teacher = User.objects.create_user(username="funnel_teacher", password="password123", role="teacher")
+        course = Course.objects.create(title="Funnel Course", instructor=teacher, price=0)
+        section = Section.objects.create(course=course, title="S1", order=1)
+        first = Lesson.objects.create(section=section, title="First", order=1)
+        second = Lesson.objects.create(section=section, title="Second", order=2)
+
+        students = [User.objects.create_user(username=f"funnel_student_{i}", password="password123") for i in range(4)]
+        for student in students:
+            Enrollment.objects.create(user=student, course=course)
+        LessonProgress.objects.create(user=students[0], lesson=first, is_completed=True)
+        LessonProgress.objects.create(user=students[0], lesson=second, is_completed=True)
+        LessonProgress.objects.create(user=students[1], lesson=first, is_completed=True)
+
+        client = APIClient()
+        client.force_authenticate(user=teacher)
+        res = client.get(f'/api/analytics/courses/{course.id}/funnel/')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['enrollments'], 4)
+        self.assertEqual(res.data['completed'], 1)
+        self.assertEqual([lesson['reached'] for lesson in res.data['lessons']], [2, 1])
+        self.assertEqual([lesson['drop_off'] for lesson in res.data['lessons']], [1, 1])
+        self.assertEqual(res.data['cohorts'][0]['retention'], [0.5, 0.25])
+
+        # New progress invalidates the cached result
+        LessonProgress.objects.create(user=students[2], lesson=first, is_completed=True)
+        res = client.get(f'/api/analytics/courses/{course.id}/funnel/')
+        self.assertEqual(res.data['lessons'][0]['reached'], 3)
+
+        client.force_authenticate(user=students[3])
+        res = client.get(f'/api/analytics/courses/{course.id}/funnel/')
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_version_is_shared_and_kept_off_the_course_row(self):
+        from core.models import FunnelVersion
+        from core.services import funnel_service
+        teacher = User.objects.create_user(username="funnel_editor", password="password123", role="teacher")
+        course = Course.objects.create(title="Versioned Course", instructor=teacher, price=0)
+
+        funnel_service.invalidate(course.id)
+        funnel_service.invalidate(course.id)
+        self.assertEqual(FunnelVersion.objects.get(course=course).version, 2)
+
+        # A course saved from a deleted row is inserted again, as before
+        Course.objects.filter(pk=course.pk).delete()
+        course.save()
+        self.assertTrue(Course.objects.filter(pk=course.pk).exists())
+
+class ActivityFeedTest(TestCase):
+    def test_feed_covers_every_event_type_in_one_query(self):
+        from core.models import DiscussionReply, Discussion, QuizAttempt
+        teacher = User.objects.create_user(username="feed_teacher", password="password123", role="teacher")
+        student = User.objects.create_user(username="feed_student", password="password123")
+        course = Course.objects.create(title="Feed Course", instructor=teacher, price=0)
+        section = Section.objects.create(course=course, title="S1", order=1)
+        lesson = Lesson.objects.create(section=section, title="L1", order=1)
+        quiz = Quiz.objects.create(lesson=lesson, title="Quiz 1")
+        assignment = Assignment.objects.create(lesson=lesson, title="Essay", instructions="Write")
+
+        Enrollment.objects.create(user=student, course=course)
+        QuizAttempt.objects.create(user=student, quiz=quiz, score=3, total_questions=4)
+        discussion = Discussion.objects.create(title="Question", content="?", author=teacher, course=course)
+        DiscussionReply.objects.create(discussion=discussion, author=student, content="Answer")
+        submission = AssignmentSubmission.objects.create(assignment=assignment, student=student)
+        submission.grade = 90
+        submission.graded_at = submission.submitted_at
+        submission.save()
+
+        client = APIClient()
+        client.force_authenticate(user=teacher)
+        with self.assertNumQueries(1):
+            res = client.get('/api/dashboard/recent-activity/', {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+        res = client.get('/api/dashboard/recent-activity/')
+        titles = {item['title'] for item in res.data['results']}
+        self.assertEqual(titles, {'New Student Enrolled', 'Quiz Completed', 'New Reply', 'Assignment Submitted'})
+
+        client.force_authenticate(user=student)
+        res = client.get('/api/dashboard/recent-activity/')
+        self.assertEqual(res.data['results'][0]['title'], 'Assignment Graded')
+
+class TaskInboxTest(TestCase):
+    def test_tasks_open_and_resolve_with_events(self):
+        import io
+        import datetime
+        from django.core.management import call_command
+        from django.utils import timezone
+        from core.models import Discussion, DiscussionReply, InboxTask
+        teacher = User.objects.create_user(username="inbox_teacher", password="password123", role="teacher")
+        student = User.objects.create_user(username="inbox_student", password="password123")
+        course = Course.objects.create(title="Inbox Course", instructor=teacher, price=0)
+        client = APIClient()
+        client.force_authenticate(user=teacher)
+
+        res = client.get('/api/dashboard/pending-tasks/')
+        self.assertEqual([task['id'] for task in res.data], [f"setup-{course.id}"])
+
+        section = Section.objects.create(course=course, title="S1", order=1)
+        lesson = Lesson.objects.create(section=section, title="L1", order=1)
+        Enrollment.objects.create(user=student, course=course)
+        assignment = Assignment.objects.create(lesson=lesson, title="Essay", instructions="Write", due_date=timezone.now() + datetime.timedelta(days=1))
+        discussion = Discussion.objects.create(title="Help", content="?", author=student, course=course)
+
+        with self.assertNumQueries(1):
+            res = client.get('/api/dashboard/pending-tasks/')
+        self.assertEqual([task['id'] for task in res.data], [f"community-{discussion.id}"])
+
+        client.force_authenticate(user=student)
+        res = client.get('/api/dashboard/pending-tasks/')
+        self.assertEqual([task['id'] for task in res.data], [f"assignment-{assignment.id}"])
+
+        DiscussionReply.objects.create(discussion=discussion, author=teacher, content="Answer")
+        submission = AssignmentSubmission.objects.create(assignment=assignment, student=student)
+        res = client.get('/api/dashboard/pending-tasks/')
+        self.assertEqual(res.data, [])
+
+        client.force_authenticate(user=teacher)
+        res = client.get('/api/dashboard/pending-tasks/')
+        self.assertEqual([task['id'] for task in res.data], [f"grading-{submission.id}"])
+
+        incremental = set(InboxTask.objects.values_list('user_id', 'key'))
+        call_command('rebuild_inbox', stdout=io.StringIO())
+        self.assertEqual(set(InboxTask.objects.values_list('user_id', 'key')), incremental)
+
+        submission.grade = 80
+        submission.graded_at = timezone.now()
+        submission.save()
+        res = client.get('/api/dashboard/pending-tasks/')
+        self.assertEqual(res.data, [])
+
+class DiscussionCounterTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_counters_follow_likes_and_replies(self):
+        from core.models import Discussion, DiscussionReply
+        author = User.objects.create_user(username="thread_author", password="password123")
+        readers = [User.objects.create_user(username=f"thread_reader_{i}", password="password123") for i in range(3)]
+        discussion = Discussion.objects.create(title="Counters", content="?", author=author)
+        client = APIClient()
+
+        for reader in readers:
+            client.force_authenticate(user=reader)
+            res = client.post(f'/api/discussions/{discussion.id}/reply/', {'content': 'Reply'})
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            res = client.post(f'/api/discussions/{discussion.id}/like/')
+            self.assertTrue(res.data['is_liked'])
+        res = client.post(f'/api/discussions/{discussion.id}/like/')
+        self.assertEqual(res.data, {'likes_count': 2, 'is_liked': False})
+
+        reply = discussion.replies.first()
+        reply.liked_by.add(*readers)
+        readers[0].liked_replies.remove(reply)
+        DiscussionReply.objects.filter(pk=discussion.replies.last().pk).delete()
+
+        discussion.refresh_from_db()
+        reply.refresh_from_db()
+        self.assertEqual((discussion.like_count, discussion.reply_count), (2, 2))
+        self.assertEqual(reply.like_count, 2)
+
+        # Query count does not depend on the number of threads or replies
+        other = Discussion.objects.create(title="Another", content="!", author=author)
+        DiscussionReply.objects.create(discussion=other, author=readers[0], content="Reply")
+        with self.assertNumQueries(2):
+            res = client.get('/api/discussions/')
+        self.assertEqual([d['replies_count'] for d in res.data], [1, 2])
+        self.assertNotIn('replies', res.data[0])
+        self.assertEqual(res.data[0]['author']['username'], 'thread_author')
+        self.assertEqual(res.data[0]['last_reply_author']['username'], 'thread_reader_0')
+        self.assertEqual(res.data[1]['excerpt'], '?')
+        with self.assertNumQueries(2):
+            res = client.get(f'/api/discussions/{discussion.id}/')
+        self.assertEqual(res.data['likes_count'], 2)
+        self.assertEqual([r['likes_count'] for r in res.data['replies']], [2, 0])
+
+class LikeNotificationTest(TestCase):
+    def test_likes_coalesce_into_one_notification(self):
+        from core.models import Discussion, DiscussionReply, Notification
+        author = User.objects.create_user(username="popular_author", password="password123")
+        fans = [User.objects.create_user(username=f"fan_{i}", password="password123") for i in range(3)]
+        discussion = Discussion.objects.create(title="Popular", content="!", author=author)
+        client = APIClient()
+
+        for fan in fans:
+            client.force_authenticate(user=fan)
+            res = client.post(f'/api/discussions/{discussion.id}/like/')
+            self.assertTrue(res.data['is_liked'])
+        self.assertEqual(res.data['likes_count'], 3)
+
+        likes = Notification.objects.filter(user=author, group_key=f"like:discussion:{discussion.id}")
+        self.assertEqual(likes.count(), 1)
+        self.assertEqual(likes.get().actor_count, 3)
+        self.assertEqual(likes.get().description, 'fan_2 and 2 others liked your discussion: "Popular"')
+
+        # Bulk adds through the relation are coalesced as well
+        reply = DiscussionReply.objects.create(discussion=discussion, author=author, content="Thanks")
+        reply.liked_by.add(*fans)
+        notification = Notification.objects.get(user=author, group_key=f"like:reply:{reply.id}")
+        self.assertEqual(notification.actor_count, 3)
+        reply.refresh_from_db()
+        self.assertEqual(reply.like_count, 3)
+
+        res = client.post('/api/discussions/999999/like/')
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_repeat_likes_by_one_user_are_counted_once(self):
+        from django.db import IntegrityError, transaction
+        from core.models import Discussion, Notification
+        author = User.objects.create_user(username="fickle_author", password="password123")
+        fans = [User.objects.create_user(username=f"fickle_{i}", password="password123") for i in range(2)]
+        discussion = Discussion.objects.create(title="Fickle", content="!", author=author)
+        client = APIClient()
+
+        client.force_authenticate(user=fans[0])
+        for _ in range(3):
+            client.post(f'/api/discussions/{discussion.id}/like/')  # like, unlike, like
+        client.force_authenticate(user=fans[1])
+        client.post(f'/api/discussions/{discussion.id}/like/')
+        notification = Notification.objects.get(user=author, group_key=f"like:discussion:{discussion.id}")
+        self.assertEqual(notification.actor_count, 2)
+        self.assertEqual(notification.description, 'fickle_1 and 1 other liked your discussion: "Fickle"')
+
+        # A second open group for the same target is refused, so racing first likes share one row
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Notification.objects.create(user=author, group_key=notification.group_key, type='achievement', title="Dup")
+
+class ReplyPaginationTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_detail_embeds_first_page_and_cursor_walks_the_rest(self):
+        from core.models import Discussion, DiscussionReply
+        author = User.objects.create_user(username="deep_author", password="password123")
+        discussion = Discussion.objects.create(title="Deep thread", content="?", author=author)
+        DiscussionReply.objects.bulk_create([
+            DiscussionReply(discussion=discussion, author=author, content=f"Reply {i}") for i in range(45)
+        ])
+        client = APIClient()
+        client.force_authenticate(user=author)
+
+        res = client.get(f'/api/discussions/{discussion.id}/')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        seen = [reply['content'] for reply in res.data['replies']]
+        self.assertEqual(len(seen), 20)
+        next_url = res.data['replies_next']
+        self.assertIn(f'/api/discussions/{discussion.id}/replies/', next_url)
+
+        while next_url:
+            with self.assertNumQueries(1):
+                res = client.get(next_url)
+            seen.extend(reply['content'] for reply in res.data['results'])
+            next_url = res.data['next']
+        self.assertEqual(seen, [f"Reply {i}" for i in range(45)])
+
+
+class AuthorCardTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_cards_are_compact_and_loaded_in_one_batch(self):
+        from core.models import Discussion, DiscussionReply
+        author = User.objects.create_user(username="card_author", password="password123", email="card@example.com", bio="Private")
+        repliers = [User.objects.create_user(username=f"card_replier_{i}", password="password123") for i in range(5)]
+        discussion = Discussion.objects.create(title="Cards", content="?", author=author)
+        DiscussionReply.objects.bulk_create([
+            DiscussionReply(discussion=discussion, author=replier, content="Reply") for replier in repliers
+        ])
+        client = APIClient()
+
+        # Replies, then one query for every missing card; warm cards come from the cache
+        with self.assertNumQueries(2):
+            res = client.get(f'/api/discussions/{discussion.id}/replies/')
+        self.assertEqual(res.data['results'][0]['author'], {
+            'id': repliers[0].id, 'username': 'card_replier_0', 'avatar': None, 'role': 'student', 'is_pro': False
+        })
+        with self.assertNumQueries(1):
+            client.get(f'/api/discussions/{discussion.id}/replies/')
+        with self.assertNumQueries(3):
+            res = client.get(f'/api/discussions/{discussion.id}/')
+        self.assertNotIn('email', res.data['author'])
+        self.assertNotIn('bio', res.data['author'])
+
+        author.is_pro = True
+        author.avatar = 'avatars/card.png'
+        author.save()
+        res = client.get(f'/api/discussions/{discussion.id}/')
+        self.assertTrue(res.data['author']['is_pro'])
+        self.assertTrue(res.data['author']['avatar'].endswith('/api/images/64/webp/avatars/card.png'))
+
+class DiscussionSearchTest(TestCase):
+    def test_search_with_filters(self):
+        from core.models import Discussion, DiscussionReply
+        teacher = User.objects.create_user(username="search_teacher", password="password123", role="teacher")
+        student = User.objects.create_user(username="search_student", password="password123")
+        course = Course.objects.create(title="Search Course", instructor=teacher, price=0)
+        by_title = Discussion.objects.create(title="Recursion base case", content="Stack overflow?", author=student, course=course)
+        by_reply = Discussion.objects.create(title="Help", content="Stuck on lesson 3", author=student, is_resolved=True)
+        DiscussionReply.objects.create(discussion=by_reply, author=teacher, content="Think about the recursion depth")
+        Discussion.objects.create(title="Unrelated", content="Nothing here", author=teacher)
+
+        client = APIClient()
+        res = client.get('/api/discussions/', {'q': 'recursion'})
+        self.assertEqual({d['id'] for d in res.data}, {by_title.id, by_reply.id})
+        res = client.get('/api/discussions/', {'q': 'recursion', 'resolved': 'true'})
+        self.assertEqual([d['id'] for d in res.data], [by_reply.id])
+        res = client.get('/api/discussions/', {'q': 'recursion', 'course': course.id, 'author': student.id})
+        self.assertEqual([d['id'] for d in res.data], [by_title.id])
+
+    def test_author_names_match_and_bad_ids_are_rejected(self):
+        from core.models import Discussion
+        author = User.objects.create_user(username="aminata_writer", password="password123")
+        other = User.objects.create_user(username="someone_else", password="password123")
+        mine = Discussion.objects.create(title="Question", content="?", author=author)
+        Discussion.objects.create(title="Another", content="!", author=other)
+
+        client = APIClient()
+        res = client.get('/api/discussions/', {'q': 'aminata'})
+        self.assertEqual([d['id'] for d in res.data], [mine.id])
+        for name in ('author', 'course'):
+            res = client.get('/api/discussions/', {name: 'abc'})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reply_is_saved_when_indexing_fails(self):
+        from unittest import mock
+        from django.db import DatabaseError
+        from core.models import Discussion, DiscussionReply
+        author = User.objects.create_user(username="index_author", password="password123")
+        discussion = Discussion.objects.create(title="Indexed", content="?", author=author)
+        with mock.patch('core.services.search_service.is_supported', return_value=True), \
+                mock.patch('core.services.search_service.search_document', side_effect=DatabaseError("string is too long for tsvector")):
+            reply = DiscussionReply.objects.create(discussion=discussion, author=author, content="Still saved")
+        self.assertTrue(DiscussionReply.objects.filter(pk=reply.pk).exists())
+
+@skipUnless(connection.vendor == 'postgresql', "Full-text search runs on PostgreSQL only")
+class PostgresSearchIndexTest(TestCase):
+    def test_gin_index_and_capped_vectors(self):
+        from django.conf import settings
+        from django.contrib.postgres.search import SearchQuery
+        from core.models import Discussion, DiscussionReply
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT indexdef FROM pg_indexes WHERE indexname = 'core_discussion_search_idx'")
+            self.assertIn('gin', cursor.fetchone()[0].lower())
+
+        author = User.objects.create_user(username="long_thread_author", password="password123")
+        discussion = Discussion.objects.create(title="Long thread", content="Many replies", author=author)
+        # Unique words throughout: indexed whole, this thread would pass the 1MB tsvector limit
+        DiscussionReply.objects.bulk_create([
+            DiscussionReply(discussion=discussion, author=author, content=" ".join(f"w{i}n{j}" for j in range(600)))
+            for i in range(300)
+        ])
+        DiscussionReply.objects.create(discussion=discussion, author=author, content="zebracorn latest")
+        Discussion.objects.create(title="zebracorn", content="In the title", author=author)
+
+        res = APIClient().get('/api/discussions/', {'q': 'zebracorn'})
+        self.assertEqual(len(res.data), 2)
+        self.assertEqual(res.data[1]['id'], discussion.id)  # reply matches rank below title matches
+        oldest = Discussion.objects.filter(pk=discussion.pk, search_vector=SearchQuery('w0n1', config=settings.SEARCH_CONFIG))
+        self.assertFalse(oldest.exists())
+
+class NotificationOutboxTest(TestCase):
+    def test_outbox_mode_defers_notifications_to_worker(self):
+        import io
+        from django.core.management import call_command
+        from django.test import override_settings
+        from core.models import Discussion, DiscussionReply, Notification, NotificationOutbox
+        author = User.objects.create_user(username="outbox_author", password="password123")
+        replier = User.objects.create_user(username="outbox_replier", password="password123")
+        discussion = Discussion.objects.create(title="Queued", content="?", author=author)
+
+        with override_settings(NOTIFICATION_DELIVERY='outbox'):
+            DiscussionReply.objects.create(discussion=discussion, author=replier, content="Reply")
+        replies = Notification.objects.filter(user=author, type='message')
+        self.assertFalse(replies.exists())
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+        call_command('run_worker', once=True, stdout=io.StringIO())
+        self.assertEqual(replies.get().title, 'New Reply')
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+class NotificationFeedTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_unread_counter_tracks_create_read_and_clear(self):
+        from core.services import notification_service
+        user = User.objects.create_user(username="feed_user", password="password123")
+        client = APIClient()
+        client.force_authenticate(user=user)
+        client.post('/api/notifications/clear/')
+
+        for i in range(3):
+            notification_service.notify(user, 'system', f"Notice {i}", "Body")
+        with self.assertNumQueries(1):
+            res = client.get('/api/notifications/unread-count/')
+        self.assertEqual(res.data, {'unread': 3})
+
+        first = user.notifications.order_by('id').first()
+        client.post(f'/api/notifications/{first.id}/read/')
+        client.post(f'/api/notifications/{first.id}/read/')
+        notification_service.notify(user, 'system', "Notice 3", "Body")
+        self.assertEqual(client.get('/api/notifications/unread-count/').data['unread'], 3)
+
+        client.post('/api/notifications/mark-all-read/')
+        self.assertEqual(client.get('/api/notifications/unread-count/').data['unread'], 0)
+        notification_service.notify(user, 'system', "Notice 4", "Body")
+        client.post('/api/notifications/clear/')
+        self.assertEqual(client.get('/api/notifications/unread-count/').data['unread'], 0)
+        self.assertEqual(client.post('/api/notifications/999999/read/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_worker_deliveries_reach_the_shared_counter(self):
+        from django.test import override_settings
+        from core.services import notification_service
+        user = User.objects.create_user(username="feed_outbox", password="password123")
+        client = APIClient()
+        client.force_authenticate(user=user)
+        client.post('/api/notifications/clear/')
+
+        with override_settings(NOTIFICATION_DELIVERY='outbox'):
+            notification_service.notify(user, 'system', "Queued", "Body")
+        self.assertEqual(client.get('/api/notifications/unread-count/').data['unread'], 0)
+        notification_service.drain_outbox()
+        self.assertEqual(client.get('/api/notifications/unread-count/').data['unread'], 1)
+
+    def test_feed_is_cursor_paginated(self):
+        from core.models import Notification
+        user = User.objects.create_user(username="feed_pager", password="password123")
+        user.notifications.all().delete()
+        Notification.objects.bulk_create([
+            Notification(user=user, type='system', title=f"Notice {i}", description="Body", is_read=i % 2 == 0)
+            for i in range(25)
+        ])
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        res = client.get('/api/notifications/')
+        self.assertEqual(len(res.data['results']), 20)
+        self.assertIn('created_at', res.data['results'][0])
+        seen = [n['id'] for n in res.data['results']]
+        seen += [n['id'] for n in client.get(res.data['next']).data['results']]
+        self.assertEqual(len(set(seen)), 25)
+
+        res = client.get('/api/notifications/', {'unread': 'true'})
+        self.assertEqual(len(res.data['results']), 12)
+        self.assertTrue(all(not n['is_read'] for n in res.data['results']))
+
+class EventStreamTest(TestCase):
+    def test_stream_resumes_after_last_event_id(self):
+        from asgiref.sync import async_to_sync
+        from core.models import Conversation, StreamEvent
+        from core.services import event_service, notification_service
+        user = User.objects.create_user(username="stream_user", password="password123")
+        sender = User.objects.create_user(username="stream_sender", password="password123")
+        with self.captureOnCommitCallbacks(execute=True):
+            notification_service.notify(user, 'system', "First", "Body")
+        seen = StreamEvent.objects.filter(user=user).latest('id').id
+        conversation = Conversation.objects.create()
+        conversation.participants.add(user, sender)
+        sender_client = APIClient()
+        sender_client.force_authenticate(user=sender)
+        with self.captureOnCommitCallbacks(execute=True):
+            notification_service.notify(user, 'system', "Second", "Body")
+            sender_client.post(f'/api/conversations/{conversation.id}/messages/', {'content': "Hello"}, format='json')
+
+        client = APIClient()
+        client.force_authenticate(user=user)
+        ticket = client.post('/api/events/ticket/').data['ticket']
+        # The WSGI web process does not hold streams open
+        res = self.client.get('/api/events/stream/', {'ticket': ticket})
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        async def read_stream():
+            res = await self.async_client.get('/api/events/stream/')
+            self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+            res = await self.async_client.get('/api/events/stream/', {'ticket': ticket}, headers={'Last-Event-ID': str(seen)})
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res['Content-Type'], 'text/event-stream')
+            chunks = aiter(res.streaming_content)
+            self.assertTrue((await anext(chunks)).startswith(b'retry:'))
+            self.assertIn(b'"Second"', await anext(chunks))
+            res.close()
+
+            stream = event_service.Stream(user.id, seen, lifetime=0)
+            try:
+                return ''.join([chunk async for chunk in stream])
+            finally:
+                stream.close()
+
+        events = async_to_sync(read_stream)()
+        self.assertNotIn('"First"', events)
+        self.assertIn('event: message', events)
+        self.assertIn('"is_me": false', events)
+
+    def test_poller_delivers_rows_that_commit_after_higher_ids(self):
+        from asgiref.sync import async_to_sync
+        from core.models import StreamEvent
+        from core.services import event_service
+        user = User.objects.create_user(username="stream_late", password="password123")
+        backend = event_service.DatabaseBackend()
+
+        async def open_subscription():
+            return event_service.Subscription(user.id)
+
+        subscription = async_to_sync(open_subscription)()
+        backend.subscribe(subscription, 0)
+        cursor = StreamEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        # id cursor + 1 is still uncommitted when the poller passes cursor + 2
+        StreamEvent.objects.create(id=cursor + 2, user=user, kind='notification', data={'n': 2})
+        backend._poll_once()
+        self.assertEqual([event[0] for event in backend.take(subscription)], [cursor + 2])
+        StreamEvent.objects.create(id=cursor + 1, user=user, kind='notification', data={'n': 1})
+        backend._poll_once()
+        self.assertEqual([event[0] for event in backend.take(subscription)], [cursor + 1])
+        backend.unsubscribe(subscription)
+
+    def test_tickets_expire_and_streams_are_capped(self):
+        from unittest import mock
+        from asgiref.sync import async_to_sync
+        from django.core import signing
+        from core.services import event_service
+        user = User.objects.create_user(username="stream_capped", password="password123")
+        stale = signing.dumps({'user': user.id}, salt=event_service.TICKET_SALT)
+        ticket = event_service.issue_ticket(user.id)
+
+        async def open_streams():
+            with mock.patch('django.core.signing.time.time', return_value=signing.time.time() + event_service.TICKET_MAX_AGE + 1):
+                res = await self.async_client.get('/api/events/stream/', {'ticket': stale})
+            self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+            res = await self.async_client.get('/api/events/stream/', {'ticket': 'forged'})
+            self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+            first = await self.async_client.get('/api/events/stream/', {'ticket': ticket})
+            self.assertEqual(first.status_code, status.HTTP_200_OK)
+            second = await self.async_client.get('/api/events/stream/', {'ticket': ticket})
+            self.assertEqual(second.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertIn('Retry-After', second)
+            first.close()
+            third = await self.async_client.get('/api/events/stream/', {'ticket': ticket})
+            self.assertEqual(third.status_code, status.HTTP_200_OK)
+            third.close()
+
+        with self.settings(EVENT_STREAM_MAX_CONNECTIONS=1):
+            async_to_sync(open_streams)()
+
+class ConversationInboxTest(TestCase):
+    def test_inbox_uses_stored_summaries(self):
+        from core.models import Conversation
+        user = User.objects.create_user(username="inbox_owner", password="password123")
+        client = APIClient()
+        client.force_authenticate(user=user)
+        for i in range(3):
+            other = User.objects.create_user(username=f"inbox_peer_{i}", password="password123")
+            conversation = Conversation.objects.create()
+            conversation.participants.add(user, other)
+            peer = APIClient()
+            peer.force_authenticate(user=other)
+            for j in range(i + 1):
+                peer.post(f'/api/conversations/{conversation.id}/messages/', {'content': f"Message {j}"}, format='json')
+        client.post(f'/api/conversations/{conversation.id}/messages/', {'content': "My reply"}, format='json')
+
+        with self.assertNumQueries(2):
+            res = client.get('/api/conversations/')
+        rows = {row['participant_name']: row for row in res.data}
+        self.assertEqual(rows['inbox_peer_0']['unread_count'], 1)
+        self.assertEqual(rows['inbox_peer_1']['last_message'], "Message 1")
+        self.assertEqual(rows['inbox_peer_2']['unread_count'], 3)
+        self.assertEqual(rows['inbox_peer_2']['last_message'], "My reply")
+        self.assertEqual(res.data[0]['participant_name'], 'inbox_peer_2')
+
+        client.post(f'/api/conversations/{conversation.id}/read/')
+        membership = conversation.memberships.get(user=user)
+        self.assertEqual(membership.unread_count, 0)
+        self.assertEqual(membership.last_read_message_id, Conversation.objects.get(pk=conversation.id).last_message_id)
+        self.assertFalse(conversation.messages.filter(is_read=False).exclude(sender=user).exists())
+
+class MessageSyncTest(TestCase):
+    def test_history_pages_and_incremental_sync(self):
+        from core.models import Conversation, Message
+        user = User.objects.create_user(username="sync_user", password="password123")
+        peer = User.objects.create_user(username="sync_peer", password="password123")
+        outsider = User.objects.create_user(username="sync_outsider", password="password123")
+        conversation = Conversation.objects.create()
+        conversation.participants.add(user, peer)
+        Message.objects.bulk_create([
+            Message(conversation=conversation, sender=peer if i % 2 else user, content=f"Message {i}") for i in range(45)
+        ])
+        client = APIClient()
+        client.force_authenticate(user=user)
+        url = f'/api/conversations/{conversation.id}/messages/'
+
+        with self.assertNumQueries(2):
+            res = client.get(url)
+        self.assertEqual([m['content'] for m in res.data['results'][:2]], ["Message 44", "Message 43"])
+        self.assertTrue(res.data['has_more'])
+        newest = res.data['after']
+        res = client.get(url, {'before': res.data['before']})
+        self.assertEqual(len(res.data['results']), 15)
+        self.assertFalse(res.data['has_more'])
+        self.assertEqual(res.data['results'][-1]['content'], "Message 0")
+
+        peer_client = APIClient()
+        peer_client.force_authenticate(user=peer)
+        peer_client.post(url, {'content': "New one"}, format='json')
+        res = client.get(url, {'after': newest})
+        self.assertEqual([m['content'] for m in res.data['results']], ["New one"])
+        self.assertEqual(client.get(url, {'after': res.data['after']}).data['results'], [])
+
+        outsider_client = APIClient()
+        outsider_client.force_authenticate(user=outsider)
+        self.assertEqual(outsider_client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(outsider_client.post(url, {'content': "Hi"}, format='json').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(client.get(url, {'after': 'x'}).status_code, status.HTTP_404_NOT_FOUND)
+
+class DirectConversationTest(TestCase):
+    def test_get_or_create_uses_pair_key(self):
+        from core.models import Conversation
+        user = User.objects.create_user(username="pair_user", password="password123")
+        other = User.objects.create_user(username="pair_other", password="password123", email="pair_other@example.com")
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        res = client.post('/api/conversations/', {'user_id': other.id}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        conversation = Conversation.objects.get(pk=res.data['id'])
+        self.assertEqual(conversation.direct_key, f"{min(user.id, other.id)}:{max(user.id, other.id)}")
+
+        other_client = APIClient()
+        other_client.force_authenticate(user=other)
+        res = other_client.post('/api/conversations/', {'user_id': user.id}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], conversation.id)
+        res = client.post('/api/conversations/', {'email': "pair_other@example.com"}, format='json')
+        self.assertEqual(res.data['id'], conversation.id)
+        self.assertEqual(Conversation.objects.count(), 1)
+
+class AnnouncementTest(TestCase):
+    def test_announcement_is_read_through_enrollments_and_fanned_out_in_chunks(self):
+        from core.models import Enrollment, Notification, Announcement
+        from core.services import announcement_service
+        teacher = User.objects.create_user(username="announce_teacher", password="password123", role="teacher")
+        outsider = User.objects.create_user(username="announce_outsider", password="password123")
+        course = Course.objects.create(title="Broadcast Course", instructor=teacher, price=0)
+        students = [User.objects.create_user(username=f"announce_student_{i}", password="password123") for i in range(5)]
+        for student in students:
+            Enrollment.objects.create(user=student, course=course)
+        url = f'/api/courses/{course.id}/announcements/'
+
+        client = APIClient()
+        client.force_authenticate(user=students[0])
+        self.assertEqual(client.post(url, {'title': "Hi", 'body': "Nope"}, format='json').status_code, status.HTTP_403_FORBIDDEN)
+        client.force_authenticate(user=teacher)
+        res = client.post(url, {'title': "Exam moved", 'body': "Now on Friday"}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(Notification.objects.filter(title__startswith="Announcement").exists())
+
+        client.force_authenticate(user=students[3])
+        self.assertEqual(client.get('/api/announcements/').data['results'][0]['title'], "Exam moved")
+        self.assertEqual(client.get(url).data['results'][0]['author_name'], "announce_teacher")
+        client.force_authenticate(user=outsider)
+        self.assertEqual(client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(client.get('/api/announcements/').data['results'], [])
+
+        self.assertEqual([announcement_service.fan_out(chunk_size=2) for _ in range(4)], [2, 2, 1, 0])
+        self.assertEqual(
+            set(Notification.objects.filter(title="Announcement in Broadcast Course").values_list('user_id', flat=True)),
+            {student.id for student in students}
+        )
+        self.assertFalse(Announcement.objects.get().fanout_pending)
+
+    def test_failing_announcement_does_not_block_the_others(self):
+        from unittest import mock
+        from django.utils import timezone
+        from core.models import Enrollment, Notification, Announcement
+        from core.services import announcement_service, notification_service
+        teacher = User.objects.create_user(username="stuck_teacher", password="password123", role="teacher")
+        student = User.objects.create_user(username="stuck_student", password="password123")
+        course = Course.objects.create(title="Stuck Course", instructor=teacher, price=0)
+        Enrollment.objects.create(user=student, course=course)
+        stuck = Announcement.objects.create(course=course, author=teacher, title="Stuck", body="...", fanout_pending=True)
+        later = Announcement.objects.create(course=course, author=teacher, title="Later", body="...", fanout_pending=True)
+        deliver = notification_service.deliver
+
+        def fail_for_stuck(notifications):
+            if notifications[0].description == "Stuck":
+                raise RuntimeError("boom")
+            return deliver(notifications)
+
+        with mock.patch.object(notification_service, 'deliver', side_effect=fail_for_stuck):
+            self.assertEqual(announcement_service.fan_out(), 0)
+            stuck.refresh_from_db()
+            self.assertEqual((stuck.fanout_pending, stuck.fanout_attempts, stuck.fanout_error), (True, 1, "boom"))
+            self.assertGreater(stuck.fanout_next_attempt_at, timezone.now())
+            self.assertEqual(announcement_service.fan_out(), 1)
+            self.assertTrue(Notification.objects.filter(user=student, description="Later").exists())
+            self.assertEqual(announcement_service.fan_out(), 0)
+
+            for _ in range(announcement_service.MAX_ATTEMPTS - 1):
+                Announcement.objects.filter(pk=stuck.pk).update(fanout_next_attempt_at=timezone.now())
+                announcement_service.fan_out()
+        stuck.refresh_from_db()
+        later.refresh_from_db()
+        self.assertFalse(stuck.fanout_pending)
+        self.assertEqual(stuck.fanout_attempts, announcement_service.MAX_ATTEMPTS)
+        self.assertFalse(later.fanout_pending)
+        self.assertFalse(Notification.objects.filter(user=student, description="Stuck").exists())
+
+class CourseRatingTest(TestCase):
+    def test_summary_follows_review_changes(self):
+        from core.models import Review
+        teacher = User.objects.create_user(username="rating_teacher", password="password123", role="teacher")
+        course = Course.objects.create(title="Rated Course", instructor=teacher, price=0)
+        reviewers = [User.objects.create_user(username=f"rating_user_{i}", password="password123") for i in range(12)]
+        for i, reviewer in enumerate(reviewers[:11]):
+            Review.objects.create(course=course, user=reviewer, rating=5 if i % 2 else 3, comment="Fine")
+
+        client = APIClient()
+        client.force_authenticate(user=reviewers[11])
+        res = client.post(f'/api/courses/{course.id}/reviews/', {'rating': 4, 'comment': "Good"}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(client.post(f'/api/courses/{course.id}/reviews/', {'rating': 9, 'comment': "?"}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+        edited = Review.objects.filter(rating=3).first()
+        edited.rating = 1
+        edited.save()
+        Review.objects.filter(rating=5).first().delete()
+
+        with self.assertNumQueries(1):
+            summary = client.get(f'/api/courses/{course.id}/reviews/summary/').data
+        self.assertEqual(summary['count'], 11)
+        self.assertEqual(summary['histogram'], {'1': 1, '2': 0, '3': 5, '4': 1, '5': 4})
+        self.assertEqual(summary['average'], round((1 + 15 + 4 + 20) / 11, 2))
+        self.assertAlmostEqual(client.get(f'/api/courses/{course.id}/').data['average_rating'], 40 / 11)
+
+        with self.assertNumQueries(1):
+            res = client.get(f'/api/courses/{course.id}/reviews/')
+        self.assertEqual(len(res.data['results']), 10)
+        self.assertTrue(res.data['results'][0]['user_name'].startswith('rating_user_'))
+        self.assertEqual(len(client.get(res.data['next']).data['results']), 1)
+
+class PaymentWebhookTest(TestCase):
+    def test_ipn_is_queued_and_applied_once_by_the_worker(self):
+        from unittest import mock
+        from django.test import override_settings
+        from django.utils import timezone
+        from core.models import Notification, PaymentWebhook
+        from core.services import payment_service
+        teacher = User.objects.create_user(username="ipn_teacher", password="password123", role="teacher")
+        student = User.objects.create_user(username="ipn_student", password="password123")
+        course = Course.objects.create(title="Paid Course", instructor=teacher, price=Decimal('5000'))
+        order = Order.objects.create(user=student, course=course, amount=Decimal('5000'), status='pending')
+        verified = {'status': 'pending', 'order_id': order.id, 'transaction_id': 'tx_1', 'total_amount': '5000'}
+        client = APIClient()
+
+        # With a worker the endpoint only stores the token; duplicates collapse into one row
+        with mock.patch('core.services.payment_service.PayDunyaService') as service, \
+                override_settings(PAYMENT_PROCESSING='worker'):
+            service.return_value.verify_ipn.return_value = verified
+            for _ in range(2):
+                res = client.post('/api/payments/paydunya/ipn/', {'token': 'tok_1'})
+                self.assertEqual(res.data, {'status': 'received'})
+            self.assertFalse(service.called)
+            self.assertEqual(PaymentWebhook.objects.count(), 1)
+
+            # Still pending at the provider: retried later with backoff
+            self.assertEqual(payment_service.process_webhooks(), 1)
+            webhook = PaymentWebhook.objects.get()
+            self.assertEqual((webhook.status, webhook.attempts), ('pending', 1))
+            self.assertGreater(webhook.next_attempt_at, timezone.now())
+            self.assertEqual(payment_service.process_webhooks(), 0)
+
+            verified['status'] = 'completed'
+            PaymentWebhook.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(payment_service.process_webhooks(), 1)
+
+        webhook.refresh_from_db()
+        order.refresh_from_db()
+        self.assertEqual((webhook.status, webhook.order_id), ('processed', order.id))
+        self.assertEqual((order.status, order.provider_transaction_id), ('completed', 'tx_1'))
+        self.assertTrue(Enrollment.objects.filter(user=student, course=course).exists())
+        self.assertEqual(EarningsEntry.objects.filter(order=order).count(), 1)
+
+        # A late duplicate confirmation is a no-op
+        _, changed = payment_service.complete_order(order.id, 'tx_1', '5000')
+        self.assertFalse(changed)
+        self.assertEqual(Notification.objects.filter(user=student, title="Inscription réussie").count(), 1)
+        with self.assertRaises(payment_service.PaymentError):
+            payment_service.complete_order(order.id, 'tx_1', '100')
+
+    def test_ipn_request_does_not_call_the_provider_by_default(self):
+        from unittest import mock
+        from django.test import override_settings
+        from core.models import PaymentWebhook
+        teacher = User.objects.create_user(username="inline_teacher", password="password123", role="teacher")
+        student = User.objects.create_user(username="inline_student", password="password123")
+        course = Course.objects.create(title="Inline Course", instructor=teacher, price=Decimal('5000'))
+        order = Order.objects.create(user=student, course=course, amount=Decimal('5000'), status='pending')
+        verified = {'status': 'pending', 'order_id': order.id, 'transaction_id': 'tx_2', 'total_amount': '5000'}
+        client = APIClient()
+
+        with mock.patch('core.services.payment_service.PayDunyaService') as service:
+            with self.captureOnCommitCallbacks(execute=True):
+                res = client.post('/api/payments/paydunya/ipn/', {'token': 'tok_2'})
+            self.assertEqual(res.data, {'status': 'received'})
+            self.assertFalse(service.called)
+            self.assertEqual(PaymentWebhook.objects.get().attempts, 0)
+
+        # Inline verification is opt-in for deployments without a worker
+        with mock.patch('core.services.payment_service.PayDunyaService') as service, \
+                override_settings(PAYMENT_PROCESSING='inline'):
+            service.return_value.verify_ipn.return_value = verified
+            with self.captureOnCommitCallbacks(execute=True):
+                client.post('/api/payments/paydunya/ipn/', {'token': 'tok_2'})
+            self.assertEqual(PaymentWebhook.objects.get().attempts, 1)
+
+            # PayDunya's redelivery retries it without waiting for the backoff
+            verified['status'] = 'completed'
+            with self.captureOnCommitCallbacks(execute=True):
+                client.post('/api/payments/paydunya/ipn/', {'token': 'tok_2'})
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'completed')
+        self.assertEqual(PaymentWebhook.objects.get().status, 'processed')
+        self.assertTrue(Enrollment.objects.filter(user=student, course=course).exists())
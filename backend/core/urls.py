@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import auth_views, course_views, learning_views, community_views, business_views, analytics_views, utility_views
+from .views import auth_views, course_views, learning_views, community_views, business_views, analytics_views, utility_views, media_views
 
 urlpatterns = [
     # Auth & Profile
@@ -10,11 +10,19 @@ urlpatterns = [
     path('courses/', course_views.CourseListView.as_view(), name='course-list'),
     path('courses/<int:pk>/', course_views.CourseDetailView.as_view(), name='course-detail'),
     path('courses/invite/', course_views.InvitationView.as_view(), name='invite-student'),
+    path('courses/<int:pk>/announcements/', course_views.CourseAnnouncementListView.as_view(), name='course-announcements'),
+    path('announcements/', course_views.AnnouncementFeedView.as_view(), name='announcement-feed'),
     path('lessons/', course_views.LessonCreateView.as_view(), name='lesson-create'),
     path('lessons/<int:pk>/video/', course_views.LessonVideoUploadView.as_view(), name='lesson-video-upload'),
     path('lessons/<int:lesson_pk>/resources/', course_views.ResourceCreateView.as_view(), name='resource-create'),
     path('resources/<int:pk>/', course_views.ResourceDeleteView.as_view(), name='resource-delete'),
 
+    # Media Delivery
+    path('lessons/<int:pk>/media/', media_views.LessonMediaView.as_view(), name='lesson-media'),
+    path('resources/<int:pk>/download/', media_views.ResourceDownloadView.as_view(), name='resource-download'),
+    path('media/stream/<str:token>/', media_views.MediaStreamView.as_view(), name='media-stream'),
+    path('images/<int:size>/<str:fmt>/<path:name>', media_views.ImageVariantView.as_view(), name='image-variant'),
+
     # Learning & Progress
     path('courses/<int:pk>/enroll/', learning_views.EnrollView.as_view(), name='enroll'),
     path('learning/add-xp/', learning_views.AddXPView.as_view(), name='add-xp'),
@@ -30,11 +38,13 @@ urlpatterns = [
     # Community & Messaging
     path('discussions/', community_views.DiscussionListView.as_view(), name='discussion-list'),
     path('discussions/<int:pk>/', community_views.DiscussionDetailView.as_view(), name='discussion-detail'),
+    path('discussions/<int:pk>/replies/', community_views.DiscussionReplyListView.as_view(), name='discussion-replies'),
     path('discussions/<int:pk>/reply/', community_views.ReplyCreateView.as_view(), name='reply-create'),
     path('discussions/<int:pk>/like/', community_views.LikeDiscussionView.as_view(), name='like-discussion'),
     path('replies/<int:pk>/like/', community_views.LikeReplyView.as_view(), name='like-reply'),
     path('leaderboard/', community_views.LeaderboardView.as_view(), name='leaderboard'),
     path('courses/<int:course_pk>/reviews/', community_views.ReviewListView.as_view(), name='course-reviews'),
+    path('courses/<int:course_pk>/reviews/summary/', community_views.ReviewSummaryView.as_view(), name='course-review-summary'),
     path('conversations/', community_views.ConversationListView.as_view(), name='conversation-list'),
     path('conversations/<int:pk>/messages/', community_views.MessageListView.as_view(), name='message-list'),
     path('conversations/<int:pk>/read/', community_views.MarkMessagesReadView.as_view(), name='mark-messages-read'),
@@ -51,15 +61,21 @@ urlpatterns = [
     path('payments/paydunya/checkout/', business_views.CreatePayDunyaCheckoutView.as_view(), name='paydunya-checkout'),
     path('payments/paydunya/direct-initiate/', business_views.InitiateDirectPaymentView.as_view(), name='paydunya-direct-initiate'),
     path('payments/paydunya/ipn/', business_views.PayDunyaIPNView.as_view(), name='paydunya-ipn'),
+    path('earnings/', business_views.EarningsView.as_view(), name='earnings'),
 
     # Analytics & Reports
     path('analytics/', analytics_views.AnalyticsView.as_view(), name='analytics'),
+    path('analytics/courses/<int:pk>/funnel/', analytics_views.CourseFunnelView.as_view(), name='course-funnel'),
+    path('exports/<str:dataset>/', analytics_views.ExportView.as_view(), name='export'),
     path('dashboard/student-report/', analytics_views.StudentReportView.as_view(), name='student-report'),
     path('dashboard/recent-activity/', analytics_views.RecentActivityView.as_view(), name='recent-activity'),
     path('quizzes/student-analytics/', analytics_views.StudentAnalyticsView.as_view(), name='student-analytics'),
 
     # Utility
     path('notifications/', utility_views.NotificationListView.as_view(), name='notification-list'),
+    path('events/ticket/', utility_views.EventStreamTicketView.as_view(), name='event-stream-ticket'),
+    path('events/stream/', utility_views.EventStreamView.as_view(), name='event-stream'),
+    path('notifications/unread-count/', utility_views.UnreadNotificationCountView.as_view(), name='notification-unread-count'),
     path('notifications/<int:pk>/read/', utility_views.MarkNotificationReadView.as_view(), name='mark-notification-read'),
     path('notifications/mark-all-read/', utility_views.MarkAllNotificationsReadView.as_view(), name='mark-all-read'),
     path('notifications/clear/', utility_views.ClearNotificationsView.as_view(), name='clear-notifications'),
@@ -5,3 +5,4 @@ from .community_views import *
 from .business_views import *
 from .analytics_views import *
 from .utility_views import *
+from .media_views import *
@@ -1,67 +1,79 @@
-import datetime
+import tempfile
+from django.http import StreamingHttpResponse, FileResponse
 from django.utils import timezone
-from django.db.models import Sum, Avg, Count
+from django.db.models import Avg
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework import permissions
-from ..models import Course, Enrollment, Assignment, QuizAttempt, LessonProgress, Certificate
+from rest_framework import generics, permissions
+from ..models import Course, Enrollment, QuizAttempt, LessonProgress, Certificate, ActivityEvent
+from ..serializers import ActivityEventSerializer
+from ..pagination import ActivityCursorPagination
+from ..services.analytics_service import AnalyticsQueryError, parse_window, instructor_analytics
+from ..services.funnel_service import course_funnel
+from ..services.export_service import ExportError, export_rows, iter_csv, write_parquet
 
 class AnalyticsView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get(self, request):
-        if request.user.role != 'teacher':
+        if request.user.role != 'teacher' and not request.user.is_staff:
             return Response({"error": "Only instructors can access analytics"}, status=403)
 
-        courses = Course.objects.filter(instructor=request.user)
-        total_students = Enrollment.objects.filter(course__instructor=request.user).values('user').distinct().count()
-        total_assignments = Assignment.objects.filter(lesson__section__course__instructor=request.user).count()
-        
-        gross_revenue = Enrollment.objects.filter(course__instructor=request.user).aggregate(total=Sum('course__price'))['total'] or 0
-        net_revenue = float(gross_revenue) * 0.9
-        
-        enrollments = Enrollment.objects.filter(course__instructor=request.user)
-        avg_completion_rate = enrollments.aggregate(avg=Avg('progress'))['avg'] or 0 if enrollments.exists() else 0
-        
-        last_7_days = []
-        for i in range(6, -1, -1):
-            date = timezone.now().date() - datetime.timedelta(days=i)
-            day_name = date.strftime('%a')
-            daily_gross = Enrollment.objects.filter(
-                course__instructor=request.user, 
-                enrolled_at__date=date
-            ).aggregate(total=Sum('course__price'))['total'] or 0
-            
-            daily_net = float(daily_gross) * 0.9
-            
-            last_7_days.append({
-                "name": day_name,
-                "revenue": daily_net,
-                "users": Enrollment.objects.filter(course__instructor=request.user, enrolled_at__date=date).count()
-            })
+        try:
+            start, end, granularity, course_id = parse_window(request.query_params)
+        except AnalyticsQueryError as e:
+            return Response({"error": str(e)}, status=400)
 
-        top_courses = []
-        courses_query = Course.objects.filter(instructor=request.user).annotate(
-            sales=Count('enrollments'),
-            revenue=Sum('enrollments__course__price')
-        ).order_by('-revenue')[:3]
-        
-        for course in courses_query:
-            top_courses.append({
-                "title": course.title,
-                "sales": course.sales or 0,
-                "revenue": float(course.revenue or 0) * 0.9,
-                "growth": "+5%"
-            })
+        # Staff accounts that do not teach get platform-wide figures
+        instructor = request.user if request.user.role == 'teacher' else None
+        return Response(instructor_analytics(instructor, start, end, granularity, course_id))
 
-        return Response({
-            "total_revenue": net_revenue,
-            "total_students": total_students,
-            "total_assignments": total_assignments,
-            "avg_completion_rate": round(float(avg_completion_rate), 1),
-            "revenue_data": last_7_days,
-            "top_courses": top_courses
-        })
+class CourseFunnelView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, pk):
+        course = Course.objects.filter(pk=pk).only('id', 'instructor_id').first()
+        if not course:
+            return Response({"error": "Course not found"}, status=404)
+        if course.instructor_id != request.user.id and not request.user.is_staff:
+            return Response({"error": "Only the instructor can view this funnel"}, status=403)
+        return Response(course_funnel(course.id))
+
+class ExportView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, dataset):
+        if request.user.role != 'teacher' and not request.user.is_staff:
+            return Response({"error": "Only instructors can export reports"}, status=403)
+
+        # 'format' is reserved by DRF for renderer selection
+        output = request.query_params.get('output', 'csv')
+        course_id = request.query_params.get('course')
+        if course_id and not course_id.isdigit():
+            return Response({"error": "course must be a course id"}, status=400)
+
+        instructor = request.user if request.user.role == 'teacher' else None
+        try:
+            header, rows = export_rows(dataset, instructor, course_id)
+        except ExportError as e:
+            return Response({"error": str(e)}, status=400)
+
+        filename = f"{dataset}-{timezone.localdate().isoformat()}"
+        if output == 'csv':
+            response = StreamingHttpResponse(iter_csv(header, rows), content_type='text/csv')
+            response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+            return response
+        if output == 'parquet':
+            # Parquet needs its footer written last, so spool to a temporary file first
+            buffer = tempfile.TemporaryFile()
+            try:
+                write_parquet(header, rows, buffer)
+            except ExportError as e:
+                buffer.close()
+                return Response({"error": str(e)}, status=400)
+            buffer.seek(0)
+            return FileResponse(buffer, as_attachment=True, filename=f"{filename}.parquet", content_type='application/vnd.apache.parquet')
+        return Response({"error": "output must be 'csv' or 'parquet'"}, status=400)
 
 class StudentReportView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
@@ -153,53 +165,13 @@ class StudentAnalyticsView(APIView):
             "xp": total_xp
         })
 
-class RecentActivityView(APIView):
+class RecentActivityView(generics.ListAPIView):
+    """
+    Activity feed of the current user, newest first, one indexed range scan per page.
+    """
     permission_classes = (permissions.IsAuthenticated,)
-    
-    def get(self, request):
-        from django.utils.timesince import timesince
-        from ..models import DiscussionReply, AssignmentSubmission # Local import due to circularity if any
-        
-        activity = []
-        if request.user.role == 'teacher':
-            enrollments = Enrollment.objects.filter(course__instructor=request.user).select_related('user', 'course').order_by('-enrolled_at')[:5]
-            for enrollment in enrollments:
-                activity.append({
-                    "id": f"enroll-{enrollment.id}",
-                    "type": "alert",
-                    "title": "New Student Enrolled",
-                    "description": f"{enrollment.user.username} joined {enrollment.course.title}",
-                    "time": enrollment.enrolled_at,
-                    "timestamp": enrollment.enrolled_at.timestamp()
-                })
-                
-            attempts = QuizAttempt.objects.filter(quiz__lesson__section__course__instructor=request.user).select_related('user', 'quiz').order_by('-completed_at')[:5]
-            for attempt in attempts:
-                activity.append({
-                    "id": f"attempt-{attempt.id}",
-                    "type": "completion",
-                    "title": "Quiz Completed",
-                    "description": f"{attempt.user.username} scored {attempt.score}/{attempt.total_questions} on {attempt.quiz.title}",
-                    "time": attempt.completed_at,
-                    "timestamp": attempt.completed_at.timestamp()
-                })
-        else:
-            enrollments = Enrollment.objects.filter(user=request.user).select_related('course').order_by('-enrolled_at')[:5]
-            for enrollment in enrollments:
-                activity.append({
-                    "id": f"enroll-{enrollment.id}",
-                    "type": "alert",
-                    "title": "Course Started",
-                    "description": f"You enrolled in {enrollment.course.title}",
-                    "time": enrollment.enrolled_at,
-                    "timestamp": enrollment.enrolled_at.timestamp()
-                })
-            
-        activity.sort(key=lambda x: x['timestamp'], reverse=True)
-        final_activity = []
-        for item in activity[:10]:
-            item['time'] = timesince(item['time'], timezone.now()) + " ago"
-            del item['timestamp']
-            final_activity.append(item)
-            
-        return Response(final_activity)
+    serializer_class = ActivityEventSerializer
+    pagination_class = ActivityCursorPagination
+
+    def get_queryset(self):
+        return ActivityEvent.objects.filter(user=self.request.user)
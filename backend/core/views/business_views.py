@@ -3,12 +3,15 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.utils import timezone
-from django.db.models import Sum
+from django.db.models import Sum, Count
+from django.db.models.functions import TruncMonth
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from ..models import Order, Course, Enrollment, Membership, LiveSession, Notification
-from ..serializers import OrderSerializer, LiveSessionSerializer
+from ..models import Order, Course, Enrollment, Membership, LiveSession, EarningsEntry, InstructorBalance
+from ..serializers import OrderSerializer, LiveSessionSerializer, EarningsEntrySerializer
 from ..services.paydunya_service import PayDunyaService
+from ..services.earnings_service import record_order_earnings
+from ..services import payment_service
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +54,7 @@ class ConfirmPaymentView(APIView):
             order.status = 'completed'
             order.provider_transaction_id = transaction_id
             order.save()
+            record_order_earnings(order)
             
             Enrollment.objects.get_or_create(user=request.user, course=order.course)
             return Response({"status": "success", "message": "Payment confirmed and enrolled"})
@@ -128,6 +132,11 @@ class InitiateDirectPaymentView(APIView):
 
 @method_decorator(csrf_exempt, name='dispatch')
 class PayDunyaIPNView(APIView):
+    """
+    Queues the notification token and acknowledges it; the worker (or, with
+    the opt-in PAYMENT_PROCESSING='inline', this request once committed) confirms it
+    with PayDunya and completes the order (payment_service).
+    """
     permission_classes = (permissions.AllowAny,)
 
     def post(self, request):
@@ -135,41 +144,35 @@ class PayDunyaIPNView(APIView):
         if not token:
              return Response({"status": "error", "message": "No token provided"}, status=400)
 
-        paydunya_service = PayDunyaService()
-        verification_data = paydunya_service.verify_ipn(token)
-
-        if verification_data and verification_data['status'] == 'completed':
-            try:
-                order_id = verification_data['order_id']
-                order = Order.objects.get(pk=order_id)
-                
-                expected_amount = float(order.amount)
-                received_amount = float(verification_data['total_amount'])
-                
-                if abs(expected_amount - received_amount) > 0.01:
-                    logger.error(f"Amount mismatch for Order {order.id}")
-                    return Response({"status": "error", "message": "Amount mismatch"}, status=400)
-
-                if order.status != 'completed':
-                    order.status = 'completed'
-                    order.provider_transaction_id = verification_data['transaction_id']
-                    order.save()
-                    
-                    Enrollment.objects.get_or_create(user=order.user, course=order.course)
-                    
-                    Notification.objects.create(
-                        user=order.user,
-                        type='course',
-                        title="Inscription réussie",
-                        description=f"Bienvenue dans le cours {order.course.title}!",
-                        link=f"/learn/{order.course.id}"
-                    )
-                
-                return Response({"status": "success"})
-            except Order.DoesNotExist:
-                return Response({"status": "error", "message": "Order not found"}, status=404)
-        else:
-            return Response({"status": "error", "message": "Verification failed"}, status=400)
+        payment_service.enqueue(token)
+        return Response({"status": "received"})
+
+class EarningsView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request):
+        if request.user.role != 'teacher':
+            return Response({"error": "Only instructors have earnings"}, status=403)
+
+        balance = InstructorBalance.objects.filter(instructor=request.user).first()
+        entries = EarningsEntry.objects.filter(instructor=request.user)
+        monthly = entries.annotate(month=TruncMonth('created_at')).values('month').annotate(
+            sales=Count('id'),
+            gross=Sum('gross_amount'),
+            fees=Sum('platform_fee'),
+            net=Sum('net_amount')
+        ).order_by('-month')[:12]
+
+        return Response({
+            "balance": {
+                "gross_total": balance.gross_total if balance else 0,
+                "fees_total": balance.fees_total if balance else 0,
+                "net_total": balance.net_total if balance else 0,
+                "sales_count": balance.sales_count if balance else 0,
+            },
+            "monthly": list(monthly),
+            "recent_entries": EarningsEntrySerializer(entries.select_related('course')[:20], many=True).data
+        })
 
 class UpgradeMembershipView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
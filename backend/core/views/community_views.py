@@ -1,24 +1,36 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Count, Exists, OuterRef, Value, BooleanField, Prefetch
+from django.urls import reverse
+from django.db.models import Exists, F, OuterRef, Prefetch, Subquery, Value, BooleanField
+from django.db.models.functions import Substr
 from ..models import (
     Discussion, DiscussionReply, Review, 
     Conversation, Message, User, Course, Notification
 )
 from ..serializers import (
-    DiscussionSerializer, DiscussionReplySerializer, 
+    DiscussionSerializer, DiscussionSummarySerializer, DiscussionReplySerializer, author_cards,
     ReviewSerializer, ConversationSerializer, MessageSerializer, UserSerializer
 )
+from ..services import counter_service, event_service, messaging_service, notification_service, rating_service, search_service
+from ..pagination import MessageCursorPagination, ReplyCursorPagination, ReviewCursorPagination
 
 class DiscussionListView(generics.ListCreateAPIView):
-    serializer_class = DiscussionSerializer
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
+    EXCERPT_LENGTH = 200
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return DiscussionSummarySerializer
+        return DiscussionSerializer
 
     def get_queryset(self):
         user = self.request.user
-        queryset = Discussion.objects.all().select_related('author', 'course').annotate(
-            annotated_replies_count=Count('replies', distinct=True)
+        last_reply = DiscussionReply.objects.filter(discussion=OuterRef('pk')).order_by('-created_at', '-id')
+        queryset = Discussion.objects.select_related('course').defer('content', 'search_vector').annotate(
+            excerpt=Substr('content', 1, self.EXCERPT_LENGTH),
+            last_reply_at=Subquery(last_reply.values('created_at')[:1]),
+            last_reply_author_id=Subquery(last_reply.values('author_id')[:1])
         )
 
         if user.is_authenticated:
@@ -27,36 +39,46 @@ class DiscussionListView(generics.ListCreateAPIView):
         else:
             queryset = queryset.annotate(annotated_is_liked=Value(False, output_field=BooleanField()))
 
-        # Simple search/filter
-        course_id = self.request.query_params.get('course')
+        params = self.request.query_params
+        for name in ('course', 'author'):
+            if params.get(name) and not params[name].isdigit():
+                raise permissions.exceptions.ParseError(f"'{name}' must be a numeric id.")
+        course_id = params.get('course')
         if course_id:
             queryset = queryset.filter(course_id=course_id)
-            
+        author_id = params.get('author')
+        if author_id:
+            queryset = queryset.filter(author_id=author_id)
+        resolved = params.get('resolved')
+        if resolved in ('true', 'false'):
+            queryset = queryset.filter(is_resolved=resolved == 'true')
+        text = params.get('q', '').strip()
+        if text:
+            queryset = search_service.search(queryset, text)
+
         return queryset
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+def reply_queryset(discussion_id, user):
+    replies = DiscussionReply.objects.filter(discussion_id=discussion_id)
+    if user.is_authenticated:
+        reply_likes = DiscussionReply.objects.filter(pk=OuterRef('pk'), liked_by=user)
+        return replies.annotate(annotated_is_liked=Exists(reply_likes))
+    return replies.annotate(annotated_is_liked=Value(False, output_field=BooleanField()))
+
 class DiscussionDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    Returns the discussion with the first page of replies; further pages come
+    from DiscussionReplyListView via `replies_next`.
+    """
     serializer_class = DiscussionSerializer
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
     
     def get_queryset(self):
         user = self.request.user
-        
-        # Optimize replies prefetch with like status
-        replies_qs = DiscussionReply.objects.all().select_related('author')
-        if user.is_authenticated:
-            reply_likes = DiscussionReply.objects.filter(pk=OuterRef('pk'), liked_by=user)
-            replies_qs = replies_qs.annotate(annotated_is_liked=Exists(reply_likes))
-        else:
-            replies_qs = replies_qs.annotate(annotated_is_liked=Value(False, output_field=BooleanField()))
-
-        queryset = Discussion.objects.all().select_related('author', 'course').prefetch_related(
-            Prefetch('replies', queryset=replies_qs)
-        ).annotate(
-            annotated_replies_count=Count('replies', distinct=True)
-        )
+        queryset = Discussion.objects.all().select_related('course')
 
         if user.is_authenticated:
             likes = Discussion.objects.filter(pk=OuterRef('pk'), liked_by=user)
@@ -66,6 +88,20 @@ class DiscussionDetailView(generics.RetrieveUpdateDestroyAPIView):
             
         return queryset
 
+    def retrieve(self, request, *args, **kwargs):
+        discussion = self.get_object()
+        paginator = ReplyCursorPagination()
+        page = paginator.paginate_queryset(reply_queryset(discussion.id, request.user), request, view=self)
+        # Cursor links point at the replies endpoint rather than this one
+        paginator.base_url = request.build_absolute_uri(reverse('discussion-replies', args=[discussion.id]))
+        # One card batch covers the discussion author and every reply author
+        context = self.get_serializer_context()
+        context['authors'] = author_cards({discussion.author_id} | {reply.author_id for reply in page}, context)
+        data = self.get_serializer(discussion, context=context).data
+        data['replies'] = DiscussionReplySerializer(page, many=True, context=context).data
+        data['replies_next'] = paginator.get_next_link()
+        return Response(data)
+
     def perform_update(self, serializer):
         discussion = self.get_object()
         if discussion.author != self.request.user:
@@ -73,6 +109,17 @@ class DiscussionDetailView(generics.RetrieveUpdateDestroyAPIView):
                  raise permissions.exceptions.PermissionDenied("You do not have permission to update this discussion.")
         serializer.save()
 
+class DiscussionReplyListView(generics.ListAPIView):
+    """
+    Replies of a discussion, oldest first, cursor-paginated on (created_at, id).
+    """
+    serializer_class = DiscussionReplySerializer
+    permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
+    pagination_class = ReplyCursorPagination
+
+    def get_queryset(self):
+        return reply_queryset(self.kwargs['pk'], self.request.user)
+
 class ReplyCreateView(generics.CreateAPIView):
     serializer_class = DiscussionReplySerializer
     permission_classes = (permissions.IsAuthenticated,)
@@ -90,30 +137,28 @@ class LikeDiscussionView(APIView):
 
     def post(self, request, pk):
         try:
-            discussion = Discussion.objects.get(pk=pk)
-            if discussion.liked_by.filter(id=request.user.id).exists():
-                discussion.liked_by.remove(request.user)
-                return Response({'likes_count': discussion.likes_count, 'is_liked': False})
-            else:
-                discussion.liked_by.add(request.user)
-                return Response({'likes_count': discussion.likes_count, 'is_liked': True})
+            likes_count, is_liked = counter_service.toggle_like(Discussion, pk, request.user)
         except Discussion.DoesNotExist:
             return Response({'error': 'Discussion not found'}, status=404)
+        if is_liked:
+            discussion = Discussion.objects.only('id', 'title', 'author_id').get(pk=pk)
+            notification_service.notify_likes(discussion, [request.user])
+        return Response({'likes_count': likes_count, 'is_liked': is_liked})
 
 class LikeReplyView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def post(self, request, pk):
         try:
-            reply = DiscussionReply.objects.get(pk=pk)
-            if reply.liked_by.filter(id=request.user.id).exists():
-                reply.liked_by.remove(request.user)
-                return Response({'likes_count': reply.likes_count, 'is_liked': False})
-            else:
-                reply.liked_by.add(request.user)
-                return Response({'likes_count': reply.likes_count, 'is_liked': True})
+            likes_count, is_liked = counter_service.toggle_like(DiscussionReply, pk, request.user)
         except DiscussionReply.DoesNotExist:
             return Response({'error': 'Reply not found'}, status=404)
+        if is_liked:
+            reply = DiscussionReply.objects.select_related('discussion').only(
+                'id', 'author_id', 'discussion__id', 'discussion__title'
+            ).get(pk=pk)
+            notification_service.notify_likes(reply, [request.user])
+        return Response({'likes_count': likes_count, 'is_liked': is_liked})
 
 class LeaderboardView(generics.ListAPIView):
     queryset = User.objects.all().order_by('-xp_points')[:10]
@@ -123,9 +168,12 @@ class LeaderboardView(generics.ListAPIView):
 class ReviewListView(generics.ListCreateAPIView):
     serializer_class = ReviewSerializer
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
+    pagination_class = ReviewCursorPagination
 
     def get_queryset(self):
-        return Review.objects.filter(course_id=self.kwargs['course_pk'])
+        return Review.objects.filter(course_id=self.kwargs['course_pk']).select_related('user').only(
+            'id', 'course_id', 'rating', 'comment', 'created_at', 'user__id', 'user__username'
+        )
 
     def perform_create(self, serializer):
         try:
@@ -134,12 +182,26 @@ class ReviewListView(generics.ListCreateAPIView):
         except Course.DoesNotExist:
             return Response({"error": "Course not found"}, status=404)
 
+class ReviewSummaryView(APIView):
+    """
+    Average, count and 1-5 star histogram of a course, read from its stored counters.
+    """
+    permission_classes = (permissions.AllowAny,)
+
+    def get(self, request, course_pk):
+        return Response(rating_service.summary(course_pk))
+
 class ConversationListView(generics.ListCreateAPIView):
     serializer_class = ConversationSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_queryset(self):
-        return Conversation.objects.filter(participants=self.request.user).distinct()
+        # The caller's membership row supplies the unread count; the other participants come in one prefetch
+        return Conversation.objects.filter(memberships__user=self.request.user).annotate(
+            unread=F('memberships__unread_count')
+        ).prefetch_related(
+            Prefetch('participants', queryset=User.objects.only('id', 'username', 'avatar'))
+        )
 
     def create(self, request, *args, **kwargs):
         participant_email = request.data.get('email')
@@ -163,61 +225,61 @@ class ConversationListView(generics.ListCreateAPIView):
         if target_user == request.user:
              return Response({"error": "Cannot message yourself"}, status=400)
 
-        conversations = Conversation.objects.filter(participants=request.user).filter(participants=target_user)
-        
-        if conversations.exists():
-            conversation = conversations.first()
-            return Response(ConversationSerializer(conversation, context={'request': request}).data)
-        
-        conversation = Conversation.objects.create()
-        conversation.participants.add(request.user, target_user)
-        return Response(ConversationSerializer(conversation, context={'request': request}).data, status=201)
+        conversation, created = messaging_service.direct_conversation(request.user, target_user)
+        return Response(
+            ConversationSerializer(conversation, context={'request': request}).data,
+            status=201 if created else 200
+        )
 
 class MessageListView(generics.ListCreateAPIView):
+    """
+    Message history as id-cursor pages (see MessageCursorPagination);
+    ?after=<id> fetches only what arrived since the client's last sync.
+    """
     serializer_class = MessageSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = MessageCursorPagination
 
     def get_queryset(self):
-        conversation_id = self.kwargs['pk']
-        try:
-            conversation = Conversation.objects.get(pk=conversation_id)
-            if self.request.user not in conversation.participants.all():
-                return Message.objects.none()
-            return Message.objects.filter(conversation=conversation)
-        except Conversation.DoesNotExist:
-            return Message.objects.none()
+        return Message.objects.filter(conversation_id=self.kwargs['pk']).select_related('sender')
+
+    def list(self, request, *args, **kwargs):
+        if not messaging_service.is_participant(self.kwargs['pk'], request.user):
+            return Response({"error": "Conversation not found"}, status=404)
+        return super().list(request, *args, **kwargs)
+
+    def create(self, request, *args, **kwargs):
+        if not messaging_service.is_participant(self.kwargs['pk'], request.user):
+            return Response({"error": "Conversation not found"}, status=404)
+        return super().create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         conversation_id = self.kwargs['pk']
-        try:
-            conversation = Conversation.objects.get(pk=conversation_id)
-            if self.request.user not in conversation.participants.all():
-                 raise permissions.exceptions.PermissionDenied("You are not a participant in this conversation")
-            
-            serializer.save(sender=self.request.user, conversation=conversation)
-            conversation.save()
-            
-            for participant in conversation.participants.exclude(id=self.request.user.id):
-                 Notification.objects.create(
-                     user=participant,
-                     type='message',
-                     title=f"New message from {self.request.user.username}",
-                     description=serializer.validated_data.get('content', '')[:50],
-                     link=f"/messages?conversation={conversation.id}"
-                 )
-        except Conversation.DoesNotExist:
-            return Response({"error": "Conversation not found"}, status=404)
+        message = messaging_service.send_message(conversation_id, self.request.user, serializer.validated_data['content'])
+        serializer.instance = message
+
+        participant_ids = messaging_service.participant_ids(conversation_id)
+        payload = {**serializer.data, 'conversation': conversation_id}
+        event_service.publish([
+            (participant_id, 'message', {**payload, 'is_me': participant_id == message.sender_id})
+            for participant_id in participant_ids
+        ])
+        notification_service.dispatch([
+            Notification(
+                user_id=participant_id,
+                type='message',
+                title=f"New message from {self.request.user.username}",
+                description=message.content[:50],
+                link=f"/messages?conversation={conversation_id}"
+            )
+            for participant_id in participant_ids if participant_id != self.request.user.id
+        ])
 
 class MarkMessagesReadView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def post(self, request, pk):
-        try:
-            conversation = Conversation.objects.get(pk=pk)
-            if request.user not in conversation.participants.all():
-                return Response({"error": "Permission denied"}, status=403)
-            
-            conversation.messages.filter(is_read=False).exclude(sender=request.user).update(is_read=True)
-            return Response({"status": "marked as read"})
-        except Conversation.DoesNotExist:
+        if not messaging_service.is_participant(pk, request.user):
             return Response({"error": "Conversation not found"}, status=404)
+        messaging_service.mark_read(pk, request.user)
+        return Response({"status": "marked as read"})
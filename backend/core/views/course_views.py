@@ -1,9 +1,12 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Q, Count, Avg, Exists, OuterRef, Value, BooleanField, Prefetch, Subquery, IntegerField
-from ..models import Course, Lesson, Section, Enrollment, Notification, User, Resource, Review, LessonProgress, AssignmentSubmission
-from ..serializers import CourseSerializer, LessonSerializer, UserSerializer, ResourceSerializer
+from django.db.models import Q, Count, Exists, OuterRef, Value, BooleanField, Prefetch, Subquery, IntegerField
+from ..models import Course, Lesson, Section, Enrollment, User, Resource, Review, LessonProgress, AssignmentSubmission
+from ..serializers import CourseSerializer, LessonSerializer, UserSerializer, ResourceSerializer, AnnouncementSerializer
+from ..services import announcement_service, notification_service, rating_service
+from ..services.media_delivery import lesson_stream_url
+from ..pagination import AnnouncementCursorPagination
 from ..permissions import IsInstructorOrReadOnly
 
 class CourseListView(generics.ListCreateAPIView):
@@ -21,7 +24,7 @@ class CourseListView(generics.ListCreateAPIView):
         # Optimization: Move expensive calculations to DB level
         queryset = queryset.annotate(
             enrollment_count=Count('enrollments', distinct=True),
-            average_rating=Avg('reviews__rating')
+            average_rating=rating_service.average_rating()
         )
 
         # Optimization: is_enrolled Exists subquery
@@ -110,11 +113,10 @@ class CourseDetailView(generics.RetrieveUpdateDestroyAPIView):
             Prefetch('sections__lessons', queryset=lessons_qs),
             'sections__lessons__resources',
             'sections__lessons__quiz__questions__choices',
-            'enrollments',
-            'reviews__user'
+            'enrollments'
         ).annotate(
             enrollment_count=Count('enrollments', distinct=True),
-            average_rating=Avg('reviews__rating')
+            average_rating=rating_service.average_rating()
         )
 
         if user.is_authenticated:
@@ -155,10 +157,13 @@ class LessonVideoUploadView(APIView):
             if not video_file:
                 return Response({"error": "No file uploaded"}, status=400)
             
+            if lesson.video_file:
+                # Release the previous blob; shared copies stay on disk
+                lesson.video_file.delete(save=False)
             lesson.video_file = video_file
             lesson.lesson_type = 'video'
             lesson.save()
-            return Response({"video_url": lesson.video_file.url, "message": "Video uploaded successfully"})
+            return Response({"video_stream_url": lesson_stream_url(request, lesson), "message": "Video uploaded successfully"})
         except Lesson.DoesNotExist:
             return Response({"error": "Lesson not found"}, status=404)
 
@@ -208,7 +213,7 @@ class InvitationView(APIView):
             
             Enrollment.objects.get_or_create(user=student, course=course)
             
-            Notification.objects.create(
+            notification_service.notify(
                 user=student,
                 type='course',
                 title=f"Invited to {course.title}",
@@ -225,3 +230,39 @@ class InvitationView(APIView):
             return Response({"error": "Course not found or permission denied"}, status=404)
         except Exception as e:
             return Response({"error": str(e)}, status=500)
+
+class CourseAnnouncementListView(generics.ListCreateAPIView):
+    """
+    Announcements of one course. Readable by the instructor and enrolled
+    students; posting is stored once and returns before any notification is written.
+    """
+    serializer_class = AnnouncementSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = AnnouncementCursorPagination
+
+    def get_course(self):
+        course = Course.objects.filter(pk=self.kwargs['pk']).only('id', 'title', 'instructor_id').first()
+        if course is None:
+            raise permissions.exceptions.NotFound("Course not found")
+        return course
+
+    def get_queryset(self):
+        course = self.get_course()
+        if not announcement_service.can_read(course, self.request.user):
+            raise permissions.exceptions.PermissionDenied("You are not enrolled in this course.")
+        return course.announcements.select_related('course', 'author')
+
+    def perform_create(self, serializer):
+        course = self.get_course()
+        if course.instructor_id != self.request.user.id:
+            raise permissions.exceptions.PermissionDenied("Only the instructor can post announcements.")
+        notify = serializer.validated_data.pop('notify')
+        serializer.save(course=course, author=self.request.user, fanout_pending=notify)
+
+class AnnouncementFeedView(generics.ListAPIView):
+    serializer_class = AnnouncementSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = AnnouncementCursorPagination
+
+    def get_queryset(self):
+        return announcement_service.visible_to(self.request.user).select_related('course', 'author')
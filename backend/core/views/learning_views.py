@@ -3,12 +3,13 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from ..models import (
     Course, Lesson, Enrollment, LessonProgress, Quiz, 
-    QuizAttempt, Certificate, Assignment, AssignmentSubmission, Notification, Choice
+    QuizAttempt, Certificate, Assignment, AssignmentSubmission, Choice
 )
 from ..serializers import (
     EnrollmentSerializer, QuizAttemptSerializer, 
     CertificateSerializer, AssignmentSerializer, AssignmentSubmissionSerializer
 )
+from ..services import notification_service
 
 class EnrollView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
@@ -225,7 +226,7 @@ class GradeAssignmentView(APIView):
             submission.graded_at = timezone.now()
             submission.save()
             
-            Notification.objects.create(
+            notification_service.notify(
                 user=submission.student,
                 type='grade',
                 title=f"Assignment Graded: {submission.assignment.title}",
@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Exists, OuterRef
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from ..models import Lesson, Resource, Enrollment
+from ..services.media_delivery import lesson_stream_url, load_stream_token, resource_download_url, serve_file
+from ..services.image_variants import VARIANT_SIZES, VARIANT_FORMATS, is_valid_source, get_or_create_variant
+
+def _with_access(queryset, user, course_path):
+    if user.is_authenticated:
+        enrollments = Enrollment.objects.filter(user=user, course=OuterRef(course_path))
+        return queryset.annotate(annotated_is_enrolled=Exists(enrollments))
+    return queryset
+
+def _can_access(user, course, obj):
+    if getattr(obj, 'is_preview', False):
+        return True
+    if not user.is_authenticated:
+        return False
+    return course.instructor_id == user.id or obj.annotated_is_enrolled
+
+class LessonMediaView(APIView):
+    permission_classes = (permissions.AllowAny,)
+
+    def get(self, request, pk):
+        queryset = _with_access(Lesson.objects.select_related('section__course'), request.user, 'section__course')
+        try:
+            lesson = queryset.get(pk=pk)
+        except Lesson.DoesNotExist:
+            return Response({"error": "Lesson not found"}, status=404)
+
+        if not _can_access(request.user, lesson.section.course, lesson):
+            return Response({"error": "You must be enrolled to access this lesson"}, status=403)
+        if not lesson.video_file:
+            return Response({"error": "This lesson has no uploaded video"}, status=404)
+
+        return Response({
+            "url": lesson_stream_url(request, lesson),
+            "expires_in": settings.MEDIA_STREAM_URL_MAX_AGE
+        })
+
+class ResourceDownloadView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, pk):
+        queryset = _with_access(Resource.objects.select_related('lesson__section__course'), request.user, 'lesson__section__course')
+        try:
+            resource = queryset.get(pk=pk)
+        except Resource.DoesNotExist:
+            return Response({"error": "Resource not found"}, status=404)
+
+        if not _can_access(request.user, resource.lesson.section.course, resource):
+            return Response({"error": "You must be enrolled to access this resource"}, status=403)
+
+        return Response({
+            "url": resource_download_url(request, resource),
+            "expires_in": settings.MEDIA_STREAM_URL_MAX_AGE
+        })
+
+class MediaStreamView(View):
+    """
+    Serves files behind signed URLs issued by LessonMediaView / ResourceDownloadView.
+    Kept outside DRF so browsers' media Accept headers and Range requests pass straight through.
+    """
+    def get(self, request, token):
+        payload = load_stream_token(token)
+        if payload is None:
+            return HttpResponse(status=403)
+        return serve_file(request, payload['n'], filename=payload['f'], as_attachment=payload['a'])
+
+class ImageVariantView(View):
+    """
+    Serves resized thumbnails and avatars, generating each variant on first request.
+    Variant URLs embed the original file name, so responses can be cached forever.
+    """
+    def get(self, request, size, fmt, name):
+        if size not in VARIANT_SIZES or fmt not in VARIANT_FORMATS or not is_valid_source(name):
+            return HttpResponse(status=404)
+        if not default_storage.exists(name):
+            return HttpResponse(status=404)
+
+        try:
+            variant = get_or_create_variant(name, size, fmt)
+        except (OSError, ValueError):
+            return HttpResponse(status=404)
+
+        response = serve_file(request, variant)
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
@@ -1,36 +1,116 @@
-from rest_framework import generics, permissions, status
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import exceptions, generics, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.utils import timezone
-import datetime
-from ..models import Notification, QuizAttempt, Discussion, Course, Assignment
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from ..models import Notification, User
+from ..services import event_service, inbox_service, notification_service
+from ..pagination import NotificationCursorPagination
 
 class NotificationListView(generics.ListAPIView):
-    serializer_class = None # Set later or use custom response
+    """
+    Cursor-paginated feed, newest first; ?unread=true keeps only unread rows.
+    """
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = NotificationCursorPagination
 
-    def get(self, request):
+    def get_serializer_class(self):
         from ..serializers import NotificationSerializer
-        notifications = request.user.notifications.all().order_by('-created_at')
-        return Response(NotificationSerializer(notifications, many=True).data)
+        return NotificationSerializer
+
+    def get_queryset(self):
+        notifications = Notification.objects.filter(user=self.request.user)
+        if self.request.query_params.get('unread') == 'true':
+            notifications = notifications.filter(is_read=False)
+        return notifications
+
+class UnreadNotificationCountView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request):
+        return Response({'unread': notification_service.unread_count(request.user.id)})
+
+class EventStreamView(View):
+    """
+    Server-Sent Events for the current user: new notifications, new messages
+    and unread-count changes. Reconnecting clients send Last-Event-ID to resume.
+    Async, so it is served by the ASGI events process, where an open stream
+    holds no thread; the WSGI web process turns streams away.
+    """
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return _stream_unavailable("Event streams are served by the events service")
+        user_id = await _stream_user_id(request)
+        if user_id is None:
+            response = JsonResponse({'error': 'Authentication credentials were not provided or are invalid.'}, status=401)
+            response['WWW-Authenticate'] = 'Bearer realm="api"'
+            return response
+
+        last_event_id = event_service.parse_event_id(
+            request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        )
+        try:
+            events = event_service.Stream(user_id, last_event_id)
+        except event_service.StreamsExhausted:
+            return _stream_unavailable("Too many open streams")
+        response = StreamingHttpResponse(events, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+def _stream_unavailable(message):
+    # Clients fall back to polling and retry later
+    response = JsonResponse({'error': message}, status=503)
+    response['Retry-After'] = str(event_service.STREAM_LIFETIME)
+    return response
+
+async def _stream_user_id(request):
+    """
+    Reads a stream ticket from ?ticket= (EventSource cannot set headers; the
+    access token stays out of URLs) or, for other clients, a Bearer token.
+    """
+    ticket = request.GET.get('ticket')
+    if ticket:
+        user_id = event_service.read_ticket(ticket)
+    else:
+        try:
+            authenticated = await sync_to_async(JWTAuthentication().authenticate)(request)
+        except exceptions.AuthenticationFailed:
+            return None
+        user_id = authenticated[0].id if authenticated else None
+    if user_id is None or not await User.objects.filter(pk=user_id, is_active=True).aexists():
+        return None
+    return user_id
+
+class EventStreamTicketView(APIView):
+    """
+    Issues a short-lived ticket for opening the event stream with EventSource.
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        return Response({'ticket': event_service.issue_ticket(request.user.id)})
 
 class MarkNotificationReadView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def post(self, request, pk):
-        try:
-            notification = Notification.objects.get(pk=pk, user=request.user)
-            notification.is_read = True
-            notification.save()
-            return Response({'status': 'read'})
-        except Notification.DoesNotExist:
+        notifications = Notification.objects.filter(pk=pk, user=request.user)
+        if notifications.filter(is_read=False).update(is_read=True):
+            notification_service.adjust_unread(request.user.id, -1)
+        elif not notifications.exists():
             return Response({'error': 'Notification not found'}, status=404)
+        return Response({'status': 'read'})
 
 class MarkAllNotificationsReadView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def post(self, request):
         request.user.notifications.filter(is_read=False).update(is_read=True)
+        notification_service.reset_unread(request.user.id)
         return Response({'status': 'all_read'})
 
 class ClearNotificationsView(APIView):
@@ -38,84 +118,12 @@ class ClearNotificationsView(APIView):
 
     def post(self, request):
         request.user.notifications.all().delete()
+        notification_service.reset_unread(request.user.id)
         return Response({'status': 'cleared'})
 
 class PendingTasksView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get(self, request):
-        tasks = []
-        if request.user.role == 'teacher':
-            quiz_attempts_count = QuizAttempt.objects.filter(quiz__lesson__section__course__instructor=request.user).count()
-            if quiz_attempts_count > 0:
-                 tasks.append({
-                    "id": "grading-1",
-                    "title": "Review Quiz Attempts",
-                    "description": f"{quiz_attempts_count} quiz submissions across your courses",
-                    "type": "grading",
-                    "urgency": "medium",
-                    "time": "Today"
-                 })
-
-            unanswered_discussions = Discussion.objects.filter(
-                course__instructor=request.user, 
-                replies__isnull=True
-            ).distinct()
-            
-            for discussion in unanswered_discussions[:3]:
-                if discussion.course:
-                    tasks.append({
-                        "id": f"community-{discussion.id}",
-                        "title": "Unanswered Question",
-                        "description": f"New question in {discussion.course.title}",
-                        "type": "community",
-                        "urgency": "high",
-                        "time": discussion.created_at.strftime("%H:%M")
-                    })
-
-            empty_courses = Course.objects.filter(instructor=request.user, sections__isnull=True)
-            for course in empty_courses:
-                 tasks.append({
-                    "id": f"setup-{course.id}",
-                    "title": "Complete Course Setup",
-                    "description": f"Add sections to '{course.title}'",
-                    "type": "setup",
-                    "urgency": "low",
-                    "time": course.created_at.strftime("%b %d")
-                })
-        else:
-            now = timezone.now()
-            three_days_later = now + datetime.timedelta(days=3)
-            
-            upcoming_assignments = Assignment.objects.filter(
-                lesson__section__course__enrollments__user=request.user,
-                due_date__gte=now,
-                due_date__lte=three_days_later
-            ).exclude(
-                submissions__student=request.user
-            ).select_related('lesson__section__course')
-            
-            for assignment in upcoming_assignments:
-                course_title = assignment.lesson.section.course.title if assignment.lesson and assignment.lesson.section and assignment.lesson.section.course else "Unknown Course"
-                tasks.append({
-                    "id": f"assignment-{assignment.id}",
-                    "title": "Upcoming Deadline",
-                    "description": f"{assignment.title} is due soon in {course_title}",
-                    "type": "grading",
-                    "urgency": "high",
-                    "time": assignment.due_date.strftime("%b %d")
-                })
-            
-            from ..models import Enrollment
-            enrollments = Enrollment.objects.filter(user=request.user, progress__gt=0, progress__lt=100).order_by('-updated_at')[:2]
-            for enrollment in enrollments:
-                tasks.append({
-                    "id": f"continue-{enrollment.id}",
-                    "title": "Continue Learning",
-                    "description": f"You were last studying {enrollment.course.title}.",
-                    "type": "setup",
-                    "urgency": "medium",
-                    "time": "Active"
-                })
-            
-        return Response(tasks)
+        from ..serializers import InboxTaskSerializer
+        return Response(InboxTaskSerializer(inbox_service.visible_tasks(request.user), many=True).data)
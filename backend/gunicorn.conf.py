@@ -0,0 +1,8 @@
+import os
+
+# Loaded automatically by gunicorn from the working directory (Procfile, railway.json).
+# The web service only answers API requests; event streams are served by the ASGI
+# events service (railway.events.json), so no thread here is held by a stream.
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 16))
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 
 import os
 import dj_database_url
+from decimal import Decimal
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -139,6 +140,12 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Protected media delivery: 'django' streams with Range support,
+# 'nginx' uses X-Accel-Redirect and 'sendfile' uses X-Sendfile
+MEDIA_DELIVERY_BACKEND = os.getenv('MEDIA_DELIVERY_BACKEND', 'django')
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+MEDIA_STREAM_URL_MAX_AGE = int(os.getenv('MEDIA_STREAM_URL_MAX_AGE', 60 * 60 * 4))
+
 # Custom User Model
 AUTH_USER_MODEL = 'core.User'
 
@@ -191,6 +198,27 @@ PAYDUNYA_MASTER_KEY = os.getenv('PAYDUNYA_MASTER_KEY')
 PAYDUNYA_PRIVATE_KEY = os.getenv('PAYDUNYA_PRIVATE_KEY')
 PAYDUNYA_TOKEN = os.getenv('PAYDUNYA_TOKEN')
 
+# Share of each completed order kept by the platform
+PLATFORM_FEE_RATE = Decimal(os.getenv('PLATFORM_FEE_RATE', '0.10'))
+
+# 'worker' (default) leaves PayDunya notifications to run_worker, with retries and backoff.
+# 'inline' is opt-in for deployments without a worker: each IPN is also verified right after
+# its request commits, so a gunicorn thread waits on PayDunya and a failed verification is only
+# retried when PayDunya resends the notification.
+PAYMENT_PROCESSING = os.getenv('PAYMENT_PROCESSING', 'worker')
+
+# 'inline' writes notifications during the request; 'outbox' queues them for the run_worker process
+NOTIFICATION_DELIVERY = os.getenv('NOTIFICATION_DELIVERY', 'inline')
+
+# Event stream hub: 'database' is shared by every web process and the worker; 'memory' only works with a single process
+EVENT_STREAM_BACKEND = os.getenv('EVENT_STREAM_BACKEND', 'database')
+
+# Open event streams per ASGI events process; a waiting stream holds no thread, only a socket and its buffers
+EVENT_STREAM_MAX_CONNECTIONS = int(os.getenv('EVENT_STREAM_MAX_CONNECTIONS', 1000))
+
+# PostgreSQL text search configuration for the forum ('simple', 'french', 'english', ...)
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', 'simple')
+
 # Store Configuration
 PAYDUNYA_STORE_NAME = "ImraLearning"
 PAYDUNYA_STORE_TAGLINE = "Empower Your Learning Journey"
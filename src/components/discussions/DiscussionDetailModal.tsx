@@ -1,7 +1,7 @@
 import { Modal } from '../ui/Modal';
 import { MessageSquare, ThumbsUp, Send, Clock } from 'lucide-react';
 import { useState, useEffect } from 'react';
-import { getDiscussionDetails, postReply, likeDiscussion, likeReply } from '../../services/api';
+import { getDiscussionDetails, getMoreReplies, postReply, likeDiscussion, likeReply } from '../../services/api';
 
 interface Reply {
     id: number;
@@ -28,6 +28,8 @@ interface Discussion {
     likes_count: number;
     is_liked: boolean;
     replies: Reply[];
+    replies_count: number;
+    replies_next: string | null;
     is_resolved: boolean;
 }
 
@@ -62,6 +64,20 @@ export const DiscussionDetailModal = ({ isOpen, onClose, discussionId }: Discuss
         }
     };
 
+    const handleLoadMoreReplies = async () => {
+        if (!discussion?.replies_next) return;
+        try {
+            const data = await getMoreReplies(discussion.replies_next);
+            setDiscussion({
+                ...discussion,
+                replies: [...discussion.replies, ...data.results],
+                replies_next: data.next
+            });
+        } catch (error) {
+            console.error('Failed to load more replies', error);
+        }
+    };
+
     const handlePostReply = async (e: React.FormEvent) => {
         e.preventDefault();
         if (!discussionId || !newReply.trim() || isSubmitting) return;
@@ -192,7 +208,7 @@ export const DiscussionDetailModal = ({ isOpen, onClose, discussionId }: Discuss
                                     </button>
                                     <div className="text-gray-500 text-sm font-medium flex items-center gap-2">
                                         <MessageSquare className="w-4 h-4" />
-                                        <span>{discussion.replies.length} Replies</span>
+                                        <span>{discussion.replies_count} Replies</span>
                                     </div>
                                 </div>
                             </div>
@@ -239,6 +255,14 @@ export const DiscussionDetailModal = ({ isOpen, onClose, discussionId }: Discuss
                                         </div>
                                     ))
                                 )}
+                                {discussion.replies_next && (
+                                    <button
+                                        onClick={handleLoadMoreReplies}
+                                        className="w-full text-center text-blue-400 hover:text-blue-300 text-xs font-medium py-2"
+                                    >
+                                        Load more replies
+                                    </button>
+                                )}
                             </div>
                         </div>
 
@@ -3,7 +3,7 @@ import { MessageSquare, ThumbsUp } from 'lucide-react';
 export interface DiscussionProps {
     id: number;
     title: string;
-    content: string;
+    excerpt: string;
     author: {
         username: string;
         role: string;
@@ -27,7 +27,7 @@ const getAvatarColor = (name: string) => {
 
 export const DiscussionItem = ({
     title,
-    content,
+    excerpt,
     author,
     created_at,
     course_name,
@@ -76,7 +76,7 @@ export const DiscussionItem = ({
             </div>
 
             <p className="text-gray-400 text-sm mb-4 ml-13 pl-13 line-clamp-2">
-                {content}
+                {excerpt}
             </p>
 
             <div className="flex items-center gap-6 text-sm text-gray-500 font-medium">
@@ -11,12 +11,14 @@ export const DiscussionsPage = ({ onOpenModal }: { onOpenModal: () => void }) =>
     const [searchQuery, setSearchQuery] = useState('');
 
     useEffect(() => {
-        fetchDiscussions();
-    }, []);
+        // Debounce server-side search while typing
+        const timer = setTimeout(() => fetchDiscussions(searchQuery.trim()), searchQuery ? 300 : 0);
+        return () => clearTimeout(timer);
+    }, [searchQuery]);
 
-    const fetchDiscussions = async () => {
+    const fetchDiscussions = async (query: string) => {
         try {
-            const data = await getDiscussions();
+            const data = await getDiscussions(query ? { q: query } : undefined);
             setDiscussions(data);
         } catch (error) {
             console.error('Failed to fetch discussions', error);
@@ -37,12 +39,6 @@ export const DiscussionsPage = ({ onOpenModal }: { onOpenModal: () => void }) =>
         }
     };
 
-    const filteredDiscussions = discussions.filter(d =>
-        d.title.toLowerCase().includes(searchQuery.toLowerCase()) ||
-        d.content.toLowerCase().includes(searchQuery.toLowerCase()) ||
-        d.author.username.toLowerCase().includes(searchQuery.toLowerCase())
-    );
-
     return (
         <div className="p-6 max-w-5xl mx-auto space-y-8">
             <div className="flex flex-col md:flex-row md:items-center justify-between gap-4">
@@ -76,14 +72,14 @@ export const DiscussionsPage = ({ onOpenModal }: { onOpenModal: () => void }) =>
                         <Loader2 className="w-12 h-12 mx-auto mb-4 animate-spin text-blue-500" />
                         <p className="text-gray-400">Loading community feed...</p>
                     </div>
-                ) : filteredDiscussions.length === 0 ? (
+                ) : discussions.length === 0 ? (
                     <div className="text-center py-20 bg-[#111827] rounded-3xl border border-dashed border-gray-800">
                         <MessageSquare className="w-12 h-12 mx-auto text-gray-700 mb-4" />
                         <h3 className="text-xl font-bold text-gray-500">No discussions found</h3>
                         <p className="text-gray-600 mt-2">Try adjusting your search or start a new discussion.</p>
                     </div>
                 ) : (
-                    filteredDiscussions.map((discussion) => (
+                    discussions.map((discussion) => (
                         <DiscussionItem
                             key={discussion.id}
                             {...discussion}
@@ -99,7 +95,7 @@ export const DiscussionsPage = ({ onOpenModal }: { onOpenModal: () => void }) =>
                     isOpen={selectedId !== null}
                     onClose={() => {
                         setSelectedId(null);
-                        fetchDiscussions();
+                        fetchDiscussions(searchQuery.trim());
                     }}
                     discussionId={selectedId}
                 />
@@ -17,7 +17,7 @@ export const Feed = () => {
                     author: d.author.username,
                     time: new Date(d.created_at).toLocaleDateString(),
                     title: d.title,
-                    content: d.content,
+                    content: d.excerpt,
                     likes: d.likes_count,
                     comments: d.replies_count,
                     tags: d.course_name ? [d.course_name] : ["General"]
@@ -1,4 +1,5 @@
 import { Play, Star, Clock, Users, FileText, Award } from 'lucide-react';
+import { ResponsiveImage } from '../ui/ResponsiveImage';
 
 interface CourseHeaderProps {
     course: any;
@@ -74,7 +75,7 @@ export const CourseHeader = ({ course, onContinue, progress }: CourseHeaderProps
                 <div className="w-full lg:w-96 bg-[#131722] rounded-3xl p-6 border border-white/5 shadow-xl">
                     <div className="aspect-video bg-blue-900/20 rounded-2xl mb-6 flex items-center justify-center relative overflow-hidden">
                         {course.thumbnail ? (
-                            <img src={course.thumbnail} alt={course.title} className="w-full h-full object-cover opacity-80" />
+                            <ResponsiveImage src={course.thumbnail} variants={course.thumbnail_variants} sizes="(min-width: 1024px) 384px, 100vw" alt={course.title} className="w-full h-full object-cover opacity-80" />
                         ) : (
                             <div className="w-16 h-16 rounded-2xl bg-white/10 flex items-center justify-center backdrop-blur-xl">
                                 <Play className="w-8 h-8 text-white ml-1" />
@@ -257,7 +257,7 @@ export const LessonPlayer = ({ onBack }: { onBack: () => void }) => {
                         {activeLesson?.lesson_type === 'video' ? (
                             <div className={`relative ${isCinemaMode ? 'flex-1' : 'aspect-video rounded-[3rem] overflow-hidden shadow-2xl shadow-blue-500/10'}`}>
                                 <video
-                                    src={activeLesson.video_file || activeLesson.video_url}
+                                    src={activeLesson.video_stream_url || activeLesson.video_url}
                                     controls
                                     className="w-full h-full object-contain"
                                     onPlay={() => setIsPlaying(true)}
@@ -439,14 +439,14 @@ export const LessonPlayer = ({ onBack }: { onBack: () => void }) => {
                                         {activeTab === 'resources' && (
                                             <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
                                                 {activeLesson.resources?.map((res: any) => (
-                                                    <a key={res.id} href={res.file} target="_blank" rel="noreferrer" className="p-6 bg-white/[0.02] border border-white/10 rounded-[2rem] flex items-center justify-between hover:bg-white/[0.05] transition-all group">
+                                                    <a key={res.id} href={res.download_url} target="_blank" rel="noreferrer" className="p-6 bg-white/[0.02] border border-white/10 rounded-[2rem] flex items-center justify-between hover:bg-white/[0.05] transition-all group">
                                                         <div className="flex items-center gap-4">
                                                             <div className="w-12 h-12 rounded-2xl bg-blue-500/10 flex items-center justify-center text-blue-400 group-hover:scale-110 transition-transform">
                                                                 <Download className="w-5 h-5" />
                                                             </div>
                                                             <div>
                                                                 <p className="text-sm font-bold">{res.title}</p>
-                                                                <p className="text-[10px] text-gray-500 uppercase font-black">{res.file_type} • {res.file_size}</p>
+                                                                <p className="text-[10px] text-gray-500 uppercase font-black">{res.file_type} • {((res.file_size || 0) / (1024 * 1024)).toFixed(1)} MB</p>
                                                             </div>
                                                         </div>
                                                     </a>
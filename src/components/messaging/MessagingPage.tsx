@@ -6,7 +6,7 @@ import {
 import { useMessages } from '../../context/MessageContext';
 
 export const MessagingPage = () => {
-    const { conversations, activeConversationId, setActiveConversationId, sendMessage, markAsRead } = useMessages();
+    const { conversations, activeConversationId, setActiveConversationId, sendMessage, markAsRead, loadOlderMessages } = useMessages();
     const [messageInput, setMessageInput] = useState('');
     const [searchQuery, setSearchQuery] = useState('');
     const scrollRef = useRef<HTMLDivElement>(null);
@@ -146,6 +146,14 @@ export const MessagingPage = () => {
                             ref={scrollRef}
                             className="flex-1 overflow-y-auto p-6 space-y-6 custom-scrollbar"
                         >
+                            {activeConv.olderCursor && (
+                                <button
+                                    onClick={() => loadOlderMessages(activeConv.id)}
+                                    className="w-full text-center text-blue-400 hover:text-blue-300 text-xs font-medium py-2"
+                                >
+                                    Load earlier messages
+                                </button>
+                            )}
                             <div className="flex justify-center mb-8">
                                 <span className="bg-gray-800/50 text-gray-500 text-[10px] font-black px-4 py-1.5 rounded-full uppercase tracking-widest border border-gray-800">
                                     Today
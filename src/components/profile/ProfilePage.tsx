@@ -3,6 +3,7 @@ import { ArrowLeft, Mail, MapPin, Calendar, BookOpen, Users, Clock, Camera, Load
 import { useAuth } from '../../context/AuthContext';
 import { useToast } from '../../context/ToastContext';
 import { updateProfile } from '../../services/api';
+import { ResponsiveImage } from '../ui/ResponsiveImage';
 
 interface ProfilePageProps {
     userRole: 'teacher' | 'student';
@@ -83,8 +84,10 @@ export const ProfilePage = ({ userRole, onBack }: ProfilePageProps) => {
                     <div className="bg-[#111827] border border-gray-800 rounded-xl p-8 flex flex-col items-center text-center">
                         <div className="relative mb-4 group cursor-pointer">
                             <div className="w-24 h-24 rounded-full bg-blue-600 flex items-center justify-center text-3xl font-bold text-white overflow-hidden border-4 border-[#111827] shadow-xl">
-                                <img
+                                <ResponsiveImage
                                     src={(user as any).avatar || `https://api.dicebear.com/7.x/avataaars/svg?seed=${user.username}`}
+                                    variants={(user as any).avatar_variants}
+                                    sizes="96px"
                                     alt="Profile"
                                     className="w-full h-full object-cover"
                                 />
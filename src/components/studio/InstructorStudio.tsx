@@ -124,7 +124,7 @@ export const InstructorStudio = () => {
                 headers: { 'Content-Type': 'multipart/form-data' },
                 onUploadProgress: (p) => setUploadProgress(prev => ({ ...prev, [activeLessonId]: Math.round((p.loaded * 100) / (p.total || 1)) }))
             });
-            updateLesson(activeLessonId, { video_url: res.data.video_url });
+            updateLesson(activeLessonId, { video_stream_url: res.data.video_stream_url });
             showToast('Video uploaded.', 'success');
         } catch (e) {
             showToast('Upload failed.', 'error');
@@ -145,8 +145,6 @@ export const InstructorStudio = () => {
         const formData = new FormData();
         formData.append('file', file);
         formData.append('title', file.name);
-        formData.append('file_type', file.name.split('.').pop() || '');
-        formData.append('file_size', `${(file.size / (1024 * 1024)).toFixed(1)} MB`);
         try {
             const res = await api.post(`/lessons/${activeLessonId}/resources/`, formData, {
                 headers: { 'Content-Type': 'multipart/form-data' }
@@ -41,7 +41,7 @@ export const ResourceList: React.FC<ResourceListProps> = ({
                             </div>
                             <div>
                                 <p className="text-sm font-bold text-white truncate max-w-[150px]">{resource.title}</p>
-                                <p className="text-[10px] text-gray-600 font-bold uppercase tracking-wider">{resource.file_size} • {resource.file_type?.toUpperCase()}</p>
+                                <p className="text-[10px] text-gray-600 font-bold uppercase tracking-wider">{((resource.file_size || 0) / (1024 * 1024)).toFixed(1)} MB • {resource.file_type?.toUpperCase()}</p>
                             </div>
                         </div>
                         <button
@@ -1,9 +1,9 @@
 export interface Resource {
     id: number;
     title: string;
-    file: string;
+    download_url?: string | null; // Signed, short-lived URL
     file_type?: string;
-    file_size?: string;
+    file_size?: number; // In bytes
 }
 
 export interface Choice {
@@ -33,7 +33,7 @@ export interface Lesson {
     title: string;
     lesson_type: LessonType;
     video_url?: string;
-    video_file?: string;
+    video_stream_url?: string | null; // Signed URL of the uploaded video
     content?: string;
     duration?: string;
     order: number;
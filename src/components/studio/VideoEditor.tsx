@@ -74,7 +74,7 @@ export const VideoEditor: React.FC<VideoEditorProps> = ({
                             </div>
                             <h4 className="text-xl font-bold text-white mb-2">Drag & Drop Lesson Video</h4>
                             <p className="text-sm text-gray-500 max-w-xs mx-auto font-medium">MP4, WebM or MOV up to 2GB</p>
-                            {lesson.video_url && (
+                            {(lesson.video_url || lesson.video_stream_url) && (
                                 <p className="mt-4 text-[10px] text-emerald-400 font-bold uppercase tracking-widest">Video Linked Successfully</p>
                             )}
                         </div>
@@ -0,0 +1,32 @@
+/** Variant URLs served by the backend, e.g. { 64: { webp: '...', jpeg: '...' } }. */
+export type ImageVariants = Record<string, Record<string, string>> | null | undefined;
+
+interface ResponsiveImageProps {
+    src: string;
+    variants?: ImageVariants;
+    sizes: string;
+    alt: string;
+    className?: string;
+}
+
+const srcSet = (variants: NonNullable<ImageVariants>, format: string) =>
+    Object.entries(variants)
+        .filter(([, urls]) => urls[format])
+        .map(([size, urls]) => `${urls[format]} ${size}w`)
+        .join(', ');
+
+/**
+ * Lets the browser pick the smallest resized variant for the rendered size,
+ * preferring WebP. Falls back to the original image when there are no variants.
+ */
+export const ResponsiveImage = ({ src, variants, sizes, alt, className }: ResponsiveImageProps) => {
+    if (!variants) {
+        return <img src={src} alt={alt} className={className} loading="lazy" />;
+    }
+    return (
+        <picture>
+            <source type="image/webp" srcSet={srcSet(variants, 'webp')} sizes={sizes} />
+            <img src={src} srcSet={srcSet(variants, 'jpeg')} sizes={sizes} alt={alt} className={className} loading="lazy" />
+        </picture>
+    );
+};
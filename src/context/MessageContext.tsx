@@ -1,4 +1,4 @@
-import React, { createContext, useContext, useState, useEffect } from 'react';
+import React, { createContext, useContext, useState, useEffect, useRef } from 'react';
 import { useNotifications } from './NotificationContext';
 import * as api from '../services/api';
 
@@ -21,6 +21,7 @@ export interface Conversation {
     lastMessageTime: string;
     unreadCount: number;
     messages: Message[];
+    olderCursor: string | null;
 }
 
 interface MessageContextType {
@@ -30,15 +31,35 @@ interface MessageContextType {
     sendMessage: (text: string) => void;
     markAsRead: (conversationId: string) => void;
     createConversation: (userId: string) => Promise<string | null>;
+    loadOlderMessages: (conversationId: string) => Promise<void>;
     refreshConversations: () => void;
 }
 
 const MessageContext = createContext<MessageContextType | undefined>(undefined);
 
+const mapMessage = (msg: any): Message => ({
+    id: msg.id.toString(),
+    senderId: msg.sender.toString(),
+    senderName: msg.sender_name,
+    senderAvatar: msg.sender_avatar || 'https://api.dicebear.com/7.x/avataaars/svg?seed=User',
+    text: msg.content,
+    timestamp: new Date(msg.created_at).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' }),
+    isMe: msg.is_me
+});
+
+const appendNew = (messages: Message[], incoming: Message[]) => {
+    const known = new Set(messages.map(m => m.id));
+    return [...messages, ...incoming.filter(m => !known.has(m.id))];
+};
+
 export const MessageProvider: React.FC<{ children: React.ReactNode }> = ({ children }) => {
     const { addNotification } = useNotifications();
     const [conversations, setConversations] = useState<Conversation[]>([]);
     const [activeConversationId, setActiveConversationId] = useState<string | null>(null);
+    const activeRef = useRef<string | null>(null);
+    activeRef.current = activeConversationId;
+    const conversationsRef = useRef<Conversation[]>([]);
+    conversationsRef.current = conversations;
 
     const fetchConversations = async () => {
         try {
@@ -52,9 +73,14 @@ export const MessageProvider: React.FC<{ children: React.ReactNode }> = ({ child
                 lastMessage: conv.last_message,
                 lastMessageTime: conv.last_message_time,
                 unreadCount: conv.unread_count,
-                messages: [] // Initial empty messages
+                messages: [],
+                olderCursor: null
+            }));
+            // Keep messages already loaded; they are brought up to date incrementally
+            setConversations(prev => mappedConversations.map(conv => {
+                const existing = prev.find(p => p.id === conv.id);
+                return existing ? { ...conv, messages: existing.messages, olderCursor: existing.olderCursor } : conv;
             }));
-            setConversations(mappedConversations);
         } catch (error) {
             console.error("Failed to fetch conversations", error);
         }
@@ -62,33 +88,85 @@ export const MessageProvider: React.FC<{ children: React.ReactNode }> = ({ child
 
     const fetchMessages = async (conversationId: string) => {
         try {
-            const data = await api.getMessages(conversationId);
-            const mappedMessages: Message[] = data.map((msg: any) => ({
-                id: msg.id.toString(),
-                senderId: msg.sender.toString(),
-                senderName: msg.sender_name,
-                senderAvatar: msg.sender_avatar || 'https://api.dicebear.com/7.x/avataaars/svg?seed=User',
-                text: msg.content,
-                timestamp: new Date(msg.created_at).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' }),
-                isMe: msg.is_me
-            }));
-
-            setConversations(prev => prev.map(conv => {
-                if (conv.id === conversationId) {
-                    return { ...conv, messages: mappedMessages };
-                }
-                return conv;
-            }));
+            const loaded = conversationsRef.current.find(conv => conv.id === conversationId)?.messages ?? [];
+            if (loaded.length === 0) {
+                // Newest page first; older pages load on demand
+                const page = await api.getMessages(conversationId);
+                const messages = page.results.map(mapMessage).reverse();
+                setConversations(prev => prev.map(conv => conv.id === conversationId
+                    ? { ...conv, messages, olderCursor: page.has_more ? String(page.before) : null }
+                    : conv
+                ));
+                return;
+            }
+            // Only transfer what arrived since the last message we hold
+            let after = loaded[loaded.length - 1].id;
+            let hasMore = true;
+            while (hasMore) {
+                const page = await api.getMessages(conversationId, { after });
+                const incoming = page.results.map(mapMessage);
+                setConversations(prev => prev.map(conv => conv.id === conversationId
+                    ? { ...conv, messages: appendNew(conv.messages, incoming) }
+                    : conv
+                ));
+                hasMore = page.has_more;
+                after = String(page.after);
+            }
         } catch (error) {
             console.error("Failed to fetch messages", error);
         }
     };
 
+    const loadOlderMessages = async (conversationId: string) => {
+        const before = conversationsRef.current.find(conv => conv.id === conversationId)?.olderCursor;
+        if (!before) return;
+        try {
+            const page = await api.getMessages(conversationId, { before });
+            const older = page.results.map(mapMessage).reverse();
+            setConversations(prev => prev.map(conv => conv.id === conversationId
+                ? { ...conv, messages: [...older, ...conv.messages], olderCursor: page.has_more ? String(page.before) : null }
+                : conv
+            ));
+        } catch (error) {
+            console.error("Failed to load older messages", error);
+        }
+    };
+
     useEffect(() => {
         fetchConversations();
-        // Poll for new messages every 30 seconds
-        const interval = setInterval(fetchConversations, 30000);
-        return () => clearInterval(interval);
+        // New messages are pushed over the event stream; the poll is only a safety net,
+        // every 5 minutes while the stream is open and every 30 seconds while it is not
+        let ticks = 0;
+        const interval = setInterval(() => {
+            ticks += 1;
+            if (!api.isEventStreamOpen() || ticks % 10 === 0) fetchConversations();
+        }, 30000);
+        const unsubscribe = api.subscribeToEvents('message', (msg) => {
+            const conversationId = msg.conversation.toString();
+            const incoming = mapMessage(msg);
+            if (!conversationsRef.current.some(conv => conv.id === conversationId)) {
+                fetchConversations();
+                return;
+            }
+            setConversations(prev => prev.map(conv => {
+                if (conv.id !== conversationId || conv.messages.some(m => m.id === incoming.id)) return conv;
+                return {
+                    ...conv,
+                    lastMessage: incoming.text,
+                    lastMessageTime: 'Just now',
+                    unreadCount: incoming.isMe || activeRef.current === conversationId ? conv.unreadCount : conv.unreadCount + 1,
+                    // Conversations never opened load their newest page when first opened
+                    messages: conv.messages.length ? appendNew(conv.messages, [incoming]) : conv.messages
+                };
+            }));
+            if (!incoming.isMe && activeRef.current === conversationId) {
+                api.markMessagesRead(conversationId);
+            }
+        });
+        return () => {
+            clearInterval(interval);
+            unsubscribe();
+        };
     }, []);
 
     useEffect(() => {
@@ -104,15 +182,7 @@ export const MessageProvider: React.FC<{ children: React.ReactNode }> = ({ child
 
         try {
             const apiMsg = await api.sendMessage(activeConversationId, text);
-            const newMessage: Message = {
-                id: apiMsg.id.toString(),
-                senderId: apiMsg.sender.toString(),
-                senderName: apiMsg.sender_name,
-                senderAvatar: apiMsg.sender_avatar || 'https://api.dicebear.com/7.x/avataaars/svg?seed=User',
-                text: apiMsg.content,
-                timestamp: new Date(apiMsg.created_at).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' }),
-                isMe: true
-            };
+            const newMessage: Message = { ...mapMessage(apiMsg), isMe: true };
 
             setConversations(prev => prev.map(conv => {
                 if (conv.id === activeConversationId) {
@@ -120,7 +190,7 @@ export const MessageProvider: React.FC<{ children: React.ReactNode }> = ({ child
                         ...conv,
                         lastMessage: text.trim(),
                         lastMessageTime: 'Just now',
-                        messages: [...conv.messages, newMessage]
+                        messages: appendNew(conv.messages, [newMessage])
                     };
                 }
                 return conv;
@@ -166,6 +236,7 @@ export const MessageProvider: React.FC<{ children: React.ReactNode }> = ({ child
             sendMessage,
             markAsRead,
             createConversation,
+            loadOlderMessages,
             refreshConversations: fetchConversations
         }}>
             {children}
@@ -1,4 +1,4 @@
-import React, { createContext, useContext, useState, useEffect, useCallback } from 'react';
+import React, { createContext, useContext, useState, useEffect, useCallback, useRef } from 'react';
 import * as api from '../services/api';
 import { useAuth } from './AuthContext';
 
@@ -26,38 +26,88 @@ interface NotificationContextType {
 
 const NotificationContext = createContext<NotificationContextType | undefined>(undefined);
 
+const timeAgo = (iso?: string) => {
+    if (!iso) return 'Now';
+    const seconds = Math.max(0, Math.floor((Date.now() - new Date(iso).getTime()) / 1000));
+    const units: [number, string][] = [[86400 * 365, 'year'], [86400 * 30, 'month'], [86400 * 7, 'week'], [86400, 'day'], [3600, 'hour'], [60, 'minute']];
+    for (const [size, label] of units) {
+        const value = Math.floor(seconds / size);
+        if (value >= 1) return `${value} ${label}${value > 1 ? 's' : ''} ago`;
+    }
+    return 'Just now';
+};
+
+// Adapt backend data to the frontend interface
+const adaptNotification = (n: any): Notification => ({
+    id: (n.id || '').toString(),
+    type: n.type || 'system',
+    title: n.title || 'Notification',
+    description: n.description || '',
+    timestamp: timeAgo(n.created_at),
+    isRead: !!n.is_read,
+    link: n.link
+});
+
 export const NotificationProvider: React.FC<{ children: React.ReactNode }> = ({ children }) => {
     const [notifications, setNotifications] = useState<Notification[]>([]);
+    const [unreadCount, setUnreadCount] = useState(0);
+    const unreadRef = useRef(0);
+    unreadRef.current = unreadCount;
+    const notificationsRef = useRef<Notification[]>([]);
+    notificationsRef.current = notifications;
     const { isAuthenticated } = useAuth();
 
     const fetchNotifications = useCallback(async () => {
         if (!isAuthenticated) return;
         try {
             const data = await api.getNotifications();
-            // Adapt backend data to frontend interface if needed
-            const adapted = (data || []).map((n: any) => ({
-                id: (n.id || '').toString(),
-                type: n.type || 'system',
-                title: n.title || 'Notification',
-                description: n.description || '',
-                timestamp: n.timestamp || 'Now',
-                isRead: !!n.is_read,
-                link: n.link
-            }));
-            setNotifications(adapted);
+            setNotifications((data || []).map(adaptNotification));
         } catch (error) {
             console.error('Failed to fetch notifications', error);
         }
     }, [isAuthenticated]);
 
+    // Poll only the cached unread counter; reload the feed when it grows
+    const pollUnread = useCallback(async () => {
+        if (!isAuthenticated) return;
+        try {
+            const count = await api.getUnreadNotificationCount();
+            if (count > unreadRef.current) fetchNotifications();
+            setUnreadCount(count);
+        } catch (error) {
+            console.error('Failed to fetch unread count', error);
+        }
+    }, [isAuthenticated, fetchNotifications]);
+
     useEffect(() => {
         fetchNotifications();
-        // Polling every 30 seconds
-        const interval = setInterval(fetchNotifications, 30000);
+        pollUnread();
+        // New notifications are pushed over the event stream; the poll is only a safety net,
+        // every 5 minutes while the stream is open and every 30 seconds while it is not
+        let ticks = 0;
+        const interval = setInterval(() => {
+            ticks += 1;
+            if (!api.isEventStreamOpen() || ticks % 10 === 0) pollUnread();
+        }, 30000);
         return () => clearInterval(interval);
-    }, [fetchNotifications]);
+    }, [fetchNotifications, pollUnread]);
 
-    const unreadCount = notifications.filter(n => !n.isRead).length;
+    useEffect(() => {
+        if (!isAuthenticated) return;
+        const unsubscribeNotifications = api.subscribeToEvents('notification', (data) => {
+            const incoming = adaptNotification(data);
+            // Grouped notifications (likes) are re-sent when they grow
+            if (!incoming.isRead && !notificationsRef.current.some(n => n.id === incoming.id)) {
+                setUnreadCount(count => count + 1);
+            }
+            setNotifications(prev => [incoming, ...prev.filter(n => n.id !== incoming.id)]);
+        });
+        const unsubscribeUnread = api.subscribeToEvents('unread', (data) => setUnreadCount(data.unread));
+        return () => {
+            unsubscribeNotifications();
+            unsubscribeUnread();
+        };
+    }, [isAuthenticated]);
 
     const addNotification = (n: Omit<Notification, 'id' | 'isRead' | 'timestamp'>) => {
         const newNotification: Notification = {
@@ -67,14 +117,17 @@ export const NotificationProvider: React.FC<{ children: React.ReactNode }> = ({
             timestamp: 'Just now'
         };
         setNotifications(prev => [newNotification, ...prev]);
+        setUnreadCount(prev => prev + 1);
     };
 
     const markAsRead = async (id: string) => {
         try {
             await api.markNotificationRead(id);
+            const wasUnread = notifications.some(n => n.id === id && !n.isRead);
             setNotifications(prev => prev.map(n =>
                 n.id === id ? { ...n, isRead: true } : n
             ));
+            if (wasUnread) setUnreadCount(prev => Math.max(0, prev - 1));
         } catch (error) {
             console.error('Failed to mark notification as read', error);
         }
@@ -84,6 +137,7 @@ export const NotificationProvider: React.FC<{ children: React.ReactNode }> = ({
         try {
             await api.markAllNotificationsRead();
             setNotifications(prev => prev.map(n => ({ ...n, isRead: true })));
+            setUnreadCount(0);
         } catch (error) {
             console.error('Failed to mark all as read', error);
         }
@@ -93,6 +147,7 @@ export const NotificationProvider: React.FC<{ children: React.ReactNode }> = ({
         try {
             await api.clearNotifications();
             setNotifications([]);
+            setUnreadCount(0);
         } catch (error) {
             console.error('Failed to clear notifications', error);
         }
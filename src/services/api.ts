@@ -8,5 +8,6 @@ export * from './modules/paymentService';
 export * from './modules/analyticsService';
 export * from './modules/notificationService';
 export * from './modules/liveSessionService';
+export * from './modules/eventStreamService';
 
 export default apiClient;
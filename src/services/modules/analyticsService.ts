@@ -17,7 +17,7 @@ export const getPendingTasks = async () => {
 
 export const getRecentActivity = async () => {
     const response = await apiClient.get('/dashboard/recent-activity/');
-    return response.data;
+    return response.data.results;
 };
 
 export const getStudentReport = async () => {
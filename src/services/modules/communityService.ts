@@ -1,7 +1,7 @@
 import apiClient from '../apiClient';
 
-export const getDiscussions = async () => {
-    const response = await apiClient.get('/discussions/');
+export const getDiscussions = async (params?: { q?: string; course?: number; resolved?: boolean; author?: number }) => {
+    const response = await apiClient.get('/discussions/', { params });
     return response.data;
 };
 
@@ -25,6 +25,11 @@ export const getDiscussionDetails = async (id: number) => {
     return response.data;
 };
 
+export const getMoreReplies = async (nextUrl: string) => {
+    const response = await apiClient.get(nextUrl);
+    return response.data;
+};
+
 export const likeDiscussion = async (id: number) => {
     const response = await apiClient.post(`/discussions/${id}/like/`);
     return response.data;
@@ -51,8 +56,9 @@ export const createConversation = async (email?: string, userId?: string) => {
     return response.data;
 };
 
-export const getMessages = async (conversationId: string) => {
-    const response = await apiClient.get(`/conversations/${conversationId}/messages/`);
+// Newest page by default; `before` pages back through history, `after` syncs only newer messages
+export const getMessages = async (conversationId: string, cursor: { before?: string; after?: string } = {}) => {
+    const response = await apiClient.get(`/conversations/${conversationId}/messages/`, { params: cursor });
     return response.data;
 };
 
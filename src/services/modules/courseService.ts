@@ -10,8 +10,14 @@ export const getInstructorCourses = async () => {
     return response.data;
 };
 
-export const getCourseReviews = async (courseId: number) => {
-    const response = await apiClient.get(`/courses/${courseId}/reviews/`);
+// Cursor-paginated: { next, previous, results }
+export const getCourseReviews = async (courseId: number, cursorUrl?: string) => {
+    const response = await apiClient.get(cursorUrl || `/courses/${courseId}/reviews/`);
+    return response.data;
+};
+
+export const getCourseReviewSummary = async (courseId: number) => {
+    const response = await apiClient.get(`/courses/${courseId}/reviews/summary/`);
     return response.data;
 };
 
@@ -29,3 +35,18 @@ export const createLesson = async (data: any) => {
     const response = await apiClient.post('/lessons/', data);
     return response.data;
 };
+
+export const getCourseAnnouncements = async (courseId: number, cursorUrl?: string) => {
+    const response = await apiClient.get(cursorUrl || `/courses/${courseId}/announcements/`);
+    return response.data;
+};
+
+export const postAnnouncement = async (courseId: number, data: { title: string; body: string; notify?: boolean }) => {
+    const response = await apiClient.post(`/courses/${courseId}/announcements/`, data);
+    return response.data;
+};
+
+export const getAnnouncementFeed = async (cursorUrl?: string) => {
+    const response = await apiClient.get(cursorUrl || '/announcements/');
+    return response.data;
+};
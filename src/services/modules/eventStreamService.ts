@@ -0,0 +1,93 @@
+import apiClient from '../apiClient';
+
+// Streams are served by the ASGI events service; the API host answers them with 503
+const EVENTS_URL = import.meta.env.VITE_EVENTS_URL || apiClient.defaults.baseURL;
+
+type EventHandler = (data: any) => void;
+
+const handlers = new Map<string, Set<EventHandler>>();
+let source: EventSource | null = null;
+let listening = new Set<string>();
+let lastEventId = '';
+let reconnectTimer: ReturnType<typeof setTimeout> | null = null;
+
+const listen = (kind: string) => {
+    if (!source || listening.has(kind)) return;
+    listening.add(kind);
+    source.addEventListener(kind, (event) => {
+        const message = event as MessageEvent;
+        lastEventId = message.lastEventId || lastEventId;
+        const data = JSON.parse(message.data);
+        handlers.get(kind)?.forEach(handler => handler(data));
+    });
+};
+
+let connecting = false;
+
+const scheduleReconnect = (delay: number) => {
+    if (reconnectTimer) clearTimeout(reconnectTimer);
+    reconnectTimer = setTimeout(connect, delay);
+};
+
+const connect = async () => {
+    if (source || connecting || !localStorage.getItem('access_token') || handlers.size === 0) return;
+    connecting = true;
+    let ticket: string;
+    try {
+        // Short-lived ticket, so the access token never ends up in the stream URL
+        const response = await apiClient.post('/events/ticket/');
+        ticket = response.data.ticket;
+    } catch (error) {
+        console.error('Failed to get an event stream ticket', error);
+        scheduleReconnect(30000);
+        return;
+    } finally {
+        connecting = false;
+    }
+    if (source || handlers.size === 0) return;
+    const params = new URLSearchParams({ ticket });
+    if (lastEventId) params.set('last_event_id', lastEventId);
+    source = new EventSource(`${EVENTS_URL}/events/stream/?${params}`);
+    listening = new Set();
+    handlers.forEach((_, kind) => listen(kind));
+    let opened = false;
+    source.onopen = () => { opened = true; };
+    source.onerror = () => {
+        // The browser retries on its own with the same ticket; once the server refuses it
+        // (expired ticket) fetch a new one. A stream refused outright (every slot taken)
+        // waits longer, and the contexts poll in the meantime
+        if (source?.readyState === EventSource.CLOSED) {
+            source = null;
+            scheduleReconnect(opened ? 5000 : 60000);
+        }
+    };
+};
+
+/**
+ * True while the event stream is open; callers poll faster when it is not.
+ */
+export const isEventStreamOpen = () => source?.readyState === EventSource.OPEN;
+
+const disconnect = () => {
+    source?.close();
+    source = null;
+    if (reconnectTimer) clearTimeout(reconnectTimer);
+    reconnectTimer = null;
+};
+
+/**
+ * Subscribes to one kind of server-pushed event ('notification', 'unread', 'message').
+ * All subscribers share a single EventSource; returns the unsubscribe function.
+ */
+export const subscribeToEvents = (kind: string, handler: EventHandler) => {
+    if (!handlers.has(kind)) handlers.set(kind, new Set());
+    handlers.get(kind)!.add(handler);
+    if (source) listen(kind);
+    else connect();
+
+    return () => {
+        handlers.get(kind)?.delete(handler);
+        if (handlers.get(kind)?.size === 0) handlers.delete(kind);
+        if (handlers.size === 0) disconnect();
+    };
+};
@@ -2,7 +2,12 @@ import apiClient from '../apiClient';
 
 export const getNotifications = async () => {
     const response = await apiClient.get('/notifications/');
-    return response.data;
+    return response.data.results;
+};
+
+export const getUnreadNotificationCount = async (): Promise<number> => {
+    const response = await apiClient.get('/notifications/unread-count/');
+    return response.data.unread;
 };
 
 export const markNotificationRead = async (id: string | number) => {